@@ -3,7 +3,8 @@ __author__ = 'Yu Cao'
 from D3HRE.core.hotel_load_model import HotelLoad
 from D3HRE.core.navigation_utility import ocean_current_processing
 from D3HRE.core.get_hash import hash_value
-from D3HRE.core.mission_utility import get_mission
+from D3HRE.core.mission_utility import get_mission, MISSION_TRACK_VERSION
+from D3HRE.core.propulsion_model import PropulsionPowerTable, PROPULSION_TABLE_DIR
 
 import pandas as pd
 
@@ -30,8 +31,10 @@ class Robot():
 
 class MaritimeRobot(Robot):
 
-    def __init__(self, power_consumption_list, from_pyresis=None, use_ocean_current=False, config={}):
+    def __init__(self, power_consumption_list, from_pyresis=None, use_ocean_current=False, config={},
+                 propulsion_table=None):
         self.power_consumption_list = power_consumption_list
+        self.propulsion_table = propulsion_table
         if from_pyresis is not None:
             self.set_from_PyResis(from_pyresis)
         self.use_ocean_current = use_ocean_current
@@ -80,6 +83,28 @@ class MaritimeRobot(Robot):
         self.hotel_load, self.critical_hotel_load = hotel.generate_power_consumption_timeseries()
         return self.hotel_load
 
+    def get_hotel_load_ensemble(self, n_profiles, strategy='normal'):
+        """
+        Get an ensemble of independent hotel load profiles of the vehicle. With the same seed the
+        first profile is the hotel load of get_hotel_load.
+
+        :param n_profiles: int, number of profiles K
+        :param strategy: str optinal 'full-power' for continuous power output
+        'normal' for duty cycle controlled power consumption generation
+        :return: tuple of np arrays, (K, T) hotel load and critical hotel load
+        """
+        hotel = HotelLoad(self.mission, self.power_consumption_list, strategy)
+        return hotel.generate_power_consumption_ensemble(n_profiles)
+
+    def get_propulsion_table(self):
+        """
+        Get the propulsion power table of the vehicle, the default table is in the MERRA-2 data directory.
+        :return: PropulsionPowerTable
+        """
+        if self.propulsion_table is None:
+            self.propulsion_table = PropulsionPowerTable(PROPULSION_TABLE_DIR)
+        return self.propulsion_table
+
     def get_propulsion_load(self, current=True):
         """
         :param current: bool default True, use ocean current for the vehicle
@@ -98,13 +123,9 @@ class MaritimeRobot(Robot):
                 print('No current data from database, fallback on no current')
                 self.prop_load = self.vehicle.prop_power()
             else:
-                prop_power_list = []
-                for v in self.ocean_current_df.Vs:
-                    self.vehicle.speed = v
-                    prop_power_list.append(self.vehicle.prop_power())
-
                 self.prop_load = pd.Series(
-                    index=self.mission.df.index, data=prop_power_list
+                    index=self.mission.df.index,
+                    data=self.get_propulsion_table().power(self.vehicle, self.ocean_current_df.Vs.values)
                 )
         return self.prop_load
 
@@ -185,7 +206,7 @@ class Mission:
         else:
             speed_tuple = self.speed
 
-        ID_tuple = (self.start_time, route_tuple, speed_tuple)
+        ID_tuple = (self.start_time, route_tuple, speed_tuple, MISSION_TRACK_VERSION)
         self.ID = hash_value(ID_tuple)
         return self.ID
 
@@ -0,0 +1,194 @@
+import numpy as np
+
+try:
+    from numba import njit
+    JIT = True
+except ImportError:
+    JIT = False
+
+    def njit(*args, **kwargs):
+        """
+        Stand in for numba.njit when numba is not installed, the kernels run as plain Python.
+        """
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+# State codes of the finite state battery model
+INVALID = -1  # generation or demand is not a number
+CHARGE = 0  # demand met by generation, surplus charged into battery
+FLOAT = 1  # demand met by generation, battery is full and surplus is wasted
+DISCHARGE = 2  # demand met by generation and discharge from battery
+UNMET = 3  # demand not met, generation charged into battery
+UNMET_FULL = 4  # demand not met, battery is full and generation is wasted
+
+
+if JIT:
+    @njit(cache=True)
+    def _empty(length):
+        return np.empty(length)
+else:
+    def _empty(length):
+        return [0.0] * length
+
+
+@njit(cache=True)
+def battery_step(energy, generated, plan, capacity, depth_of_discharge, discharge_rate, battery_eff, discharge_eff,
+                 fill_to_capacity):
+    """
+    Advance the finite state battery model by one time step.
+
+    :param energy: float, energy in the battery at the start of the step unit Wh
+    :param generated: float, power generation unit in W
+    :param plan: float, planned power usage unit in W
+    :param capacity: float, battery capacity unit Wh
+    :param depth_of_discharge: float, 0 to 1 maximum allowed discharge depth
+    :param discharge_rate: float, self-discharge rate
+    :param battery_eff: float, 0 to 1 charge efficiency
+    :param discharge_eff: float, 0 to 1 discharge efficiency
+    :param fill_to_capacity: bool, True to top up the battery to capacity before wasting surplus (managed battery),
+    False to keep the energy unchanged and waste the whole surplus
+    :return: tuple, energy at the end of the step, supplied power, unmet power, wasted power and the state code
+    """
+    decayed = energy * (1 - discharge_rate)
+    if generated >= plan:
+        energy_new = decayed + (generated - plan) * battery_eff
+        if energy_new < capacity:
+            return energy_new, plan, 0.0, 0.0, CHARGE
+        if fill_to_capacity:
+            return capacity, plan, 0.0, generated - plan - (capacity - energy), FLOAT
+        return energy, plan, 0.0, generated - plan, FLOAT
+
+    elif generated < plan:
+        energy_new = decayed + (generated - plan) / discharge_eff
+        if energy_new > (1 - depth_of_discharge) * capacity:
+            return energy_new, plan, 0.0, 0.0, DISCHARGE
+        energy_new = decayed + generated * battery_eff
+        if energy_new < capacity:
+            return energy_new, 0.0, plan - generated, 0.0, UNMET
+        if fill_to_capacity:
+            return capacity, 0.0, plan - generated, generated - (capacity - energy), UNMET_FULL
+        return energy, 0.0, plan - generated, generated, UNMET_FULL
+
+    return energy, 0.0, plan - generated, 0.0, INVALID
+
+
+@njit(cache=True)
+def battery_run(power, use, energy, capacity, depth_of_discharge, discharge_rate, battery_eff, discharge_eff,
+                fill_to_capacity):
+    """
+    Run the finite state battery model over whole power generation and usage traces.
+
+    :param power: np array, contiguous float64 power generation unit in W (list of float without JIT, see as_trace)
+    :param use: np array, contiguous float64 power usage unit in W (list of float without JIT, see as_trace)
+    :param energy: float, initial energy in the battery unit Wh
+    :param capacity: float, battery capacity unit Wh
+    :param depth_of_discharge: float, 0 to 1 maximum allowed discharge depth
+    :param discharge_rate: float, self-discharge rate
+    :param battery_eff: float, 0 to 1 charge efficiency
+    :param discharge_eff: float, 0 to 1 discharge efficiency
+    :param fill_to_capacity: bool, see battery_step
+    :return: tuple of np arrays (lists without JIT), energy, supplied power, unmet power and wasted power history
+    """
+    length = len(power)
+    energy_history = _empty(length)
+    supply_history = _empty(length)
+    unmet_history = _empty(length)
+    waste_history = _empty(length)
+    for t in range(length):
+        energy, supply, unmet, waste, _ = battery_step(
+            energy, power[t], use[t], capacity, depth_of_discharge, discharge_rate, battery_eff, discharge_eff,
+            fill_to_capacity
+        )
+        energy_history[t] = energy
+        supply_history[t] = supply
+        unmet_history[t] = unmet
+        waste_history[t] = waste
+    return energy_history, supply_history, unmet_history, waste_history
+
+
+@njit(cache=True)
+def battery_metrics(power, use, energy, capacity, depth_of_discharge, discharge_rate, battery_eff, discharge_eff,
+                    fill_to_capacity):
+    """
+    Stream the finite state battery model over whole traces and keep only summary counters, no history is allocated.
+
+    :param power: np array, contiguous float64 power generation unit in W (list of float without JIT, see as_trace)
+    :param use: np array, contiguous float64 power usage unit in W (list of float without JIT, see as_trace)
+    :param energy: float, initial energy in the battery unit Wh
+    :param capacity: float, battery capacity unit Wh
+    :param depth_of_discharge: float, 0 to 1 maximum allowed discharge depth
+    :param discharge_rate: float, self-discharge rate
+    :param battery_eff: float, 0 to 1 charge efficiency
+    :param discharge_eff: float, 0 to 1 discharge efficiency
+    :param fill_to_capacity: bool, see battery_step
+    :return: tuple, number of unmet steps, total unmet energy unit Wh, total wasted energy unit Wh and the minimal
+    energy in the battery unit Wh
+    """
+    unmet_steps = 0
+    unmet_energy = 0.0
+    waste_energy = 0.0
+    min_energy = np.inf
+    for t in range(len(power)):
+        energy, supply, unmet, waste, state = battery_step(
+            energy, power[t], use[t], capacity, depth_of_discharge, discharge_rate, battery_eff, discharge_eff,
+            fill_to_capacity
+        )
+        if state != CHARGE and state != FLOAT and state != DISCHARGE:
+            unmet_steps += 1
+            if state != INVALID:
+                unmet_energy += unmet
+        waste_energy += waste
+        if energy < min_energy:
+            min_energy = energy
+    return unmet_steps, unmet_energy, waste_energy, min_energy
+
+
+@njit(cache=True)
+def battery_batch_metrics(power, use, energy, capacity, depth_of_discharge, discharge_rate, battery_eff,
+                          discharge_eff, fill_to_capacity):
+    """
+    Stream N batteries of the finite state battery model over their traces, see battery_metrics.
+
+    :param power: np array, (N, T) float64 power generation unit in W
+    :param use: np array, (N, T) float64 power usage unit in W
+    :param energy: np array, (N,) initial energy in the batteries unit Wh
+    :param capacity: np array, (N,) battery capacities unit Wh
+    :return: np array, (N,) number of unmet steps of each battery
+    """
+    unmet_steps = np.zeros(power.shape[0])
+    for i in range(power.shape[0]):
+        unmet_steps[i] = battery_metrics(
+            power[i], use[i], energy[i], capacity[i], depth_of_discharge, discharge_rate, battery_eff,
+            discharge_eff, fill_to_capacity
+        )[0]
+    return unmet_steps
+
+
+def as_trace(values, length=None):
+    """
+    Convert a list, Series or scalar into the trace expected by the kernels: a contiguous float64 array when the
+    kernels are compiled, a list of Python floats otherwise as it is much faster to iterate in plain Python.
+
+    :param values: list, pandas Series, np array or float
+    :param length: optional int, length to broadcast scalar values to
+    :return: np array or list, float64 trace
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if length is not None:
+        values = np.broadcast_to(values, (length,))
+    if JIT:
+        return np.ascontiguousarray(values)
+    return values.tolist()
+
+
+def as_list(history):
+    """
+    Convert a history returned by the kernels into a list of Python floats.
+
+    :param history: np array or list
+    :return: list
+    """
+    if isinstance(history, list):
+        return history
+    return history.tolist()
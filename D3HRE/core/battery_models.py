@@ -1,5 +1,9 @@
 import numpy as np
 
+from D3HRE.core.battery_kernel import battery_run, battery_metrics, battery_batch_metrics, battery_step
+from D3HRE.core.battery_kernel import as_trace, as_list, JIT
+from D3HRE.core.battery_kernel import INVALID, CHARGE, FLOAT, DISCHARGE, UNMET, UNMET_FULL
+
 
 def min_max_model(power, use, battery_capacity):
     """
@@ -42,50 +46,17 @@ def soc_model_fixed_load(
     :return: tuple SOC: state of charge, energy history: E in battery,
     unmet_history: unmet energy history, waste_history: waste energy history
     """
-    DOD = depth_of_discharge
-    power = power.tolist()
-    use_history = []
-    waste_history = []
-    unmet_history = []
-    energy_history = []
-    energy = 0
-    for p in power:
-        if p >= use:
-            use_history.append(use)
-            unmet_history.append(0)
-            energy_new = energy * (1 - discharge_rate) + (p - use) * battery_eff
-            if energy_new < battery_capacity:
-                energy = energy_new  # battery energy got update
-                waste_history.append(0)
-            else:
-                waste_history.append(p - use)
-                energy = energy
-
-        elif p < use:
-            energy_new = energy * (1 - discharge_rate) + (p - use) / discharge_eff
-            if energy_new > (1 - DOD) * battery_capacity:
-                energy = energy_new
-                unmet_history.append(0)
-                waste_history.append(0)
-                use_history.append(use)
-            elif energy * (1 - discharge_rate) + p * battery_eff < battery_capacity:
-                energy = energy * (1 - discharge_rate) + p * battery_eff
-                unmet_history.append(use - p)
-                use_history.append(0)
-                waste_history.append(0)
-            else:
-                unmet_history.append(use - p)
-                use_history.append(0)
-                waste_history.append(p)
-                energy = energy
-
-        energy_history.append(energy)
+    power = as_trace(power)
+    energy_history, use_history, unmet_history, waste_history = battery_run(
+        power, as_trace(use, len(power)), 0.0, float(battery_capacity), depth_of_discharge, discharge_rate,
+        battery_eff, discharge_eff, False
+    )
 
     if battery_capacity == 0:
         SOC = np.array(energy_history)
     else:
         SOC = np.array(energy_history) / battery_capacity
-    return SOC, energy_history, unmet_history, waste_history, use_history
+    return SOC, as_list(energy_history), as_list(unmet_history), as_list(waste_history), as_list(use_history)
 
 
 class Battery:
@@ -128,64 +99,42 @@ class Battery:
             self.discharge_eff = 0.8
             self.init_charge = 1
 
-    def run(self, power, use):
+    def run(self, power, use, history=True):
         """
         Run the battery model with a list of power generation and usage.
 
         :param power: list, power generation unit in W
         :param use: list, power usage unit in W
+        :param history: optional, set False to run in metrics-only mode that keeps the unmet hours, unmet energy,
+        wasted energy and minimal SOC but not the history of the battery
         :return: None
         """
-        DOD = self.depth_of_discharge
-        battery_capacity = self.capacity
-        discharge_rate = self.discharge_rate
-        discharge_eff = self.discharge_eff
-        battery_eff = self.battery_eff
+        power = as_trace(power)
+        use = as_trace(use)
+        parameters = (
+            float(self.init_charge * self.capacity), float(self.capacity), self.depth_of_discharge,
+            self.discharge_rate, self.battery_eff, self.discharge_eff, False
+        )
+        self.length = len(power)
 
-        use_history = []
-        waste_history = []
-        unmet_history = []
-        energy_history = []
-        SOC = []
-        energy = self.init_charge * self.capacity
-        for p, u in zip(power, use):
-            if p >= u:
-                use_history.append(u)
-                unmet_history.append(0)
-                energy_new = energy * (1 - discharge_rate) + (p - u) * battery_eff
-                if energy_new < battery_capacity:
-                    energy = energy_new  # battery energy got update
-                    waste_history.append(0)
-                else:
-                    waste_history.append(p - u)
-                    energy = energy
-
-            elif p < u:
-                energy_new = energy * (1 - discharge_rate) + (p - u) / discharge_eff
-                if energy_new > (1 - DOD) * battery_capacity:
-                    energy = energy_new
-                    unmet_history.append(0)
-                    waste_history.append(0)
-                    use_history.append(u)
-                elif energy * (1 - discharge_rate) + p * battery_eff < battery_capacity:
-                    energy = energy * (1 - discharge_rate) + p * battery_eff
-                    unmet_history.append(u - p)
-                    use_history.append(0)
-                    waste_history.append(0)
-                else:
-                    unmet_history.append(u - p)
-                    use_history.append(0)
-                    waste_history.append(p)
-                    energy = energy
-
-            energy_history.append(energy)
-            SOC.append(energy / battery_capacity)
-
-        self.SOC = SOC
-        self.energy_history = energy_history
-        self.unmet_history = unmet_history
-        self.waste_history = waste_history
-        self.use_history = use_history
+        if not history:
+            self.unmet_hours, self.unmet_energy, self.waste_energy, min_energy = battery_metrics(
+                power, use, *parameters
+            )
+            self.min_SOC = min_energy / self.capacity
+            return
+
+        energy_history, use_history, unmet_history, waste_history = battery_run(power, use, *parameters)
+
+        self.energy_history = as_list(energy_history)
+        self.SOC = [energy / self.capacity for energy in self.energy_history]
+        self.unmet_history = as_list(unmet_history)
+        self.waste_history = as_list(waste_history)
+        self.use_history = as_list(use_history)
+        self.unmet_hours = self.length - self.unmet_history.count(0)
+        self.unmet_energy = np.nansum(unmet_history)
+        self.waste_energy = np.sum(waste_history)
+        self.min_SOC = min(self.SOC)
 
     def battery_history(self):
         """
@@ -206,14 +155,200 @@ class Battery:
 
     def lost_power_supply_probability(self):
         """
-        Return the lost power supply probability (LPSP) using the battery history.
+        Return the lost power supply probability (LPSP) using the unmet hours of the last run.
 
         :return: float, LPSP
         """
-        LPSP = 1 - self.unmet_history.count(0) / len(self.energy_history)
+        LPSP = 1 - (self.length - self.unmet_hours) / self.length
         return LPSP
 
 
+class Battery_batch:
+    """
+    A batch of finite state energy flow battery models.
+
+    Each of the N batteries follows the state machine of battery_kernel.battery_step. When the kernels are compiled
+    every battery runs through the compiled kernel, otherwise the time loop is kept but every step is evaluated on all
+    N batteries at once with NumPy using the same state codes.
+    """
+    def __init__(self, capacities, config={}):
+        """
+        Initialise N batteries with the given capacities and a shared configuration.
+
+        :param capacities: array like, (N,) battery capacities unit Wh
+        :param config: options including DOD, depth of discharge; sigma, self-discharge rate; eta_in, charge efficiency;
+        eta_out, discharge efficiency; init_charge, percentage of the battery pre-charge; where all values shall between 0
+        and 1
+        """
+        self.capacity = np.atleast_1d(np.asarray(capacities, dtype=float))
+        self.config = config
+        self.set_parameters()
+
+    def set_parameters(self):
+        """
+        Setup the parameters using the config file, options including DOD, depth of discharge; sigma, self-discharge rate;
+        eta_in, charge efficiency; eta_out, discharge efficiency; init_charge, percentage of the battery pre-charge;
+        where all values shall between 0 and 1.
+
+        """
+        try:
+            self.depth_of_discharge = self.config['simulation']['battery']['DOD']
+            self.discharge_rate = self.config['simulation']['battery']['sigma']
+            self.battery_eff = self.config['simulation']['battery']['eta_in']
+            self.discharge_eff = self.config['simulation']['battery']['eta_out']
+            self.init_charge = self.config['simulation']['battery']['B0']
+
+        except KeyError:
+            print('Parameter is not found in config file, default values are used.')
+            self.depth_of_discharge = 1
+            self.discharge_rate = 0.005
+            self.battery_eff = 0.9
+            self.discharge_eff = 0.8
+            self.init_charge = 1
+
+    def run(self, power, use, history=False):
+        """
+        Run all batteries with power generation and usage traces.
+
+        :param power: array like, (T,) trace shared by all batteries or (N, T) traces, power generation unit in W
+        :param use: array like, (T,) trace shared by all batteries or (N, T) traces, power usage unit in W
+        :param history: optional, set True to keep (N, T) histories of SOC, energy, unmet, waste and supplied power
+        :return: np array, (N,) LPSP of each battery
+        """
+        n = self.capacity.shape[0]
+        power = np.asarray(power, dtype=float)
+        use = np.asarray(use, dtype=float)
+        length = np.broadcast(power, use).shape[-1]
+        power = np.broadcast_to(power, (n, length))
+        use = np.broadcast_to(use, (n, length))
+
+        if JIT:
+            self.run_kernel(power, use, history)
+        else:
+            self.run_lockstep(power, use, history)
+        self.length = length
+        return self.lost_power_supply_probability()
+
+    def get_kernel_parameters(self):
+        """
+        :return: tuple, parameters of the battery kernels after the initial energy and capacity
+        """
+        return (self.depth_of_discharge, self.discharge_rate, self.battery_eff, self.discharge_eff, False)
+
+    def run_kernel(self, power, use, history):
+        """
+        Run every battery through the compiled kernels of battery_kernel.
+
+        :param power: np array, (N, T) power generation unit in W
+        :param use: np array, (N, T) power usage unit in W
+        :param history: bool, keep (N, T) histories
+        :return: None
+        """
+        energy = self.init_charge * self.capacity
+        if not history:
+            self.unmet_hours = battery_batch_metrics(power, use, energy, self.capacity, *self.get_kernel_parameters())
+            return
+
+        histories = [
+            battery_run(np.ascontiguousarray(power[i]), np.ascontiguousarray(use[i]), float(energy[i]),
+                        float(self.capacity[i]), *self.get_kernel_parameters())
+            for i in range(power.shape[0])
+        ]
+        self.energy_history, self.use_history, self.unmet_history, self.waste_history = (
+            np.array([history_i[j] for history_i in histories]) for j in range(4)
+        )
+        self.SOC = self.energy_history / self.capacity[:, np.newaxis]
+        self.unmet_hours = np.count_nonzero(self.unmet_history, axis=1).astype(float)
+
+    def run_lockstep(self, power, use, history):
+        """
+        Advance all batteries step by step with NumPy, used when the kernels are not compiled. The state of
+        every battery follows battery_kernel.battery_step.
+
+        :param power: np array, (N, T) power generation unit in W
+        :param use: np array, (N, T) power usage unit in W
+        :param history: bool, keep (N, T) histories
+        :return: None
+        """
+        DOD = self.depth_of_discharge
+        battery_capacity = self.capacity
+        discharge_rate = self.discharge_rate
+        discharge_eff = self.discharge_eff
+        battery_eff = self.battery_eff
+
+        n, length = power.shape
+        if history:
+            self.SOC = np.empty((n, length))
+            self.energy_history = np.empty((n, length))
+            self.unmet_history = np.empty((n, length))
+            self.waste_history = np.empty((n, length))
+            self.use_history = np.empty((n, length))
+
+        unmet_hours = np.zeros(n)
+        lower_bound = (1 - DOD) * battery_capacity
+        energy = self.init_charge * battery_capacity
+        for t in range(length):
+            p = power[:, t]
+            u = use[:, t]
+            energy_decayed = energy * (1 - discharge_rate)
+            energy_charged = energy_decayed + (p - u) * battery_eff
+            energy_discharged = energy_decayed + (p - u) / discharge_eff
+            energy_trickle = energy_decayed + p * battery_eff
+
+            surplus = p >= u
+            deficit = p < u
+            state = np.select(
+                [surplus & (energy_charged < battery_capacity), surplus,
+                 deficit & (energy_discharged > lower_bound),
+                 deficit & (energy_trickle < battery_capacity), deficit],
+                [CHARGE, FLOAT, DISCHARGE, UNMET, UNMET_FULL],
+                default=INVALID,
+            )
+            energy = np.select(
+                [state == CHARGE, state == DISCHARGE, state == UNMET],
+                [energy_charged, energy_discharged, energy_trickle],
+                default=energy,
+            )
+            met = (state == CHARGE) | (state == FLOAT) | (state == DISCHARGE)
+            unmet_hours += ~met
+
+            if history:
+                self.SOC[:, t] = energy / battery_capacity
+                self.energy_history[:, t] = energy
+                self.unmet_history[:, t] = np.where(met, 0, u - p)
+                self.waste_history[:, t] = np.select(
+                    [state == FLOAT, state == UNMET_FULL], [p - u, p], default=0
+                )
+                self.use_history[:, t] = np.where(met, u, 0)
+
+        self.unmet_hours = unmet_hours
+
+    def battery_history(self):
+        """
+        Return the history of the batteries, only available after run with history=True.
+
+        :return: np array, (5, N, T) the SOC, energy in the battery, unmet power supply, wasted power and the supplied
+        power unit in W
+        """
+        history = np.stack(
+            (
+                self.SOC,
+                self.energy_history,
+                self.unmet_history,
+                self.waste_history,
+                self.use_history,
+            )
+        )
+        return history
+
+    def lost_power_supply_probability(self):
+        """
+        Return the lost power supply probability (LPSP) of every battery.
+
+        :return: np array, (N,) LPSP
+        """
+        LPSP = 1 - (self.length - self.unmet_hours) / self.length
+        return LPSP
 
 
 class Battery_managed:
@@ -297,57 +432,41 @@ class Battery_managed:
         if gym == True:
             plan = plan[0][0]
 
-        if generated >= plan:
-            self.supply_history.append(plan)
-            self.unmet_history.append(0)
-
-            energy_new = self.energy * (1 - self.discharge_rate) + (generated - plan) * self.battery_eff
-            if energy_new < self.capacity:
-                self.energy = energy_new  # battery energy got update
-                self.waste_history.append(0)
-                self.status.append("""Demand can be meet by generation, also battery is not full. 
+        energy, supply, unmet, waste, state = battery_step(
+            float(self.energy), float(generated), float(plan), float(self.capacity), self.DOD, self.discharge_rate,
+            self.battery_eff, self.discharge_eff, True
+        )
+        if state == FLOAT or state == UNMET_FULL:
+            energy = self.capacity  # battery is topped up to its capacity
+        self.supply_history.append(supply)
+        self.unmet_history.append(unmet)
+        self.waste_history.append(waste)
+
+        if state == CHARGE:
+            self.status.append("""Demand can be meet by generation, also battery is not full. 
                                 Supply {demand}, charge {diff}.""".format(demand=plan, diff=generated - plan)
-                                   )
-                self.state = 'charge'
-            else:
-                self.waste_history.append(generated - plan - (self.capacity - self.energy))
-                self.energy = self.capacity
-                self.status.append("""Demand can be meet by generation, but battery is already full. 
+                               )
+            self.state = 'charge'
+        elif state == FLOAT:
+            self.status.append("""Demand can be meet by generation, but battery is already full. 
                                     Supply {demand}, charge battery to full waste {diff}.""".format(
-                                    demand=plan, diff=generated - plan)
-                                   )
-                self.state = 'float'
-
-        elif generated < plan:
-
-            energy_new = self.energy * (1 - self.discharge_rate) + (generated - plan) / self.discharge_eff
-
-            if energy_new > (1 - self.DOD) * self.capacity:
-                self.energy = energy_new
-                self.unmet_history.append(0)
-                self.waste_history.append(0)
-                self.supply_history.append(plan)
-                self.status.append("""Demand can not meet by generation, power in battery can make up difference.
+                                demand=plan, diff=generated - plan)
+                               )
+            self.state = 'float'
+        elif state == DISCHARGE:
+            self.status.append("""Demand can not meet by generation, power in battery can make up difference.
                                      Supply {demand} by discharge from battery""".format(demand=plan))
-                self.state = 'discharge'
-
-            elif self.energy * (1 - self.discharge_rate) + generated * self.battery_eff < self.capacity:
-                self.energy = self.energy * (1 - self.discharge_rate) + generated * self.battery_eff
-                self.unmet_history.append(plan - generated)
-                self.supply_history.append(0)
-                self.waste_history.append(0)
-                self.status.append("""Demand can not meet by generation, also power in battery can not make up difference.
+            self.state = 'discharge'
+        elif state == UNMET:
+            self.status.append("""Demand can not meet by generation, also power in battery can not make up difference.
                                      Charge {diff} to battery to avoid waste""".format(diff=generated))
-                self.state = 'unmet'
-            else:
-                self.unmet_history.append(plan - generated)
-                self.supply_history.append(0)
-                self.waste_history.append(generated - (self.capacity - self.energy))
-                self.energy = self.capacity
-                self.status.append("""Demand can not meet by generation, also power in battery can not make up difference.
+            self.state = 'unmet'
+        elif state == UNMET_FULL:
+            self.status.append("""Demand can not meet by generation, also power in battery can not make up difference.
                                                                  Charge {diff} to make battery full""".format(
-                    diff=self.capacity-self.energy))
-                self.state = 'unmet'
+                diff=self.capacity - energy))
+            self.state = 'unmet'
+        self.energy = energy
 
         self.states_list.append(self.state)
         self.battery_energy_history.append(self.energy)
@@ -460,51 +579,17 @@ def soc_model_variable_load(
     :return: tuple SOC: state of charge, energy history: E in battery,
     unmet_history: unmet energy history, waste_history: waste energy history
     """
-    DOD = depth_of_discharge
-    power = power.tolist()
-    use = use.tolist()
-    use_history = []
-    waste_history = []
-    unmet_history = []
-    energy_history = []
-    energy = 0
-    for p, u in zip(power, use):
-        if p >= u:
-            use_history.append(u)
-            unmet_history.append(0)
-            energy_new = energy * (1 - discharge_rate) + (p - u) * battery_eff
-            if energy_new < battery_capacity:
-                energy = energy_new  # battery energy got update
-                waste_history.append(0)
-            else:
-                waste_history.append(p - u)
-                energy = energy
-
-        elif p < u:
-            energy_new = energy * (1 - discharge_rate) + (p - u) / discharge_eff
-            if energy_new > (1 - DOD) * battery_capacity:
-                energy = energy_new
-                unmet_history.append(0)
-                waste_history.append(0)
-                use_history.append(use)
-            elif energy * (1 - discharge_rate) + p * battery_eff < battery_capacity:
-                energy = energy * (1 - discharge_rate) + p * battery_eff
-                unmet_history.append(u - p)
-                use_history.append(0)
-                waste_history.append(0)
-            else:
-                unmet_history.append(u - p)
-                use_history.append(0)
-                waste_history.append(p)
-                energy = energy
-
-        energy_history.append(energy)
+    power = as_trace(power)
+    energy_history, use_history, unmet_history, waste_history = battery_run(
+        power, as_trace(use, len(power)), 0.0, float(battery_capacity), depth_of_discharge, discharge_rate,
+        battery_eff, discharge_eff, False
+    )
 
     if battery_capacity == 0:
         SOC = np.array(energy_history)
     else:
         SOC = np.array(energy_history) / battery_capacity
-    return SOC, energy_history, unmet_history, waste_history, use_history
+    return SOC, as_list(energy_history), as_list(unmet_history), as_list(waste_history), as_list(use_history)
 
 
 if __name__ == '__main__':
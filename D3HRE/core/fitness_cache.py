@@ -0,0 +1,127 @@
+import json
+import sqlite3
+import numpy as np
+from collections import OrderedDict
+
+
+class FitnessCache:
+    """
+    Fitness cache keeps the fitness of decision vectors already evaluated by the optimiser.
+
+    Decision vectors are quantised to a tolerance before lookup, so points revisited by the
+    optimiser, e.g. clipped to the same bound, are only simulated once. The most recently used
+    entries are kept in memory up to a maximum size. Optionally the entries are also written to a
+    sqlite file, which is shared by every process or island that opens the same path.
+    """
+    def __init__(self, tolerance=1e-6, maxsize=100000, path=None):
+        """
+        :param tolerance: float or array like, absolute tolerance of each decision variable
+        :param maxsize: int, maximum number of entries kept in memory
+        :param path: optional str, sqlite file shared between processes
+        """
+        self.tolerance = np.asarray(tolerance, dtype=float)
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+
+    def __getstate__(self):
+        # The sqlite connection can not be pickled, every process opens its own one when it is first
+        # used. Entries in memory are not sent to other processes either, they read the shared file.
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['entries'] = OrderedDict()
+        return state
+
+    @property
+    def connection(self):
+        if self._connection is None and self.path is not None:
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS fitness (key TEXT PRIMARY KEY, fitness TEXT)'
+            )
+            self._connection.commit()
+        return self._connection
+
+    @property
+    def hit_rate(self):
+        """
+        :return: float, fraction of lookups found in the cache
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_key(self, x):
+        """
+        :param x: array like, decision vector
+        :return: str, decision vector quantised to the tolerance
+        """
+        quantised = np.round(np.asarray(x, dtype=float) / self.tolerance).astype(np.int64)
+        return ','.join(str(value) for value in quantised)
+
+    def get(self, x):
+        """
+        Get the fitness of a decision vector.
+
+        :param x: array like, decision vector
+        :return: list of float, fitness or None if the decision vector is not cached
+        """
+        key = self.get_key(x)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        if self.connection is not None:
+            row = self.connection.execute('SELECT fitness FROM fitness WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.hits += 1
+                fitness = json.loads(row[0])
+                self._remember(key, fitness)
+                return fitness
+
+        self.misses += 1
+        return None
+
+    def set(self, x, fitness):
+        """
+        Store the fitness of a decision vector.
+
+        :param x: array like, decision vector
+        :param fitness: array like, fitness of the decision vector
+        :return: None
+        """
+        self.set_many([x], [fitness])
+
+    def set_many(self, xs, fitnesses):
+        """
+        Store the fitness of several decision vectors, the sqlite file is written in one transaction.
+
+        :param xs: iterable of array like, decision vectors
+        :param fitnesses: iterable of array like, fitness of each decision vector
+        :return: None
+        """
+        rows = []
+        for x, fitness in zip(xs, fitnesses):
+            key = self.get_key(x)
+            fitness = [float(value) for value in fitness]
+            self._remember(key, fitness)
+            rows.append((key, json.dumps(fitness)))
+        if self.connection is not None and rows:
+            self.connection.executemany('INSERT OR REPLACE INTO fitness (key, fitness) VALUES (?, ?)', rows)
+            self.connection.commit()
+
+    def _remember(self, key, fitness):
+        self.entries[key] = fitness
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def info(self):
+        """
+        :return: dict of hits, misses, hit rate and number of entries in memory
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate,
+                'size': len(self.entries)}
@@ -21,13 +21,33 @@ class HotelLoad:
 
         power_consumption_list = power_consumption_list.copy()
         try:
-            np.random.seed(power_consumption_list['seed'])
+            seed = power_consumption_list['seed']
             del power_consumption_list['seed']
         except KeyError:
-            np.random.seed(123)
+            seed = 123
+        self.rng = np.random.default_rng(seed)
 
         self.power_consumption_list = power_consumption_list
         self.components = list(self.power_consumption_list.keys())
+        self.set_power_range()
+
+    def set_power_range(self):
+        """
+        Set the power at zero and full performance level and the duty cycle of all components as arrays,
+        so the power consumption of all components at all hours are computed with matrix operations.
+
+        :return: None
+        """
+        self.min_power = np.zeros(len(self.components))
+        self.max_power = np.zeros(len(self.components))
+        for i, component in enumerate(self.components):
+            self.min_power[i] = self.component_power_consumption(component, 0) or 0
+            self.max_power[i] = self.component_power_consumption(component, 1) or 0
+        self.duty_cycle = np.array(
+            [self.power_consumption_list[component]['duty_cycle'] for component in self.components],
+            dtype=float
+        )
+        self.critical = self.duty_cycle == 1
 
     def component_power_consumption(self, component, performance_level):
         """
@@ -51,39 +71,50 @@ class HotelLoad:
             print('Power list could only be range based or fixed. {} was given'.format(power_consumption['power']))
 
 
-    def generate_power_consumption(self):
-
-        non_critical_hotel_load = 0
-        critical_hotel_load_consumption = 0
-
-
+    def generate_power_consumption_array(self, duration, n_profiles=None):
+        """
+        Generate hotel load for a number of hours. The random performance level of all non critical
+        components at all hours is drawn as one (hours x components) matrix, or one
+        (profiles x hours x components) array for an ensemble of independent hotel load profiles.
+
+        :param duration: int, number of hours
+        :param n_profiles: optional int, number of independent profiles K
+        :return: tuple of np arrays, Watts total hotel load and critical hotel load, shape (hours,) or
+            (K, hours) if n_profiles is given
+        """
+        shape = (int(duration),) if n_profiles is None else (int(n_profiles), int(duration))
         if self.strategy == 'full-power':
-            performance = 1
-            for component in self.components:
-                critical_hotel_load_consumption += self.component_power_consumption(
-                    component, performance
-                )
+            critical_hotel_load = np.full(shape, self.max_power.sum())
+            return critical_hotel_load.copy(), critical_hotel_load
 
         elif self.strategy == 'normal':
-
-            for component in self.components:
-                if self.power_consumption_list[component]['duty_cycle'] == 1:
-                    critical_hotel_load_consumption += self.component_power_consumption(component, 1)
-                else:
-                    duty_cycle = self.power_consumption_list[component]['duty_cycle']
-                    performance = np.clip(duty_cycle + np.random.randn() * 0.1, 0, 1)
-                    non_critical_hotel_load += self.component_power_consumption(component, performance)
+            critical_hotel_load = np.full(shape, self.max_power[self.critical].sum())
+            duty_cycle = self.duty_cycle[~self.critical]
+            min_power = self.min_power[~self.critical]
+            max_power = self.max_power[~self.critical]
+            performance = np.clip(
+                duty_cycle + self.rng.standard_normal(shape + (len(duty_cycle),)) * 0.1, 0, 1
+            )
+            non_critical_hotel_load = (min_power + (max_power - min_power) * performance).sum(axis=-1)
+            return non_critical_hotel_load + critical_hotel_load, critical_hotel_load
 
         else:
             print('This is not supported yet!')
+            return np.zeros(shape), np.zeros(shape)
+
+    def generate_power_consumption(self):
+        """
+        Generate hotel load for one hour.
 
-        return non_critical_hotel_load + critical_hotel_load_consumption, critical_hotel_load_consumption
+        :return: tuple of float, Watts total hotel load and critical hotel load
+        """
+        hotel_load, critical_hotel_load = self.generate_power_consumption_array(1)
+        return hotel_load[0], critical_hotel_load[0]
 
     def generate_power_consumption_timeseries(self):
-        duration = len(self.mission.df.index)
-        power_consumption_list, critical_hotel_load_list = np.array([
-            self.generate_power_consumption() for _ in range(int(duration))
-        ]).T
+        power_consumption_list, critical_hotel_load_list = self.generate_power_consumption_array(
+            len(self.mission.df.index)
+        )
         hotel_load_ts = pd.Series(
             data=power_consumption_list, index=self.mission.df.index
         )
@@ -92,6 +123,15 @@ class HotelLoad:
         )
         return hotel_load_ts, critical_hotel_load_ts
 
+    def generate_power_consumption_ensemble(self, n_profiles):
+        """
+        Generate an ensemble of independent hotel load profiles over the mission for Monte Carlo
+        reliability analysis.
+
+        :param n_profiles: int, number of profiles K
+        :return: tuple of np arrays, (K, T) Watts total hotel load and critical hotel load
+        """
+        return self.generate_power_consumption_array(len(self.mission.df.index), n_profiles)
 
 if __name__ == '__main__':
 
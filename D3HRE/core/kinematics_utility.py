@@ -0,0 +1,69 @@
+import numpy as np
+
+
+def compass_bearing(lat, lon):
+    """
+    Calculate the compass bearing of the moving platform along a track. Vectorised version of
+    navigation_utility.calculate_initial_compass_bearing on consecutive points, as the platform
+    reach the final way point heading stay unchanged.
+
+    :param lat: array like degrees latitude of the track
+    :param lon: array like degrees longitude of the track
+    :return: np array degrees compass bearing from each point to the next one
+    """
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    lat1, lat2 = lat[:-1], lat[1:]
+    diffLong = lon[1:] - lon[:-1]
+    x = np.sin(diffLong) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - (
+        np.sin(lat1) * np.cos(lat2) * np.cos(diffLong)
+    )
+    bearing = (np.degrees(np.arctan2(x, y)) + 360) % 360
+    return np.append(bearing, bearing[-1])
+
+
+def platform_velocity(speed, heading):
+    """
+    Velocity components of the moving platform.
+
+    :param speed: array like km/h platform speed as in mission DataFrame
+    :param heading: array like degrees compass heading of the platform
+    :return: tuple of np arrays m/s eastward and northward velocity
+    """
+    V_s = np.asarray(speed, dtype=float) / 3.6
+    heading = np.radians(np.asarray(heading, dtype=float))
+    return V_s * np.sin(heading), V_s * np.cos(heading)
+
+
+def apparent_wind(U, V, U_p, V_p):
+    """
+    Apparent wind on the moving platform V_{app} = V_{true} + (- V_{s}).
+
+    :param U: array like m/s eastward true wind
+    :param V: array like m/s northward true wind
+    :param U_p: array like m/s eastward platform velocity
+    :param V_p: array like m/s northward platform velocity
+    :return: tuple of np arrays, eastward and northward apparent wind (m/s), apparent wind speed (m/s)
+        and apparent wind direction (degrees)
+    """
+    U_app = np.asarray(U, dtype=float) - U_p
+    V_app = np.asarray(V, dtype=float) - V_p
+    speed = np.sqrt(U_app ** 2 + V_app ** 2)
+    direction = (np.degrees(np.arctan2(U_app, V_app)) + 360) % 360
+    return U_app, V_app, speed, direction
+
+
+def relative_cosine(U_a, V_a, U_b, V_b):
+    """
+    Cosine of the angle between two series of vectors, NaN where either vector is zero.
+
+    :param U_a: array like eastward component of vector a
+    :param V_a: array like northward component of vector a
+    :param U_b: array like eastward component of vector b
+    :param V_b: array like northward component of vector b
+    :return: np array cosine of the angle between a and b
+    """
+    U_a, V_a, U_b, V_b = (np.asarray(x, dtype=float) for x in (U_a, V_a, U_b, V_b))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (U_a * U_b + V_a * V_b) / np.hypot(U_a, V_a) / np.hypot(U_b, V_b)
@@ -1,13 +1,17 @@
 import numpy as np
 import pandas as pd
-import nvector as nv
 
 from math import radians, cos, sin, asin, sqrt
 from datetime import timedelta
 
+from gsee.gsee import solar_position
 from D3HRE.core.get_hash import hash_value
 from D3HRE.core.dataframe_utility import full_day_cut
 
+# Increase when the track of a mission changes so that resources stored by mission ID are not reused,
+# 2: great circle interpolation between way points
+MISSION_TRACK_VERSION = 2
+
 
 def haversine(lon1, lat1, lon2, lat2):
     """
@@ -66,111 +70,118 @@ def journey_timestamp_generator(start_date, way_points, speed):
     return timestamps
 
 
-def position_dataframe(start_date, way_points, speed):
+def great_circle_interpolate(way_points, leg, fraction):
+    """
+    Spherical linear interpolation (slerp) of n-vectors along the great circle legs of a route.
+
+    :param way_points: np array (n, 2) way points formatted as [lat, lon] in degrees
+    :param leg: np array int, index of the leg of every point, leg i is from way point i to i + 1
+    :param fraction: np array float, fraction of the leg travelled at every point from 0 to 1
+    :return: tuple of np arrays, latitude and longitude in degrees
+    """
+    lat = np.radians(way_points[:, 0].astype(float))
+    lon = np.radians(way_points[:, 1].astype(float))
+    n_vector = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+    n_start = n_vector[leg]
+    n_end = n_vector[leg + 1]
+    fraction = fraction[:, np.newaxis]
+    omega = np.arccos(np.clip((n_start * n_end).sum(axis=1), -1, 1))[:, np.newaxis]
+    sin_omega = np.sin(omega)
+    # Linear interpolation on (nearly) coincident way points where slerp is undefined
+    short_leg = sin_omega < 1e-12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight_start = np.where(short_leg, 1 - fraction, np.sin((1 - fraction) * omega) / sin_omega)
+        weight_end = np.where(short_leg, fraction, np.sin(fraction * omega) / sin_omega)
+    n_point = weight_start * n_start + weight_end * n_end
+    n_point /= np.linalg.norm(n_point, axis=1)[:, np.newaxis]
+
+    point_lat = np.degrees(np.arcsin(np.clip(n_point[:, 2], -1, 1)))
+    point_lon = np.degrees(np.arctan2(n_point[:, 1], n_point[:, 0]))
+    return point_lat, point_lon
+
+
+def timezone_offset(lon):
+    """
+    Nautical time zone of the moving platform, each zone spans 15 degrees of longitude centred
+    on a multiple of 15 degrees, a longitude on the boundary belongs to the western zone.
+
+    :param lon: array like longitude in degrees from -180 to 180
+    :return: np array int, hours of local time ahead of UTC from -12 to 12
+    """
+    return np.ceil(np.asarray(lon, dtype=float) / 15 - 0.5).astype(int)
+
+
+def local_time(utc_index, lon):
+    """
+    Local time of the moving platform in its nautical time zone.
+
+    :param utc_index: pandas DatetimeIndex in UTC
+    :param lon: array like longitude in degrees of the platform at each time
+    :return: pandas DatetimeIndex local time
+    """
+    return pd.DatetimeIndex(utc_index) + pd.to_timedelta(timezone_offset(lon), unit='h')
+
+
+def position_dataframe(start_date, way_points, speed, solar_time=False):
     """
     Generate position dataFrame at one hour resolution with given way points.
 
+    The time at each way point comes from the cumulative distance along the route, the position at
+    each hour is then found on the great circle of its leg for the whole route at once.
+
     :param start_date: pandas Timestamp in UTC
     :param way_points: np array way points
     :param speed: float or array speed in km/h
+    :param solar_time: optional bool, add the apparent solar time at the platform as solar_time column
     :return: pandas DataFrame with indexed position at one hour resolution
     """
-    timeindex = journey_timestamp_generator(start_date, way_points, speed)
-    latTS = pd.Series(way_points[:, 0], index=timeindex).resample('1H').mean()
-    lonTS = pd.Series(way_points[:, 1], index=timeindex).resample('1H').mean()
-
-    # Custom interpolation calculate latitude and longitude of platform at each hour
-    lTs = latTS.copy()
-    x = (
-        lTs.isnull()
-        .reset_index(name='null')
-        .reset_index()
-        .rename(columns={"level_0": "order"})
-    )
-    x['block'] = (x['null'].shift(1) != x['null']).astype(int).cumsum()
-    block_to_fill = x[x['null']].groupby('block')['order'].apply(np.array)
-
-    def find_start_and_end_location(block_index):
-        start_index = block_index[0] - 1
-        end_index = block_index[-1] + 1
-        lat1 = latTS.iloc[start_index]
-        lon1 = lonTS.iloc[start_index]
-        lat2 = latTS.iloc[end_index]
-        lon2 = lonTS.iloc[end_index]
-        n = end_index - start_index
-        lat_lon1 = lat1, lon1
-        lat_lon2 = lat2, lon2
-        return [lat_lon1, lat_lon2, n]
-
-    def way_points_interp(location_block):
-        lat_lon1 = location_block[0]
-        lat_lon2 = location_block[1]
-        n = location_block[2]
-        wgs84 = nv.FrameE(name='WGS84')
-        lat1, lon1 = lat_lon1
-        lat2, lon2 = lat_lon2
-        n_EB_E_t0 = wgs84.GeoPoint(lat1, lon1, degrees=True).to_nvector()
-        n_EB_E_t1 = wgs84.GeoPoint(lat2, lon2, degrees=True).to_nvector()
-        path = nv.GeoPath(n_EB_E_t0, n_EB_E_t1)
-        interpolate_coor = [[lat1, lon1]]
-        piece_fraction = 1 / n
-        for n in range(n - 1):
-            g_EB_E_ti = path.interpolate(piece_fraction * (n + 1)).to_geo_point()
-            interpolate_coor.append(
-                [g_EB_E_ti.latitude_deg[0], g_EB_E_ti.longitude_deg[0]]
-            )
-        return interpolate_coor
-
-    way_interpolated = np.array([])
-    for block in block_to_fill:
-        way_interp = way_points_interp(find_start_and_end_location(block))
-        way_interpolated = np.append(way_interpolated, way_interp)
-
-    way_interpolated = np.append(way_interpolated, [latTS.iloc[-1], lonTS.iloc[-1]])
-    locations = way_interpolated.reshape(-1, 2)
-
-    mission = pd.DataFrame(data=locations, index=latTS.index, columns=['lat', 'lon'])
-
-    if isinstance(speed, int) or isinstance(speed, float):
+    way_points = np.asarray(way_points)
+    timeindex = pd.DatetimeIndex(journey_timestamp_generator(start_date, way_points, speed))
+    hours = pd.date_range(timeindex[0].floor('H'), timeindex[-1].floor('H'), freq='H')
+
+    # Leg travelled at each hour and the fraction of the leg already done
+    leg_time = timeindex.asi8
+    leg = np.clip(np.searchsorted(leg_time, hours.asi8, side='right') - 1, 0, len(way_points) - 2)
+    leg_duration = (leg_time[leg + 1] - leg_time[leg]).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(leg_duration > 0, (hours.asi8 - leg_time[leg]) / leg_duration, 0)
+    fraction = np.clip(fraction, 0, 1)
+
+    lat, lon = great_circle_interpolate(way_points, leg, fraction)
+    mission = pd.DataFrame({'lat': lat, 'lon': lon}, index=hours)
+
+    if np.ndim(speed) == 0:
         speedTS = speed
     else:
-        speed = np.append(speed, speed[-1])
-        speedTS = pd.Series(speed, index=timeindex).resample('1H').mean()
+        speedTS = np.asarray(speed)[leg]
 
     mission['speed'] = speedTS
-    mission.fillna(method='ffill', inplace=True)
 
     # Convert UTC time into local time
-    def find_timezone(array, value):
-        idx = (np.abs(array - value)).argmin()
-        return idx - 12
-
-    lons = np.linspace(-180, 180, 25)
-
-    local_time = []
-    for index, row in mission.iterrows():
-        local_time.append(index + timedelta(hours=int(find_timezone(lons, row.lon))))
-    # time difference into timedelta
-    # t_diff = list(map(lambda x: timedelta(hours=x), time_diff))
-    # local_time = mission.index + t_diff
-    mission['local_time'] = local_time
+    mission['local_time'] = local_time(mission.index, mission.lon.values)
+    if solar_time:
+        mission['solar_time'] = mission.index + pd.to_timedelta(
+            solar_position.solar_time_offset(mission.index, mission.lon.values), unit='m'
+        )
 
     return mission
 
 
-def get_mission(start_time, route, speed):
+def get_mission(start_time, route, speed, solar_time=False):
     """
     Calculate position dataFrame at given start time, route and speed
 
     :param start_time: str or Pandas Timestamp, the str input should have format YYYY-MM-DD close the day
     :param route: numpy array shape (n,2)  list of way points formatted as [lat, lon]
     :param speed: int, float or (n) list, speed of platform unit in km/h
+    :param solar_time: optional bool, add the apparent solar time at the platform as solar_time column
     :return: Pandas dataFrame
     """
     if type(start_time) == str:
         start_time = pd.Timestamp(start_time)
 
-    position_df = full_day_cut(position_dataframe(start_time, route, speed))
+    position_df = full_day_cut(position_dataframe(start_time, route, speed, solar_time))
     return position_df
 
 
@@ -221,7 +232,7 @@ class Mission:
         else:
             speed_tuple = self.speed
 
-        ID_tuple = (self.start_time, route_tuple, speed_tuple)
+        ID_tuple = (self.start_time, route_tuple, speed_tuple, MISSION_TRACK_VERSION)
         self.ID = hash_value(ID_tuple)
         return self.ID
 
@@ -3,6 +3,9 @@ import numpy as np
 import xarray as xr
 import os.path
 import configparser
+from functools import lru_cache
+
+from D3HRE.core.kinematics_utility import compass_bearing, platform_velocity
 
 
 config = configparser.ConfigParser()
@@ -39,7 +42,45 @@ def calculate_initial_compass_bearing(pointA, pointB):
     return compass_bearing
 
 
-def ocean_current_processing(mission_df, file_dir=OSCAR_DIR):
+@lru_cache(maxsize=8)
+def open_oscar_dataset(dataset_file_dir):
+    """
+    Open an OSCAR ocean current file, the dataset is kept open for later calls.
+
+    :param dataset_file_dir: str, path of the OSCAR ocean current file
+    :return: xarray dataset
+    """
+    return xr.open_dataset(dataset_file_dir)
+
+
+def sample_ocean_current(dataset, time, lat, lon, interpolation='nearest'):
+    """
+    Sample ocean current of a dataset at all the points of a track in one vectorised lookup.
+
+    :param dataset: xarray dataset, OSCAR ocean current dataset
+    :param time: array like UTC time of the points
+    :param lat: array like latitude of the points
+    :param lon: array like longitude of the points in the dataset convention
+    :param interpolation: str, 'nearest' for the nearest record and grid point or 'linear' for
+        linear interpolation in time and bilinear interpolation in space
+    :return: tuple of np arrays, unit in m/s eastward and northward ocean current
+    """
+    points = {
+        'time': xr.DataArray(np.asarray(time, dtype='datetime64[ns]'), dims='points'),
+        'latitude': xr.DataArray(np.asarray(lat, dtype=float), dims='points'),
+        'longitude': xr.DataArray(np.asarray(lon, dtype=float), dims='points'),
+    }
+    surface = dataset[['u', 'v']].sel(depth=15, method='nearest')
+    if interpolation == 'nearest':
+        selected_data = surface.sel(**points, method='nearest')
+    elif interpolation == 'linear':
+        selected_data = surface.interp(**points, method='linear')
+    else:
+        raise ValueError('Invalid interpolation: {}'.format(interpolation))
+    return selected_data.u.values.ravel(), selected_data.v.values.ravel()
+
+
+def ocean_current_processing(mission_df, file_dir=OSCAR_DIR, interpolation='nearest'):
     """
 
     Ocean data processing utility.
@@ -47,70 +88,33 @@ def ocean_current_processing(mission_df, file_dir=OSCAR_DIR):
 
     :param mission_df: padas dataFrame, contains UTC indexed sptial-temporal information
     :param file_dir: str, direcotry of the OSCAR ocean current file
+    :param interpolation: str, 'nearest' or 'linear' sampling of the ocean current, see sample_ocean_current
     :return: pandas dataFrame, unit in m/s the speed of the ocean current and the moving platform
     """
     dataframe = mission_df.copy()
-    location_list = [tuple(x) for x in dataframe[['lat', 'lon']].values]
 
     # Calculate heading with initial compass bearing
-    heading = []
-    for a, b in zip(location_list[:-1], location_list[1:]):
-        heading.append(calculate_initial_compass_bearing(a, b))
-
-    heading.append(heading[-1])
-    # As it reach the final way point heading stay unchanged
-
-    dataframe['heading'] = heading
-
-    V_g = dataframe['speed'] / 3.6  # ship ground speed in mission DataFrame unit of km/h
+    dataframe['heading'] = compass_bearing(dataframe.lat.values, dataframe.lon.values)
 
-    u_g = V_g * np.sin(np.radians(dataframe['heading']))
-    v_g = V_g * np.cos(np.radians(dataframe['heading']))
+    # ship ground speed in mission DataFrame unit of km/h
+    u_g, v_g = platform_velocity(dataframe['speed'].values, dataframe['heading'].values)
 
-    def read_and_match_one_year_current(year, df, file_dir):
-        dataframe = df[df.index.year == year]
+    current_u = np.empty(len(dataframe))
+    current_v = np.empty(len(dataframe))
+    years = dataframe.index.year
+    for year in np.unique(years):
+        one_year = years == year
         dataset_file_dir = os.path.expanduser(file_dir + 'oscar_vel{}.nc'.format(year))
-        dataset = xr.open_dataset(dataset_file_dir)
-        time_index, lat_index, lon_index = (
-            dataframe.index,
-            dataframe.lat.tolist(),
-            (dataframe.lon + 200).tolist(),
-        )
-
-        u_speed_list = []
-        v_speed_list = []
-        for time, lat, lon in zip(time_index, lat_index, lon_index):
-            selected_data = dataset.sel(
-                time=time, latitude=lat, longitude=lon, depth=15, method='nearest'
-            )
-            u_speed = selected_data.u.values.tolist()
-            v_speed = selected_data.v.values.tolist()
-            u_speed_list.append(u_speed)
-            v_speed_list.append(v_speed)
-
-        return u_speed_list, v_speed_list
-
-    start_year = dataframe.index[0].year
-    end_year = dataframe.index[-1].year
-
-    if start_year != end_year:
-        year_range = range(start_year, end_year + 1)
-        u_speed_list = []
-        v_speed_list = []
-        for year in year_range:
-            u_speed_one_year, v_speed_one_year = read_and_match_one_year_current(
-                year, dataframe, file_dir
-            )
-            u_speed_list += u_speed_one_year
-            v_speed_list += v_speed_one_year
-
-    else:
-        u_speed_list, v_speed_list = read_and_match_one_year_current(
-            start_year, dataframe, file_dir
+        current_u[one_year], current_v[one_year] = sample_ocean_current(
+            open_oscar_dataset(dataset_file_dir),
+            dataframe.index[one_year],
+            dataframe.lat.values[one_year],
+            dataframe.lon.values[one_year] + 200,
+            interpolation,
         )
 
-    dataframe['current_u'] = u_speed_list
-    dataframe['current_v'] = v_speed_list
+    dataframe['current_u'] = current_u
+    dataframe['current_v'] = current_v
 
     dataframe['current_u'].fillna(dataframe['current_u'].mean(), inplace=True)
     dataframe['current_v'].fillna(dataframe['current_v'].mean(), inplace=True)
@@ -0,0 +1,184 @@
+import os
+import configparser
+import numpy as np
+from scipy.interpolate import PchipInterpolator
+from PyResis.propulsion_power import cr, cr_nearest, frictional_resistance_coef, froude_number
+
+from D3HRE.core.get_hash import hash_value
+
+config = configparser.ConfigParser()
+config_file_path = os.path.expanduser('~/.d3hre')
+config.read(config_file_path)
+
+# Default folder of the power tables, next to the MERRA-2 data
+PROPULSION_TABLE_DIR = os.path.join(config['MERRA2']['Datadir'], 'propulsion_power')
+
+# Speeds (m/s) where the power curve of a vehicle is tabulated, faster speeds are evaluated directly
+TABLE_SPEED = np.linspace(0, 10, 1001)
+# Increase when the propulsion model changes so that stale tables are not reused
+PROPULSION_TABLE_VERSION = 1
+
+# Power curves already built by this process, shared by every robot object
+_loaded = {}
+
+
+def residual_resistance_coef_array(slenderness, prismatic_coef, froude):
+    """
+    Vectorised residual resistance coefficient, same as PyResis residual_resistance_coef for an array
+    of Froude numbers. If a point is out of the interpolation range, nearest extrapolation is used.
+
+    :param slenderness: float slenderness coefficient of the ship
+    :param prismatic_coef: float prismatic coefficient of the ship
+    :param froude: array like Froude number of the ship
+    :return: np array residual resistance coefficient
+    """
+    froude = np.atleast_1d(np.asarray(froude, dtype=float))
+    points = np.column_stack([
+        np.full(froude.shape, slenderness, dtype=float),
+        np.full(froude.shape, prismatic_coef, dtype=float),
+        froude,
+    ])
+    Cr = cr(points)
+    out_of_range = np.isnan(Cr)
+    if out_of_range.any():
+        Cr[out_of_range] = cr_nearest(points[out_of_range])
+    return Cr
+
+
+def resistance_array(vehicle, speed):
+    """
+    Resistance of the vehicle at every speed of an array, the vehicle is left unchanged.
+
+    :param vehicle: PyResis Ship object with the main dimension assigned
+    :param speed: array like m/s speed through water of the vehicle
+    :return: np array newton resistance of the vehicle
+    """
+    speed = np.atleast_1d(np.asarray(speed, dtype=float))
+    with np.errstate(divide='ignore'):
+        total_resistance_coef = frictional_resistance_coef(vehicle.length, speed) + \
+                                residual_resistance_coef_array(vehicle.slenderness_coefficient,
+                                                               vehicle.prismatic_coefficient,
+                                                               froude_number(speed, vehicle.length))
+    return 1 / 2 * total_resistance_coef * 1025 * vehicle.surface_area * speed ** 2
+
+
+def propulsion_power(vehicle, speed, propulsion_eff=0.7, sea_margin=0.2):
+    """
+    Total propulsion power of the vehicle for an array of speeds. Vectorised equivalent of setting
+    vehicle.speed and calling vehicle.prop_power() for every speed, without mutating the vehicle, so a
+    vehicle can be shared by parallel workers.
+
+    :param vehicle: PyResis Ship object with the main dimension assigned
+    :param speed: array like m/s speed through water of the vehicle
+    :param propulsion_eff: Shaft efficiency of the ship
+    :param sea_margin: Sea margin take account of interaction between ship and the sea, e.g. wave
+    :return: np array Watts shaft propulsion power of the vehicle
+    """
+    speed = np.atleast_1d(np.asarray(speed, dtype=float))
+    return (1 + sea_margin) * resistance_array(vehicle, speed) * speed / propulsion_eff
+
+
+class PropulsionPowerTable:
+    """
+    Propulsion power table keeps the speed to power curve of vehicles on disk.
+
+    Propulsion power of a hull only depends on its speed, so the power is tabulated once on
+    TABLE_SPEED and saved as a .npy file named by the hash of the hull dimensions. Later missions,
+    ocean current scenarios and route sweeps with the same hull interpolate the curve with a monotone
+    piecewise cubic (PCHIP) instead of evaluating the resistance model again.
+    """
+    def __init__(self, directory):
+        """
+        :param directory: str, folder where the power tables are stored
+        """
+        self.directory = os.path.expanduser(directory)
+
+    def get_key(self, vehicle, propulsion_eff=0.7, sea_margin=0.2):
+        """
+        Get the key of the power table.
+
+        :param vehicle: PyResis Ship object with the main dimension assigned
+        :param propulsion_eff: Shaft efficiency of the ship
+        :param sea_margin: Sea margin take account of interaction between ship and the sea
+        :return: str, hash value of the hull dimensions and the tabulated speeds
+        """
+        hull = (vehicle.length, vehicle.draught, vehicle.beam,
+                vehicle.slenderness_coefficient, vehicle.prismatic_coefficient)
+        speed = (TABLE_SPEED[0], TABLE_SPEED[-1], len(TABLE_SPEED))
+        return hash_value((PROPULSION_TABLE_VERSION, hull, speed, propulsion_eff, sea_margin))
+
+    def get_path(self, key):
+        """
+        :param key: str, key of the power table
+        :return: str, path of the .npy file
+        """
+        return os.path.join(self.directory, key + '.npy')
+
+    def load(self, key):
+        """
+        Load the power curve.
+
+        :param key: str, key of the power table
+        :return: PchipInterpolator or None if the table has not been stored
+        """
+        location = (self.directory, key)
+        if location in _loaded:
+            return _loaded[location]
+
+        path = self.get_path(key)
+        if not os.path.isfile(path):
+            return None
+        curve = PchipInterpolator(TABLE_SPEED, np.load(path), extrapolate=False)
+        _loaded[location] = curve
+        return curve
+
+    def save(self, key, power):
+        """
+        Save the power table. The file is written under a temporary name and renamed, so concurrent
+        workers never read a partially written table.
+
+        :param key: str, key of the power table
+        :param power: array like Watts propulsion power at TABLE_SPEED
+        :return: PchipInterpolator, the stored power curve
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.get_path(key)
+        temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temporary_path, 'wb') as f:
+            np.save(f, np.asarray(power, dtype=np.float64))
+        os.replace(temporary_path, path)
+        _loaded.pop((self.directory, key), None)
+        return self.load(key)
+
+    def get_curve(self, vehicle, propulsion_eff=0.7, sea_margin=0.2):
+        """
+        Get the power curve of the vehicle, the table is built and stored on the first call.
+
+        :param vehicle: PyResis Ship object with the main dimension assigned
+        :param propulsion_eff: Shaft efficiency of the ship
+        :param sea_margin: Sea margin take account of interaction between ship and the sea
+        :return: PchipInterpolator, speed (m/s) to Watts propulsion power
+        """
+        key = self.get_key(vehicle, propulsion_eff, sea_margin)
+        curve = self.load(key)
+        if curve is None:
+            curve = self.save(key, propulsion_power(vehicle, TABLE_SPEED, propulsion_eff, sea_margin))
+        return curve
+
+    def power(self, vehicle, speed, propulsion_eff=0.7, sea_margin=0.2):
+        """
+        Propulsion power of the vehicle for an array of speeds from the power table, speeds out of
+        the table are evaluated with propulsion_power.
+
+        :param vehicle: PyResis Ship object with the main dimension assigned
+        :param speed: array like m/s speed through water of the vehicle
+        :param propulsion_eff: Shaft efficiency of the ship
+        :param sea_margin: Sea margin take account of interaction between ship and the sea
+        :return: np array Watts shaft propulsion power of the vehicle
+        """
+        speed = np.atleast_1d(np.asarray(speed, dtype=float))
+        power = self.get_curve(vehicle, propulsion_eff, sea_margin)(speed)
+        out_of_table = np.isnan(power)
+        if out_of_table.any():
+            power[out_of_table] = propulsion_power(vehicle, speed[out_of_table], propulsion_eff, sea_margin)
+        return power
@@ -0,0 +1,136 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+
+# Increase when the layout of the stored resource changes so that old stores are not misread
+RESOURCE_STORE_VERSION = 1
+
+
+class ResourceStore:
+    """
+    Resource store keeps the compact resource of a mission on disk column by column.
+
+    Every column of the time-indexed resource dataFrame is saved as a .npy file in a folder named by
+    the mission ID, with the index and a metadata file of the schema version, mission ID and columns.
+    Columns are read back memory-mapped, so only the columns that are used are read from disk and
+    simulations on the same machine share the pages of the operating system cache.
+    """
+    def __init__(self, directory):
+        """
+        :param directory: str, folder where the resource of missions are stored
+        """
+        self.directory = os.path.expanduser(directory)
+
+    def get_path(self, mission_ID):
+        """
+        :param mission_ID: str, unique identifier of the mission
+        :return: str, folder of the mission resource
+        """
+        return os.path.join(self.directory, mission_ID + 'resource')
+
+    def get_legacy_path(self, mission_ID):
+        """
+        :param mission_ID: str, unique identifier of the mission
+        :return: str, path of the pickled resource of earlier versions
+        """
+        return os.path.join(self.directory, mission_ID + 'resource.pkl')
+
+    def read_metadata(self, mission_ID):
+        """
+        :param mission_ID: str, unique identifier of the mission
+        :return: dict of schema_version, mission_ID, columns and length or None if the resource is not
+            stored in the current schema
+        """
+        try:
+            with open(os.path.join(self.get_path(mission_ID), 'metadata.json'), 'r') as f:
+                metadata = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if metadata.get('schema_version') != RESOURCE_STORE_VERSION:
+            return None
+        return metadata
+
+    def exists(self, mission_ID):
+        """
+        Check if the resource of the mission is stored, a resource pickled by earlier versions is migrated.
+
+        :param mission_ID: str, unique identifier of the mission
+        :return: bool
+        """
+        if self.read_metadata(mission_ID) is not None:
+            return True
+        if os.path.isfile(self.get_legacy_path(mission_ID)):
+            self.save(mission_ID, pd.read_pickle(self.get_legacy_path(mission_ID)))
+            return True
+        return False
+
+    def load_arrays(self, mission_ID, columns=None):
+        """
+        Load columns of the resource as memory-mapped read only arrays without any copy.
+
+        :param mission_ID: str, unique identifier of the mission
+        :param columns: optional list of str, columns to load, default all columns
+        :return: tuple, np array of the UTC index and dict of column name to np array
+        """
+        if not self.exists(mission_ID):
+            raise IOError('Resource of mission {} is not stored'.format(mission_ID))
+        metadata = self.read_metadata(mission_ID)
+        if columns is None:
+            columns = metadata['columns']
+        missing = set(columns) - set(metadata['columns'])
+        if missing:
+            raise KeyError('Columns not found in resource: {}'.format(sorted(missing)))
+
+        path = self.get_path(mission_ID)
+        index = np.load(os.path.join(path, 'index.npy'), mmap_mode='r')
+        arrays = {
+            column: np.load(os.path.join(path, column + '.npy'), mmap_mode='r') for column in columns
+        }
+        return index, arrays
+
+    def load(self, mission_ID, columns=None):
+        """
+        Load the resource of the mission.
+
+        :param mission_ID: str, unique identifier of the mission
+        :param columns: optional list of str, columns to load, default all columns
+        :return: pandas dataFrame, UTC indexed resource
+        """
+        index, arrays = self.load_arrays(mission_ID, columns)
+        resource_df = pd.DataFrame(arrays, index=pd.DatetimeIndex(index, name='utc'))
+        return resource_df
+
+    def save(self, mission_ID, resource_df):
+        """
+        Save the resource of the mission. The columns are written into a temporary folder which is then
+        renamed, so concurrent readers never see a partially written resource.
+
+        :param mission_ID: str, unique identifier of the mission
+        :param resource_df: pandas dataFrame, UTC indexed resource
+        :return: None
+        """
+        path = self.get_path(mission_ID)
+        temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+        os.makedirs(temporary_path, exist_ok=True)
+
+        np.save(os.path.join(temporary_path, 'index.npy'), resource_df.index.values.astype('datetime64[ns]'))
+        for column in resource_df.columns:
+            np.save(os.path.join(temporary_path, column + '.npy'), resource_df[column].values)
+        metadata = {
+            'schema_version': RESOURCE_STORE_VERSION,
+            'mission_ID': mission_ID,
+            'columns': [str(column) for column in resource_df.columns],
+            'length': len(resource_df),
+        }
+        with open(os.path.join(temporary_path, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f, indent=1)
+
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rename(temporary_path, path)
+        except OSError:
+            # Stored by another process in the meantime
+            shutil.rmtree(temporary_path, ignore_errors=True)
@@ -0,0 +1,90 @@
+import os
+import numpy as np
+from collections import OrderedDict
+
+from D3HRE.core.get_hash import hash_value
+
+# Unit (per m^2) generation arrays that are kept for each mission and transducer configuration
+UNIT_POWER_FIELDS = ['wind_raw', 'wind_correction', 'diffuse_fraction', 'solar_power_unit']
+# Increase when the generation models change so that stale arrays are not reused
+UNIT_POWER_VERSION = 4
+
+# Arrays already loaded by this process, shared by every simulation object, the least recently
+# used missions are dropped first
+_loaded = OrderedDict()
+MAX_LOADED = 32
+
+
+class UnitPowerStore:
+    """
+    Unit power store keeps the unit area wind and solar generation of a mission on disk.
+
+    Every field is saved as a .npy file under a folder named by the hash of the mission ID and the
+    transducer configuration. The arrays are read back memory-mapped, so optimiser worker processes and
+    later runs on the same mission reuse them instead of running the generation models again.
+    """
+    def __init__(self, directory):
+        """
+        :param directory: str, folder where the unit power arrays are stored
+        """
+        self.directory = os.path.expanduser(directory)
+
+    def get_key(self, mission_ID, transducer):
+        """
+        Get the key of the unit power arrays.
+
+        :param mission_ID: str, unique identifier of the mission
+        :param transducer: tuple, parameters of the wind and solar transducers
+        :return: str, hash value of the mission and transducer configuration
+        """
+        return hash_value((UNIT_POWER_VERSION, mission_ID, transducer))
+
+    def get_path(self, key, field):
+        """
+        :param key: str, key of the unit power arrays
+        :param field: str, one of UNIT_POWER_FIELDS
+        :return: str, path of the .npy file
+        """
+        return os.path.join(self.directory, key, field + '.npy')
+
+    def load(self, key):
+        """
+        Load the unit power arrays, the arrays are memory-mapped read only.
+
+        :param key: str, key of the unit power arrays
+        :return: dict of np arrays or None if the arrays have not been stored
+        """
+        location = (self.directory, key)
+        if location in _loaded:
+            _loaded.move_to_end(location)
+            return _loaded[location]
+
+        paths = [self.get_path(key, field) for field in UNIT_POWER_FIELDS]
+        if not all(os.path.isfile(path) for path in paths):
+            return None
+        unit_power = {
+            field: np.load(path, mmap_mode='r') for field, path in zip(UNIT_POWER_FIELDS, paths)
+        }
+        _loaded[location] = unit_power
+        while len(_loaded) > MAX_LOADED:
+            _loaded.popitem(last=False)
+        return unit_power
+
+    def save(self, key, unit_power):
+        """
+        Save the unit power arrays. Files are written under a temporary name and renamed, so concurrent
+        workers never read a partially written array.
+
+        :param key: str, key of the unit power arrays
+        :param unit_power: dict of array like, contains all UNIT_POWER_FIELDS
+        :return: dict of np arrays, the stored arrays
+        """
+        os.makedirs(os.path.join(self.directory, key), exist_ok=True)
+        for field in UNIT_POWER_FIELDS:
+            path = self.get_path(key, field)
+            temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+            with open(temporary_path, 'wb') as f:
+                np.save(f, np.asarray(unit_power[field], dtype=np.float64))
+            os.replace(temporary_path, path)
+        _loaded.pop((self.directory, key), None)
+        return self.load(key)
@@ -1,13 +1,14 @@
-import glob
 import os
 import configparser
+import netCDF4
 import numpy as np
 import pandas as pd
-import xarray as xr
+from concurrent.futures import ProcessPoolExecutor
 
 
 from opendap_download.multi_processing_download import DownloadManager
 from D3HRE.core.weather_data_processing import resource_df_processing
+from D3HRE.core.resource_store import ResourceStore
 
 
 config = configparser.ConfigParser()
@@ -37,6 +38,38 @@ except KeyError:
 # 3. From user input
 
 
+# MERRA-2 data collections: (OPeNDAP base URL, dataset name, parameters)
+DATA_SETS = {
+    'solar': (
+        'https://goldsmr4.gesdisc.eosdis.nasa.gov/opendap/MERRA2/M2T1NXRAD.5.12.4/',
+        'tavg1_2d_rad_Nx',
+        ['SWGDN', 'SWTDN'],
+    ),
+    'wind': (
+        'https://goldsmr4.gesdisc.eosdis.nasa.gov/opendap/MERRA2/M2T1NXSLV.5.12.4/',
+        'tavg1_2d_slv_Nx',
+        ['U2M', 'U10M', 'U50M', 'V2M', 'V10M', 'V50M', 'DISPH', 'T2M'],
+    ),
+    'pressure': (
+        'https://goldsmr4.gesdisc.eosdis.nasa.gov/opendap/MERRA2/M2T1NXSLV.5.12.4/',
+        'tavg1_2d_slv_Nx',
+        ['PS'],
+    ),
+    'airdensity': (
+        'http://goldsmr4.gesdisc.eosdis.nasa.gov/opendap/MERRA2/M2T1NXFLX.5.12.4/',
+        'tavg1_2d_flx_Nx',
+        ['RHOA'],
+    ),
+}
+
+# Number of latitude and longitude points of the MERRA-2 grid
+MERRA2_GRID_SHAPE = (361, 576)
+# Bytes of a single value of a MERRA-2 parameter (float32)
+MERRA2_VALUE_BYTES = 4
+# Number of processes decoding the downloaded files
+DECODE_WORKERS = min(4, os.cpu_count() or 1)
+
+
 def generate_single_download_link(start, end, lat_lon, data_set=None):
     """
     Generate download URL at a period with given latitude and longitude.
@@ -45,36 +78,14 @@ def generate_single_download_link(start, end, lat_lon, data_set=None):
 
     :param start: timestamp of start time in UTC
     :param end: timestamp of end time in UTC
-    :param lat_lon: tuple of (lat, lon)
+    :param lat_lon: tuple of (lat, lon) grid index, or (lat, lon) index range in the format of 'start:end'
     :param data_set: str the dataset to be download support 'solar', 'wind', 'pressure'
                     and 'airdensity'
     :return: string the URL for the download of netCDF4 files
     """
-    if data_set == 'solar':
-        BASE_URL = (
-            'https://goldsmr4.gesdisc.eosdis.nasa.gov/opendap/MERRA2/M2T1NXRAD.5.12.4/'
-        )
-        dataset_name = 'tavg1_2d_rad_Nx'
-        parameters = ['SWGDN', 'SWTDN']
-    elif data_set == 'wind':
-        BASE_URL = (
-            'https://goldsmr4.gesdisc.eosdis.nasa.gov/opendap/MERRA2/M2T1NXSLV.5.12.4/'
-        )
-        dataset_name = 'tavg1_2d_slv_Nx'
-        parameters = ['U2M', 'U10M', 'U50M', 'V2M', 'V10M', 'V50M', 'DISPH', 'T2M']
-    elif data_set == 'pressure':
-        BASE_URL = (
-            'https://goldsmr4.gesdisc.eosdis.nasa.gov/opendap/MERRA2/M2T1NXSLV.5.12.4/'
-        )
-        dataset_name = 'tavg1_2d_slv_Nx'
-        parameters = ['PS']
-    elif data_set == 'airdensity':
-        BASE_URL = (
-            'http://goldsmr4.gesdisc.eosdis.nasa.gov/opendap/MERRA2/M2T1NXFLX.5.12.4/'
-        )
-        dataset_name = 'tavg1_2d_flx_Nx'
-        parameters = ['RHOA']
-    else:
+    try:
+        BASE_URL, dataset_name, parameters = DATA_SETS[data_set]
+    except KeyError:
         print('Not supported yet')
 
     def translate_year_to_file_number(year):
@@ -136,57 +147,265 @@ def generate_single_download_link(start, end, lat_lon, data_set=None):
     return url
 
 
-def download_URL(mission, data_set='solar', debug=False):
-    def nearest_point(lat_lon):
-        """
-        The source for this formula is in the MERRA2
-        Variable Details - File specifications for GEOS pdf file.
-        The Grid in the documentation has points from 1 to 361 and 1 to 576.
-        The MERRA-2 Portal uses 0 to 360 and 0 to 575.
+def grid_index(lat, lon):
+    """
+    Nearest MERRA-2 grid point of the given coordinates. The source for this formula is in the MERRA2
+    Variable Details - File specifications for GEOS pdf file. The Grid in the documentation has points
+    from 1 to 361 and 1 to 576. The MERRA-2 Portal uses 0 to 360 and 0 to 575.
 
-        :param lat_lon: tuple (lat, lon)
-        :return: nearest coordinates tuple
-        """
-        lat, lon = lat_lon
-        lat_raw = (lat + 90) / 0.5
-        lon_raw = (lon + 180) / 0.625
+    :param lat: array like latitude
+    :param lon: array like longitude
+    :return: tuple of np arrays, latitude and longitude grid index
+    """
+    lat_raw = (np.asarray(lat, dtype=float) + 90) / 0.5
+    lon_raw = (np.asarray(lon, dtype=float) + 180) / 0.625
+    # Round half down to the closest grid point
+    lat_index = np.clip(np.ceil(lat_raw - 0.5), 0, MERRA2_GRID_SHAPE[0] - 1).astype(int)
+    lon_index = np.clip(np.ceil(lon_raw - 0.5), 0, MERRA2_GRID_SHAPE[1] - 1).astype(int)
+    return lat_index, lon_index
 
-        lat_coords = np.arange(0, 361, dtype=int)
-        lon_coords = np.arange(0, 576, dtype=int)
 
-        def find_closest_coordinate(calc_coord, coord_array):
-            index = np.abs(coord_array - calc_coord).argmin()
-            return coord_array[index]
+def plan_download(mission, data_set='solar', max_cells=100):
+    """
+    Plan the MERRA-2 download of a mission. The resource at mission time t is the hourly average of
+    the hour before t at the grid point of the mission position at t. Hours of the same day are merged
+    into a request of the bounding box of their grid points, a new request is started when the box
+    would exceed max_cells grid points (e.g. when the route crosses the date line).
+
+    :param mission: pandas dataFrame, hourly UTC indexed mission with lat and lon fields
+    :param data_set: str the dataset to be download support 'solar', 'wind', 'pressure' and 'airdensity'
+    :param max_cells: int maximum number of grid points of a request
+    :return: tuple of pandas dataFrames, the plan with one request per row (start, end, lat_start,
+        lat_end, lon_start, lon_end, hours, cells, estimated_bytes, url) and the selection with the
+        request, time_offset, lat_offset and lon_offset of the resource at each mission time
+    """
+    parameters = DATA_SETS[data_set][2]
+    times = mission.index[:-1]
+    lat_index, lon_index = grid_index(mission.lat.values[1:], mission.lon.values[1:])
+    days = times.normalize()
+
+    requests = []
+    start = 0
+    lat_min = lat_max = lat_index[0]
+    lon_min = lon_max = lon_index[0]
+    for i in range(1, len(times) + 1):
+        if i < len(times) and days[i] == days[start]:
+            box = (min(lat_min, lat_index[i]), max(lat_max, lat_index[i]),
+                   min(lon_min, lon_index[i]), max(lon_max, lon_index[i]))
+            if (box[1] - box[0] + 1) * (box[3] - box[2] + 1) <= max_cells:
+                lat_min, lat_max, lon_min, lon_max = box
+                continue
+        requests.append((start, i, lat_min, lat_max, lon_min, lon_max))
+        if i < len(times):
+            start = i
+            lat_min = lat_max = lat_index[i]
+            lon_min = lon_max = lon_index[i]
+
+    plan = pd.DataFrame(requests, columns=['first', 'stop', 'lat_start', 'lat_end', 'lon_start', 'lon_end'])
+    plan['start'] = times[plan['first']]
+    plan['end'] = times[plan['stop'] - 1]
+    plan['hours'] = plan['stop'] - plan['first']
+    plan['cells'] = (plan.lat_end - plan.lat_start + 1) * (plan.lon_end - plan.lon_start + 1)
+    plan['estimated_bytes'] = plan.hours * plan.cells * len(parameters) * MERRA2_VALUE_BYTES
+
+    def index_range(first, last):
+        return first if first == last else '{}:{}'.format(first, last)
+
+    plan['url'] = [
+        generate_single_download_link(
+            r.start, r.end + pd.Timedelta(hours=1),
+            (index_range(r.lat_start, r.lat_end), index_range(r.lon_start, r.lon_end)), data_set
+        ) for r in plan.itertuples()
+    ]
+
+    request = np.repeat(np.arange(len(plan)), plan.hours.values)
+    selection = pd.DataFrame({
+        'request': request,
+        'time_offset': np.arange(len(times)) - plan['first'].values[request],
+        'lat_offset': lat_index - plan.lat_start.values[request],
+        'lon_offset': lon_index - plan.lon_start.values[request],
+    }, index=mission.index[1:])
+
+    plan = plan[['start', 'end', 'lat_start', 'lat_end', 'lon_start', 'lon_end',
+                 'hours', 'cells', 'estimated_bytes', 'url']]
+    return plan, selection
 
-        lat_co = find_closest_coordinate(lat_raw, lat_coords)
-        lon_co = find_closest_coordinate(lon_raw, lon_coords)
-        return lat_co, lon_co
 
-    download_df = mission.copy()
-    download_df = download_df.reset_index().rename(columns={'index': 'utc'})
-    download_df['lat_lon'] = (
-        download_df[['lat', 'lon']].apply(tuple, axis=1).apply(nearest_point)
-    )
-    a = download_df.groupby('lat_lon').first().reset_index().set_index('utc')
-    b = download_df.set_index('utc').resample('1D').ffill()
-    c = download_df.groupby('lat_lon').last().reset_index().set_index('utc')
-    #
-    # a ----> Start time of query at a location
-    #    b ----> End of day insert if a->c is over night
-    # c ----> End time of query at a location
-    #
-    download_index = pd.concat([a, b, c], axis=1)['lat_lon'].iloc[:, 0].ffill()
+def download_URL(mission, data_set='solar', debug=False):
+    """
+    Generate the download URLs of a mission, see plan_download.
+
+    :param mission: pandas dataFrame, hourly UTC indexed mission with lat and lon fields
+    :param data_set: str the dataset to be download
+    :param debug: bool return the first and last hour of the planned download instead of URLs
+    :return: list of str URLs
+    """
+    plan, _ = plan_download(mission, data_set)
     if debug:
-        return download_index.index[0], download_index.index[-1]
+        return plan.start.iloc[0], plan.end.iloc[-1] + pd.Timedelta(hours=1)
     else:
-        generated_URLs = []
-        for start, end, lat_lon in zip(
-            download_index.index[:-1], download_index.index[1:], download_index[1:]
-        ):
-            generated_URLs.append(
-                generate_single_download_link(start, end, lat_lon, data_set)
-            )
-        return generated_URLs
+        return plan.url.tolist()
+
+
+def _read_request(file, parameters, time_offset, lat_offset, lon_offset):
+    """
+    Read the selected hours and grid points of a downloaded request.
+
+    :param file: str, netCDF file of the request
+    :param parameters: list of str, parameters to read
+    :param time_offset: np array, time index of each selected resource in the request
+    :param lat_offset: np array, latitude index of each selected resource in the request
+    :param lon_offset: np array, longitude index of each selected resource in the request
+    :return: tuple, np array of the start of the averaging hour and dict of parameter to np array
+    """
+    with netCDF4.Dataset(file) as dataset:
+        time = dataset['time']
+        times = netCDF4.num2date(
+            time[:], time.units, calendar=getattr(time, 'calendar', 'standard'),
+            only_use_cftime_datetimes=False, only_use_python_datetimes=True
+        )
+        hours = pd.DatetimeIndex(np.asarray(times)[time_offset]).floor('H').values
+        values = {
+            parameter: np.ma.filled(dataset[parameter][:].astype(float), np.nan)[time_offset, lat_offset, lon_offset]
+            for parameter in parameters
+        }
+    return hours, values
+
+
+def assemble_resource(plan, selection, files, data_set='solar', workers=1):
+    """
+    Assemble the resource of the mission from the downloaded requests of a plan. Every file is read
+    straight into preallocated arrays, the hour of every value is checked against the mission time.
+
+    :param plan: pandas dataFrame, download plan from plan_download or TileCache.plan
+    :param selection: pandas dataFrame, resource selection from plan_download or TileCache.plan
+    :param files: list of str, downloaded netCDF file of each request in the plan
+    :param data_set: str the downloaded dataset
+    :param workers: int, number of processes decoding the files
+    :return: pandas dataFrame, time-indexed resource of all parameters of the dataset
+    """
+    parameters = DATA_SETS[data_set][2]
+    resource = {parameter: np.empty(len(selection)) for parameter in parameters}
+    hours = np.empty(len(selection), dtype='datetime64[ns]')
+
+    request = selection.request.values
+    rows = [np.where(request == i)[0] for i in range(len(files))]
+    arguments = [
+        (file, parameters) + tuple(selection[field].values[r] for field in ['time_offset', 'lat_offset', 'lon_offset'])
+        for file, r in zip(files, rows)
+    ]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_read_request, *zip(*arguments))
+            for r, (request_hours, values) in zip(rows, results):
+                hours[r] = request_hours
+                for parameter in parameters:
+                    resource[parameter][r] = values[parameter]
+    else:
+        for r, argument in zip(rows, arguments):
+            hours[r], values = _read_request(*argument)
+            for parameter in parameters:
+                resource[parameter][r] = values[parameter]
+
+    # The resource at mission time t is the average of the hour before t
+    expected_hours = (selection.index - pd.Timedelta(hours=1)).values
+    misaligned = np.where(hours != expected_hours)[0]
+    if len(misaligned):
+        raise ValueError('{} data of {} hours is not aligned with the mission time, first at {}'.format(
+            data_set, len(misaligned), selection.index[misaligned[0]]))
+    return pd.DataFrame(resource, index=selection.index)
+
+
+class TileCache:
+    """
+    Regional MERRA-2 tile cache shared by all missions.
+
+    A tile is one day of a dataset over a block of tile_size x tile_size grid points. Tiles are
+    downloaded whole and stored under a path given by (dataset, grid block, date), so missions
+    crossing the same region reuse the tiles instead of downloading the same grid points again.
+    """
+    def __init__(self, directory, tile_size=8):
+        """
+        :param directory: str, folder of the tile cache
+        :param tile_size: int, number of latitude and longitude grid points of a tile
+        """
+        self.directory = os.path.expanduser(directory)
+        self.tile_size = tile_size
+
+    def get_folder(self, data_set, lat_block, lon_block):
+        """
+        :param data_set: str the dataset
+        :param lat_block: int latitude block index of the tile
+        :param lon_block: int longitude block index of the tile
+        :return: str, folder of the tiles of a grid block, one file per day
+        """
+        return os.path.join(self.directory, data_set, '{:03d}_{:03d}'.format(lat_block, lon_block))
+
+    def plan(self, mission, data_set='solar'):
+        """
+        Plan the tiles of a mission, with the same rule of resource at mission time as plan_download.
+
+        :param mission: pandas dataFrame, hourly UTC indexed mission with lat and lon fields
+        :param data_set: str the dataset to be download
+        :return: tuple of pandas dataFrames, the plan with one tile per row (date, lat_block, lon_block,
+            lat_start, lat_end, lon_start, lon_end, cells, estimated_bytes, url, path, cached) and the
+            selection with the request (tile), time_offset, lat_offset and lon_offset of the resource at
+            each mission time
+        """
+        parameters = DATA_SETS[data_set][2]
+        times = mission.index[:-1]
+        lat_index, lon_index = grid_index(mission.lat.values[1:], mission.lon.values[1:])
+        keys = pd.DataFrame({
+            'date': times.normalize(),
+            'lat_block': lat_index // self.tile_size,
+            'lon_block': lon_index // self.tile_size,
+        })
+        plan = keys.drop_duplicates().reset_index(drop=True)
+        request = pd.MultiIndex.from_frame(plan).get_indexer(pd.MultiIndex.from_frame(keys))
+
+        plan['lat_start'] = plan.lat_block * self.tile_size
+        plan['lat_end'] = np.minimum(plan.lat_start + self.tile_size, MERRA2_GRID_SHAPE[0]) - 1
+        plan['lon_start'] = plan.lon_block * self.tile_size
+        plan['lon_end'] = np.minimum(plan.lon_start + self.tile_size, MERRA2_GRID_SHAPE[1]) - 1
+        plan['cells'] = (plan.lat_end - plan.lat_start + 1) * (plan.lon_end - plan.lon_start + 1)
+        plan['estimated_bytes'] = 24 * plan.cells * len(parameters) * MERRA2_VALUE_BYTES
+        plan['url'] = [
+            generate_single_download_link(
+                r.date, r.date + pd.Timedelta(days=1),
+                ('{}:{}'.format(r.lat_start, r.lat_end), '{}:{}'.format(r.lon_start, r.lon_end)), data_set
+            ) for r in plan.itertuples()
+        ]
+        plan['path'] = [
+            os.path.join(self.get_folder(data_set, r.lat_block, r.lon_block), DownloadManager.get_filename(r.url))
+            for r in plan.itertuples()
+        ]
+        plan['cached'] = [os.path.isfile(path) for path in plan.path]
+
+        selection = pd.DataFrame({
+            'request': request,
+            'time_offset': times.hour,
+            'lat_offset': lat_index - plan.lat_start.values[request],
+            'lon_offset': lon_index - plan.lon_start.values[request],
+        }, index=mission.index[1:])
+        return plan, selection
+
+    def download(self, plan, download_manager, n=NUMBER_OF_CONNECTIONS):
+        """
+        Download the tiles of a plan that are not cached yet.
+
+        :param plan: pandas dataFrame, tile plan from TileCache.plan
+        :param download_manager: DownloadManager with username and password set
+        :param n: number of concurrent multiprocess download
+        :return: list of str URLs that failed to download
+        """
+        failed_urls = []
+        missing = plan[~plan.cached]
+        for folder, tiles in missing.groupby(missing.path.map(os.path.dirname)):
+            download_manager.download_path = folder
+            download_manager.download_urls = tiles.url.tolist()
+            failed_urls += download_manager.start_download(n)
+        plan['cached'] = [os.path.isfile(path) for path in plan.path]
+        return failed_urls
 
 
 def resource_df_download(
@@ -195,6 +414,8 @@ def resource_df_download(
     password=PASSWORD,
     n=NUMBER_OF_CONNECTIONS,
     data_dir=MERRA2_DATA_DIR,
+    tile_cache=None,
+    columns=None,
 ):
     """
     Resource dataFrame download function.
@@ -206,98 +427,72 @@ def resource_df_download(
     :param username: username of NASA earthdata portal
     :param password: password of NASA earthdata portal
     :param n: number of concurrent multiprocess download (adjust the number to avoid been banned)
+    :param data_dir: str, folder of the compact resource store
+    :param tile_cache: optional TileCache, download regional tiles shared by all missions instead of the
+        merged requests of this mission
+    :param columns: optional list of str, only load these columns of the resource, default all columns
     :return: raw resource dataFrame, time-indexed Pandas dataFrame including all requested field
     """
     mission_df = mission.df
     ID = mission.ID
 
-    folder = os.path.expanduser(data_dir + ID)
-    file_name = folder + 'resource.pkl'
-
-    # Check if compact pandas data frame file have already been prepared
-    # if so, load the file and skip file download and processing.
+    # Check if compact resource have already been prepared
+    # if so, load the columns and skip file download and processing.
+    resource_store = ResourceStore(data_dir)
 
-    if os.path.isfile(file_name):
-        resource_df = pd.read_pickle(file_name)
-    else:
-        # If there is no resource file start teh download
+    if not resource_store.exists(ID):
+        # If there is no resource file download the planned requests of the mission, or the
+        # regional tiles with a tile cache. Completed files are skipped and partial files are resumed
+        print('Compact data not found, automatic download and processing starting ...')
         download_manager = DownloadManager()
         download_manager.set_username_and_password(username, password)
-        download_manager.download_path = folder + '/download_wind'
-        download_manager.download_urls = download_URL(mission_df, data_set='wind')
-        if not os.path.exists(download_manager.download_path):
-            print('Wind data not found, automatic download starting ...')
-            download_manager.start_download(n)
-
-        download_manager.download_path = folder + '/download_solar'
-        download_manager.download_urls = download_URL(mission_df, data_set='solar')
-        if not os.path.exists(download_manager.download_path):
-            print('Solar data not found, automatic download starting ...')
-            download_manager.start_download(n)
-
-        # Process when necessary
-        if not os.path.isfile(file_name):
-            print('Compact data not found, automatic processing starting ...')
-            wind_files = sorted(glob.glob(folder + '/download_wind/MERRA*'))
-            # Sort file to make sure time is aligned
-            file_size = np.array(
-                [os.path.getsize(wind_file) for wind_file in wind_files]
-            )
-            corrupted_files = (file_size < 60000).sum()
-            if corrupted_files == 0:
-                print("Wind data file completeness check pass")
+        data_frames = {}
+        for data_set in ['solar', 'wind']:
+            if tile_cache is None:
+                plan, selection = plan_download(mission_df, data_set=data_set)
+                download_manager.download_path = os.path.join(
+                    os.path.expanduser(data_dir), ID + 'download', data_set
+                )
+                download_manager.download_urls = plan.url.tolist()
+                print('Checking {} data, {} requests of {:.1f} MB, automatic download starting ...'.format(
+                    data_set, len(plan), plan.estimated_bytes.sum() / 1e6))
+                failed_urls = download_manager.start_download(n)
+                files = [
+                    os.path.join(download_manager.download_path, download_manager.get_filename(url))
+                    for url in plan.url
+                ]
             else:
-                print("Some wind data corrupted, redownload start...")
-                download_manager.download_path = folder + '/download_wind'
-                URLS = download_URL(mission_df, data_set='wind')
-                url = []
-                for url_index in np.where(file_size < 60000)[0].tolist():
-                    url.append(URLS[url_index])
-                download_manager.download_urls = url
-                download_manager.start_download(n)
-            wind_xdata = xr.open_mfdataset(wind_files, concat_dim='time')
-            wind_df = wind_xdata.to_dataframe()
-
-            solar_files = sorted(glob.glob(folder + '/download_solar/MERRA*'))
-            file_size = np.array(
-                [os.path.getsize(solar_file) for solar_file in solar_files]
+                plan, selection = tile_cache.plan(mission_df, data_set=data_set)
+                print('Checking {} data, {} of {} tiles cached, {:.1f} MB to download ...'.format(
+                    data_set, plan.cached.sum(), len(plan), plan.estimated_bytes[~plan.cached].sum() / 1e6))
+                failed_urls = tile_cache.download(plan, download_manager, n)
+                files = plan.path.tolist()
+            if failed_urls:
+                raise IOError(
+                    '{} {} data files failed to download, run again to resume'.format(len(failed_urls), data_set)
+                )
+            data_frames[data_set] = assemble_resource(
+                plan, selection, files, data_set, workers=min(DECODE_WORKERS, len(plan))
             )
-            corrupted_files = (file_size < 20000).sum()
-            if corrupted_files == 0:
-                print("Solar data file completeness check pass")
-            else:
-                print("Some solar data corrupted, redownloading start...")
-                download_manager.download_path = folder + '/download_solar'
-                URLS = download_URL(mission_df, data_set='solar')
-                url = []
-                for url_index in np.where(file_size < 20000)[0].tolist():
-                    url.append(URLS[url_index])
-                download_manager.download_urls = url
-                download_manager.start_download(n)
-            solar_xdata = xr.open_mfdataset(solar_files, concat_dim='time')
-            solar_df = solar_xdata.to_dataframe()
-
-            resource_df = pd.concat([solar_df, wind_df], axis=1)
-            resource_df.reset_index(drop=True, inplace=True)
-            resource_df['utc'] = mission_df.index[1:]
 
-            resource_df.set_index('utc', inplace=True)
-            resource_df.to_pickle(file_name)
+        resource_df = pd.concat([data_frames['solar'], data_frames['wind']], axis=1)
+        resource_df.index.name = 'utc'
+        resource_store.save(ID, resource_df)
 
-        resource_df = pd.read_pickle(file_name)
-    return resource_df
+    return resource_store.load(ID, columns)
 
 
-def resource_df_download_and_process(mission):
+def resource_df_download_and_process(mission, columns=None):
     """
     Process downloaded MEERA-2 dataFrame.
 
     :param mission: Mission object
+    :param columns: optional list of str, only load these columns of the resource, default all columns
     :return:  time indexed Pandas dataFrame with additional field in temperature (degree C),
         kt(clearness index), V2 (wind speed at 2 metres height), true_wind_direction (degrees),
         heading (degrees), Va (apparent wind speed), apparent_wind_direction(degrees)
     """
-    resource_df = resource_df_download(mission)
+    resource_df = resource_df_download(mission, columns=columns)
     combined_df = pd.concat([mission.df, resource_df], axis=1).bfill()
     # combine mission dataFrame and weather data (resource) dataFrame into a single one
     processed_resource_df = resource_df_processing(combined_df)
@@ -1,7 +1,8 @@
 import ephem
 import math
 import numpy as np
-from D3HRE.core.navigation_utility import calculate_initial_compass_bearing
+from gsee.gsee.solar_position import zenith_cosine
+from D3HRE.core.kinematics_utility import compass_bearing, platform_velocity, apparent_wind, relative_cosine
 
 
 class SolarSystem():
@@ -87,14 +88,10 @@ def resource_df_processing(dataframe):
 
 
     # Clearness index processing
-    zenith_cosine_list = []
-
-    for index, row in dataframe.iterrows():
-        zenith_cosine = calculate_zenith_cosine(index, row.lat, row.lon)
-        zenith_cosine_list.append(zenith_cosine)
-
-    dataframe['zenith_cos'] = zenith_cosine_list
-    dataframe['kt'] = dataframe.SWGDN / (dataframe.SWTDN * zenith_cosine_list)
+    dataframe['zenith_cos'] = zenith_cosine(
+        dataframe.index, dataframe.lat.values, dataframe.lon.values, min_zenith_cosine=0.065
+    )
+    dataframe['kt'] = dataframe.SWGDN / (dataframe.SWTDN * dataframe.zenith_cos)
     # Maximum clearness index for hourly data pvlib
     dataframe.loc[dataframe.kt > 0.82, 'kt'] = 0.82
 
@@ -111,17 +108,9 @@ def resource_df_processing(dataframe):
         np.degrees(np.arctan2(dataframe['U2M'], dataframe['V2M'])) + 360
     ) % 360
 
-    location_list = [tuple(x) for x in dataframe[['lat', 'lon']].values]
-
     # Calculate heading with initial compass bearing
-    heading = []
-    for a, b in zip(location_list[:-1], location_list[1:]):
-        heading.append(calculate_initial_compass_bearing(a, b))
+    dataframe['heading'] = compass_bearing(dataframe.lat.values, dataframe.lon.values)
 
-    heading.append(heading[-1])
-    # As it reach the final way point heading stay unchanged
-
-    dataframe['heading'] = heading
     # apparent wind                 V_{app} = [Uapp,   Vapp] :: Va
     # true wind at 2 metres height V_{true} = [U2M,     V2M] :: V2
     # platform speed vector          V_{sp} = [Up,       Vp] :: Vs
@@ -129,25 +118,12 @@ def resource_df_processing(dataframe):
     #                 V_{app} = V_{true} + (- V_{s})
 
     # Get apparent wind vector and scalar apparent wind speed and direction
-    V_s = dataframe['speed'] / 3.6  # ship speed in DataFrame unit of km/h
-
-    U_p = V_s * np.sin(np.radians(dataframe['heading']))
-    V_p = V_s * np.cos(np.radians(dataframe['heading']))
-
-    U_app = dataframe['U2M'] - U_p
-    V_app = dataframe['V2M'] - V_p
-
-    dataframe['Va'] = np.sqrt(U_app ** 2 + V_app ** 2)
-    dataframe['apparent_wind_direction'] = (
-        np.degrees(np.arctan2(U_app, V_app)) + 360
-    ) % 360
-    V_a = np.array([U_app, V_app]).T
-    V_sp = np.array([U_p, V_p]).T
-
-    wind_cos = []
-    for U, V in zip(V_a, V_sp):
-        wind_cos.append(np.dot(U, V) / np.linalg.norm(U) / np.linalg.norm(V))
-
-    dataframe['relative_wind_cos'] = wind_cos
+    U_p, V_p = platform_velocity(dataframe['speed'].values, dataframe['heading'].values)
+    U_app, V_app, V_a, apparent_wind_direction = apparent_wind(
+        dataframe['U2M'].values, dataframe['V2M'].values, U_p, V_p
+    )
+    dataframe['Va'] = V_a
+    dataframe['apparent_wind_direction'] = apparent_wind_direction
+    dataframe['relative_wind_cos'] = relative_cosine(U_app, V_app, U_p, V_p)
 
     return dataframe
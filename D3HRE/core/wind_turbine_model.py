@@ -35,6 +35,84 @@ def power_from_turbine(wind_speed, area, power_coefficient, cut_in_speed, rated_
     return power
 
 
+def power_from_turbine_array(wind_speed, area, power_coefficient, cut_in_speed, rated_speed):
+    """
+    Array version of power_from_turbine, the idealised turbine model is evaluated on whole wind speed
+    arrays in one NumPy expression. Turbine parameters broadcast against the wind speed, e.g. pass
+    (K, 1) arrays of area or power coefficient with (T,) wind speed to get (K, T) power of K turbine
+    candidates.
+
+    :param wind_speed: array like m/s wind speed at turbine height
+    :param area: float or array like m^2 swept area of wind turbine
+    :param power_coefficient: float or array like dimensionless power coefficient of wind turbine
+    :param cut_in_speed: float or array like m/s minimum speed that turbine will generate power
+    :param rated_speed: float or array like m/s rated speed of wind turbine
+    :return: np array Watts power of wind turbine generation
+    """
+    v = np.asarray(wind_speed, dtype=float)
+    Cp = np.asarray(power_coefficient, dtype=float)
+    A = np.asarray(area, dtype=float)
+    cut_in_speed = np.asarray(cut_in_speed, dtype=float)
+    rated_speed = np.asarray(rated_speed, dtype=float)
+
+    cubic = (v > cut_in_speed) & (v <= rated_speed)
+    rated = (v > rated_speed) & (v <= 3 * rated_speed)
+    power = np.where(cubic, 1 / 2 * Cp * A * v ** 3, 0.0)
+    power = np.where(rated, 1 / 2 * Cp * A * rated_speed ** 3, power)
+    return power
+
+
+def power_from_power_curve(wind_speed, curve_speed, curve_power):
+    """
+    Wind turbine power from tabulated manufacturer power curve. Power is linearly interpolated between
+    the tabulated speeds, no power is generated below the first or above the last tabulated speed (cut off).
+
+    :param wind_speed: array like m/s wind speed at turbine height
+    :param curve_speed: array like (M,) m/s increasing wind speeds of the power curve
+    :param curve_power: array like (M,) Watts power curve of one turbine or (K, M) power curves of K turbines
+        tabulated on the same wind speeds
+    :return: np array Watts power of wind turbine generation, with shape of wind_speed or (K,) + wind_speed shape
+    """
+    v = np.asarray(wind_speed, dtype=float)
+    speed = np.asarray(curve_speed, dtype=float)
+    power = np.atleast_2d(np.asarray(curve_power, dtype=float))
+
+    upper = np.clip(np.searchsorted(speed, v, side='right'), 1, len(speed) - 1)
+    lower = upper - 1
+    weight = (v - speed[lower]) / (speed[upper] - speed[lower])
+    interpolated = power[:, lower] * (1 - weight) + power[:, upper] * weight
+    outside = ~((v >= speed[0]) & (v <= speed[-1]))
+    interpolated = np.where(outside, 0.0, interpolated)
+
+    if np.ndim(curve_power) == 1:
+        return interpolated[0]
+    return interpolated
+
+
+def wind_speed_at_height(resource_df, height):
+    """
+    Extrapolate wind speed to the turbine hub height from MERRA-2 wind at 2, 10 and 50 metres height.
+    The wind profile is assumed logarithmic between the two closest levels, the profile of the lowest
+    (highest) two levels is used below 2 metres (above 50 metres).
+
+    :param resource_df: pandas dataFrame contains fields of U2M, V2M, U10M, V10M, U50M and V50M
+    :param height: float or array like metres hub height of wind turbine
+    :return: np array m/s wind speed at hub height
+    """
+    heights = np.array([2.0, 10.0, 50.0])
+    speeds = np.vstack((
+        np.hypot(resource_df.U2M.values, resource_df.V2M.values),
+        np.hypot(resource_df.U10M.values, resource_df.V10M.values),
+        np.hypot(resource_df.U50M.values, resource_df.V50M.values),
+    ))
+    height = np.asarray(height, dtype=float)
+    upper = np.clip(np.searchsorted(heights, height, side='right'), 1, len(heights) - 1)
+    lower = upper - 1
+    fraction = np.log(height / heights[lower]) / np.log(heights[upper] / heights[lower])
+    speed = speeds[lower] + (speeds[upper] - speeds[lower]) * fraction[..., np.newaxis]
+    return np.maximum(speed, 0)
+
+
 def resistance_power(resource_df, area):
     """
     Wind turbine resistance power estimation. When wind blows into wind turbine, it not only
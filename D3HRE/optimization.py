@@ -1,9 +1,12 @@
+import os
+import copy
 import numpy as np
 import pygmo as pg
 import cloudpickle
 
 from D3HRE import simulation
 from D3HRE.core.battery_models import Battery_managed
+from D3HRE.core.fitness_cache import FitnessCache
 
 
 class Mixed_objective_optimization_function:
@@ -26,6 +29,16 @@ class Mixed_objective_optimization_function:
         except KeyError:
             self.weight = [210, 320, 1, 10000]
 
+        try:
+            cache = self.config['optimization']['cache']
+            self.cache = FitnessCache(
+                tolerance=cache.get('tolerance', 1e-6),
+                maxsize=cache.get('maxsize', 100000),
+                path=cache.get('path'),
+            )
+        except KeyError:
+            self.cache = None
+
 
     def set_constraint(self):
         try:
@@ -49,7 +62,7 @@ class Mixed_objective_optimization_function:
 
         return self.max_capacity
 
-    def fitness(self, x):
+    def objective(self, x):
         weight = self.weight
         obj = (
             x[0] * weight[0]
@@ -59,6 +72,84 @@ class Mixed_objective_optimization_function:
         )
         return [obj]
 
+    def batch_objective(self, x):
+        """
+        Objective of a whole population in one pass of the simulation.
+
+        :param x: np array, (N, 3) decision vectors of the population
+        :return: np array, (N, 1) objective of each decision vector
+        """
+        weight = self.weight
+        obj = (
+            x[:, 0] * weight[0]
+            + x[:, 1] * weight[1]
+            + x[:, 2] * weight[2]
+            + weight[3] * self.sim.run_batch(x[:, 0], x[:, 1], x[:, 2])
+        )
+        return obj[:, np.newaxis]
+
+    def fitness(self, x):
+        if self.cache is None:
+            return self.objective(x)
+        fitness = self.cache.get(x)
+        if fitness is None:
+            fitness = self.objective(x)
+            self.cache.set(x, fitness)
+        return fitness
+
+    def batch_fitness(self, dvs):
+        """
+        Fitness of a whole population in one pass of the simulation, used by pygmo batch fitness
+        evaluators. Only the decision vectors missing from the fitness cache are simulated.
+
+        :param dvs: array like, (N * 3,) concatenated decision vectors of the population
+        :return: np array, (N * nobj,) concatenated fitness vectors
+        """
+        x = np.asarray(dvs, dtype=float).reshape(-1, 3)
+        if self.cache is None:
+            return self.batch_objective(x).ravel()
+
+        fitness = [self.cache.get(x_i) for x_i in x]
+        missing = [i for i, fitness_i in enumerate(fitness) if fitness_i is None]
+        if missing:
+            missing_fitness = self.batch_objective(x[missing])
+            for i, fitness_i in zip(missing, missing_fitness):
+                fitness[i] = fitness_i
+            self.cache.set_many(x[missing], missing_fitness)
+        return np.asarray(fitness, dtype=float).ravel()
+
+    def cache_info(self):
+        """
+        :return: dict of hits, misses, hit rate and size of the fitness cache or None without cache
+        """
+        if self.cache is None:
+            return None
+        return self.cache.info()
+
+    def get_compact_problem(self):
+        """
+        Copy of the problem simulated by CompactPowerSim, so only the array folder and the parameters
+        are pickled when the problem is sent to worker processes.
+
+        :return: problem object
+        """
+        compact_problem = copy.copy(self)
+        compact_problem.Task = None
+        compact_problem.sim = simulation.CompactPowerSim.from_power_sim(self.sim)
+        return compact_problem
+
+    def get_lpsp(self):
+        solar_area_opt, wind_area_opt, battery_capacity = self.champion
+        return self.sim.run(solar_area_opt, wind_area_opt, battery_capacity)
+
+    def get_report(self):
+        """
+        Simulate the power system with the optimised configuration.
+        :return: DataFrame of the simulation
+        """
+        solar_area_opt, wind_area_opt, battery_capacity = self.champion
+        return self.sim.get_report(solar_area_opt, wind_area_opt, battery_capacity)
+
     def get_bounds(self):
         return [0, 0, 0.001], self.constraints()
 
@@ -67,12 +158,24 @@ class Mixed_objective_optimization_function:
 
 class Multiple_objective_optimization_function(Mixed_objective_optimization_function):
 
-    def fitness(self, x):
+    def objective(self, x):
         weight = self.weight
         capital_cost = x[0] * weight[0] + x[1] * weight[1] + x[2] * weight[2]
         lpsp = self.sim.run(x[0], x[1], x[2])
         return [capital_cost, lpsp]
 
+    def batch_objective(self, x):
+        """
+        Objective of a whole population in one pass of the simulation.
+
+        :param x: np array, (N, 3) decision vectors of the population
+        :return: np array, (N, 2) capital cost and LPSP of each decision vector
+        """
+        weight = self.weight
+        capital_cost = x[:, 0] * weight[0] + x[:, 1] * weight[1] + x[:, 2] * weight[2]
+        lpsp = self.sim.run_batch(x[:, 0], x[:, 1], x[:, 2])
+        return np.column_stack([capital_cost, lpsp])
+
     def get_nobj(self):
         return 2
 
@@ -107,6 +210,48 @@ class Constraint_mixed_objective_optimisation(Mixed_objective_optimization_funct
             self.generation = 100
             self.pop_size = 100
 
+        try:
+            self.batch = self.config['optimization']['batch']
+        except KeyError:
+            self.batch = False
+
+        try:
+            archipelago = self.config['optimization']['method']['archipelago']
+        except KeyError:
+            archipelago = {}
+        # One island per core by default
+        self.islands = archipelago.get('islands', os.cpu_count() or 1)
+        self.topology = archipelago.get('topology', 'ring')
+        self.evolutions = archipelago.get('evolutions', 1)
+
+    def get_population(self, problem=None):
+        """
+        Initial population of the problem, with the batch option the whole population is
+        evaluated in one pass.
+
+        :param problem: optional pygmo problem, default the problem of the optimisation
+        :return: pygmo population
+        """
+        if problem is None:
+            problem = self.problem
+        if self.batch:
+            return pg.population(problem, self.pop_size, b=pg.bfe(pg.member_bfe()))
+        return pg.population(problem, self.pop_size)
+
+    def get_algorithm(self, generation):
+        """
+        PSO algorithm of the optimisation. With the batch option the generational PSO is used, it
+        moves all particles before evaluating the swarm with one batch fitness call.
+
+        :param generation: int, number of generations
+        :return: pygmo user defined algorithm
+        """
+        if self.batch:
+            uda = pg.pso_gen(gen=generation)
+            uda.set_bfe(pg.bfe(pg.member_bfe()))
+            return uda
+        return pg.pso(gen=generation)
+
     def run(self, converge_info=False, pop_info=False):
         """
         Run the optimisation process using PSO algorithm.
@@ -117,10 +262,10 @@ class Constraint_mixed_objective_optimisation(Mixed_objective_optimization_funct
         print("Start the optimisation process...")
 
         if pop_info != False:
-            uda = pg.pso(gen=1)
+            uda = self.get_algorithm(1)
             algo = pg.algorithm(uda)
             algo.set_verbosity(1)
-            pop = pg.population(self.problem, self.pop_size)
+            pop = self.get_population()
             self.pop_history = [pop]
             for i in range(int(pop_info)):
                 pop = algo.evolve(pop)
@@ -128,41 +273,106 @@ class Constraint_mixed_objective_optimisation(Mixed_objective_optimization_funct
             self.log = algo.extract(type(uda)).get_log()
             self.pop = pop
         elif converge_info == True:
-            uda = pg.pso(gen=self.generation)
+            uda = self.get_algorithm(self.generation)
             algo = pg.algorithm(uda)
             algo.set_verbosity(1)
-            pop = pg.population(self.problem, self.pop_size)
+            pop = self.get_population()
             self.log = algo.extract(type(uda)).get_log()
             self.pop = pop
         else:
-            uda = pg.pso(gen=self.generation)
+            uda = self.get_algorithm(self.generation)
             algo = pg.algorithm(uda)
-            pop = pg.population(self.problem, self.pop_size)
+            pop = self.get_population()
             pop = algo.evolve(pop)
+            self.pop = pop
         self.champion = pop.champion_x
         return pop.champion_f, pop.champion_x
 
+    def cache_info(self):
+        """
+        :return: dict of hits, misses, hit rate and size of the fitness cache in the last run or None
+            without cache
+        """
+        return self.pop.problem.extract(Mixed_objective_optimization_function).cache_info()
+
+    def get_compact_problem(self):
+        """
+        :return: pygmo problem simulated on stored arrays, cheap to send to worker processes, the
+            arrays are removed with remove_compact_problem
+        """
+        return pg.problem(self.problem.extract(Mixed_objective_optimization_function).get_compact_problem())
+
+    @staticmethod
+    def remove_compact_problem(problem):
+        """
+        Remove the stored arrays of a compact problem.
+
+        :param problem: pygmo problem from get_compact_problem
+        :return: None
+        """
+        problem.extract(Mixed_objective_optimization_function).sim.remove()
+
+    def get_topology(self):
+        """
+        Migration topology of the archipelago, one of 'ring', 'fully_connected' or 'unconnected'.
+
+        :return: pygmo user defined topology
+        """
+        topologies = {
+            'ring': pg.ring,
+            'fully_connected': pg.fully_connected,
+            'unconnected': pg.unconnected,
+        }
+        try:
+            return topologies[self.topology]()
+        except KeyError:
+            raise ValueError('Invalid topology: {}'.format(self.topology))
+
     def island_run(self):
-        uda = pg.pso(gen=self.generation)
-        algo = pg.algorithm(uda)
-        pop = pg.population(self.problem, self.pop_size)
-        island = pg.island(algo=algo, pop=pop, udi=pg.mp_island())
-        island.evolve()
-        island.wait()
-        pop = island.get_population()
+        problem = self.get_compact_problem()
+        try:
+            algo = pg.algorithm(self.get_algorithm(self.generation))
+            island = pg.island(algo=algo, pop=self.get_population(problem), udi=pg.mp_island())
+            island.evolve()
+            island.wait_check()
+            pop = island.get_population()
+        finally:
+            self.remove_compact_problem(problem)
         return pop.champion_f, pop.champion_x
 
-    def get_lpsp(self):
-        solar_area_opt, wind_area_opt, battery_capacity = self.champion
-        return self.sim.run(solar_area_opt, wind_area_opt, battery_capacity)
-
-    def get_report(self):
+    def archipelago_run(self):
         """
-        Simulate the power system with the optimised configuration.
-        :return: DataFrame on the
+        Run the optimisation on an archipelago of islands evolving in worker processes, the best
+        individuals migrate between the islands along the topology after every evolution.
+        Every island holds the compact problem, whose arrays are memory-mapped from the same files.
+        The files are removed when the evolution is done.
+
+        :return: champion fitness and decision vector over all islands
         """
-        solar_area_opt, wind_area_opt, battery_capacity = self.champion
-        return self.sim.get_report(solar_area_opt, wind_area_opt, battery_capacity)
+        print("Start the optimisation process...")
+        kwargs = {'b': pg.bfe(pg.member_bfe())} if self.batch else {}
+        problem = self.get_compact_problem()
+        try:
+            archipelago = pg.archipelago(
+                n=self.islands,
+                t=self.get_topology(),
+                algo=pg.algorithm(self.get_algorithm(self.generation)),
+                prob=problem,
+                pop_size=self.pop_size,
+                udi=pg.mp_island(),
+                **kwargs
+            )
+            archipelago.evolve(self.evolutions)
+            archipelago.wait_check()
+        finally:
+            self.remove_compact_problem(problem)
+
+        champions_f = archipelago.get_champions_f()
+        champions_x = archipelago.get_champions_x()
+        best = int(np.argmin([champion_f[0] for champion_f in champions_f]))
+        self.archipelago = archipelago
+        self.champion = champions_x[best]
+        return champions_f[best], champions_x[best]
 
     def get_resource_df(self):
         return self.sim.resource_df
@@ -216,6 +426,25 @@ class Constraint_multiple_objective_optimisation(Multiple_objective_optimization
             self.generation = 100
             self.pop_size = 100
 
+        try:
+            self.batch = self.config['optimization']['batch']
+        except KeyError:
+            self.batch = False
+
+    def get_population(self, problem=None):
+        """
+        Initial population of the problem, with the batch option the whole population is
+        evaluated in one pass.
+
+        :param problem: optional pygmo problem, default the problem of the optimisation
+        :return: pygmo population
+        """
+        if problem is None:
+            problem = self.problem
+        if self.batch:
+            return pg.population(problem, self.pop_size, b=pg.bfe(pg.member_bfe()))
+        return pg.population(problem, self.pop_size)
+
     def run(self):
         """
         Run the optimisation process using PSO algorithm.
@@ -227,20 +456,194 @@ class Constraint_multiple_objective_optimisation(Multiple_objective_optimization
 
         if self.algorithm_type == 'nsga-2':
             uda = pg.nsga2(gen=self.generation)
+            if self.batch:
+                uda.set_bfe(pg.bfe(pg.member_bfe()))
         elif self.algorithm_type == 'moea-d':
             uda = pg.moead(gen=self.generation)
         elif self.algorithm_type == 'ihs':
             uda = pg.ihs(gen=self.generation)
 
         algo = pg.algorithm(uda)
-        pop = pg.population(self.problem, self.pop_size)
+        pop = self.get_population()
         pop = algo.evolve(pop)
         self.pop = pop
 
+    def cache_info(self):
+        """
+        :return: dict of hits, misses, hit rate and size of the fitness cache in the last run or None
+            without cache
+        """
+        return self.pop.problem.extract(Multiple_objective_optimization_function).cache_info()
+
     def plot_non_dominated_fronts(self):
         return pg.plot_non_dominated_fronts(self.pop.get_f())
 
 
 
+class Monotone_sizing_optimisation(Mixed_objective_optimization_function):
+    def __init__(self, Task, config={}):
+        """
+        Sizing of the power system by bisection instead of a blind population search.
+        LPSP mostly decreases with battery capacity for a fixed generation and load, so the battery
+        capacity that meets a target LPSP is found by bisection for every (solar area, wind area) pair
+        of a grid. LPSP is not strictly monotone in capacity though: a larger battery can stay full
+        and waste a surplus that a smaller one would store, and so miss a few more hours later. The
+        capacities below the bisection result are therefore scanned and the bisection is repeated
+        below the smallest one that meets the target. All pairs are searched together with one batch
+        simulation per step, and the cost/LPSP Pareto front is found by repeating the 2-D search for
+        a list of target LPSP.
+
+        :param Task: task object (mission + robot)
+        :param config: configuration file if exist will be pass to the power simulation
+        """
+        Mixed_objective_optimization_function.__init__(self, Task, config=config)
+        self.set_sizing_parameters()
+
+    def set_sizing_parameters(self):
+        try:
+            sizing = self.config['optimization']['method']['sizing']
+            self.target_lpsp = sizing['target_lpsp']
+            self.solar_steps = sizing['solar_steps']
+            self.wind_steps = sizing['wind_steps']
+            self.capacity_tolerance = sizing['capacity_tolerance']
+        except KeyError:
+            self.target_lpsp = 0
+            self.solar_steps = 20
+            self.wind_steps = 20
+            self.capacity_tolerance = 1
+
+        try:
+            self.capacity_scan = self.config['optimization']['method']['sizing']['capacity_scan']
+        except KeyError:
+            self.capacity_scan = 10
+
+    def bisect_battery_capacity(self, solar_area, wind_area, low, high, target_lpsp):
+        """
+        Bisect the battery capacity of every (solar area, wind area) pair down to the capacity tolerance,
+        where LPSP at the high capacity meets the target and LPSP at the low capacity does not.
+
+        :param solar_area: np array, (N,) solar panel area unit m^2
+        :param wind_area: np array, (N,) wind turbine swept area unit m^2
+        :param low: np array, (N,) battery capacity that does not meet the target unit Wh, updated in place
+        :param high: np array, (N,) battery capacity that meets the target unit Wh, updated in place
+        :param target_lpsp: float, maximum LPSP
+        :return: np array, (N,) high
+        """
+        while np.any(high - low > self.capacity_tolerance):
+            active = high - low > self.capacity_tolerance
+            middle = (low[active] + high[active]) / 2
+            meets = self.sim.run_batch(solar_area[active], wind_area[active], middle) <= target_lpsp
+            index = np.flatnonzero(active)
+            high[index[meets]] = middle[meets]
+            low[index[~meets]] = middle[~meets]
+        return high
+
+    def minimum_battery_capacity(self, solar_area, wind_area, target_lpsp=None):
+        """
+        Smallest battery capacity found to meet the target LPSP for every (solar area, wind area) pair.
+        All pairs are bisected together, then capacity_scan capacities below each result are simulated
+        and the bisection is repeated below the smallest one that meets the target.
+
+        :param solar_area: array like, (N,) solar panel area unit m^2
+        :param wind_area: array like, (N,) wind turbine swept area unit m^2
+        :param target_lpsp: optional float, maximum LPSP, default the configured target
+        :return: np array, (N,) battery capacity unit Wh, NaN where no simulated battery meets the target
+        """
+        if target_lpsp is None:
+            target_lpsp = self.target_lpsp
+        solar_area = np.atleast_1d(np.asarray(solar_area, dtype=float))
+        wind_area = np.atleast_1d(np.asarray(wind_area, dtype=float))
+        lower_bounds, upper_bounds = self.get_bounds()
+        low = np.full(solar_area.shape, lower_bounds[2], dtype=float)
+        high = np.full(solar_area.shape, upper_bounds[2], dtype=float)
+
+        feasible = self.sim.run_batch(solar_area, wind_area, high) <= target_lpsp
+        meets_at_low = self.sim.run_batch(solar_area, wind_area, low) <= target_lpsp
+        high[meets_at_low] = low[meets_at_low]
+
+        # Keep lpsp(high) <= target < lpsp(low) on the pairs that are still searched
+        searching = np.flatnonzero(feasible & ~meets_at_low)
+        high[searching] = self.bisect_battery_capacity(
+            solar_area[searching], wind_area[searching], low[searching], high[searching], target_lpsp
+        )
+
+        # LPSP is not strictly monotone, look for smaller capacities that meet the target on every pair
+        # not met at the lower bound, including pairs that do not meet it with the largest battery
+        found_by_scan = np.zeros(solar_area.shape, dtype=bool)
+        scanning = np.flatnonzero(~meets_at_low)
+        if self.capacity_scan > 0 and len(scanning):
+            fraction = np.arange(1, self.capacity_scan + 1) / (self.capacity_scan + 1)
+            candidates = lower_bounds[2] + (high[scanning, np.newaxis] - lower_bounds[2]) * fraction
+            meets = (self.sim.run_batch(
+                np.repeat(solar_area[scanning], self.capacity_scan),
+                np.repeat(wind_area[scanning], self.capacity_scan),
+                candidates.ravel(),
+            ) <= target_lpsp).reshape(candidates.shape)
+            found = np.flatnonzero(meets.any(axis=1))
+            if len(found):
+                first = meets[found].argmax(axis=1)
+                scan_low = np.where(first > 0, candidates[found, np.maximum(first - 1, 0)], lower_bounds[2])
+                scan_high = candidates[found, first]
+                high[scanning[found]] = self.bisect_battery_capacity(
+                    solar_area[scanning[found]], wind_area[scanning[found]], scan_low, scan_high, target_lpsp
+                )
+                found_by_scan[scanning[found]] = True
+
+        high[~(feasible | meets_at_low | found_by_scan)] = np.nan
+        return high
+
+    def grid_search(self, target_lpsp=None):
+        """
+        Cheapest configuration meeting the target LPSP on the (solar area, wind area) grid.
+
+        :param target_lpsp: optional float, maximum LPSP, default the configured target
+        :return: tuple, capital cost and [solar area, wind area, battery capacity] or (inf, None) if no
+            configuration meets the target
+        """
+        lower_bounds, upper_bounds = self.get_bounds()
+        solar_area, wind_area = np.meshgrid(
+            np.linspace(lower_bounds[0], upper_bounds[0], self.solar_steps),
+            np.linspace(lower_bounds[1], upper_bounds[1], self.wind_steps),
+        )
+        solar_area, wind_area = solar_area.ravel(), wind_area.ravel()
+        battery_capacity = self.minimum_battery_capacity(solar_area, wind_area, target_lpsp)
+
+        weight = self.weight
+        cost = solar_area * weight[0] + wind_area * weight[1] + battery_capacity * weight[2]
+        if np.all(np.isnan(cost)):
+            return np.inf, None
+        best = int(np.nanargmin(cost))
+        return cost[best], np.array([solar_area[best], wind_area[best], battery_capacity[best]])
+
+    def run(self):
+        """
+        Run the sizing for the configured target LPSP.
+
+        :return: capital cost and [solar area, wind area, battery capacity] of the cheapest configuration
+        """
+        print("Start the sizing process...")
+        cost, self.champion = self.grid_search()
+        return cost, self.champion
+
+    def pareto_front(self, target_lpsp):
+        """
+        Cost/LPSP Pareto front of the power system.
+
+        :param target_lpsp: array like, target LPSP of the points on the front
+        :return: np array, (M, 5) non dominated points of LPSP, capital cost, solar area, wind area
+            and battery capacity sorted by LPSP
+        """
+        points = []
+        for lpsp in np.sort(np.asarray(target_lpsp, dtype=float)):
+            cost, x = self.grid_search(lpsp)
+            if x is not None:
+                points.append([self.sim.run(*x), cost, *x])
+        points = np.array(points).reshape(-1, 5)
+        front = [point for point in points
+                 if not np.any((points[:, 0] <= point[0]) & (points[:, 1] <= point[1]) &
+                               ((points[:, 0] < point[0]) | (points[:, 1] < point[1])))]
+        return np.array(front).reshape(-1, 5)
+
+
 if __name__ == '__main__':
     pass
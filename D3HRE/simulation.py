@@ -1,14 +1,19 @@
+import os
+import shutil
+import tempfile
 import numpy as np
 import pandas as pd
 
 from functools import lru_cache
 
-from gsee.gsee import brl_model, pv
+from gsee.gsee import brl_model, pv, trigon
 from D3HRE.core.dataframe_utility import full_day_cut
 
-from D3HRE.core.battery_models import Battery
-from D3HRE.core.weather_data_download import resource_df_download_and_process
-from D3HRE.core.wind_turbine_model import power_from_turbine, resistance_power
+from D3HRE.core.battery_models import Battery, Battery_batch
+from D3HRE.core.weather_data_download import resource_df_download_and_process, MERRA2_DATA_DIR
+from D3HRE.core.unit_power_store import UnitPowerStore
+from D3HRE.core.wind_turbine_model import power_from_turbine_array, power_from_power_curve, resistance_power, \
+    wind_speed_at_height
 from D3HRE import MaritimeRobot
 
 
@@ -82,10 +87,8 @@ class Reactive_simulation():
     def wind_power_simulation(self):
         wind_df = pd.DataFrame()
         print("Start wind energy power simulation...")
-        wind_df['wind_raw'] = self.resource_df.V2.apply(
-            lambda x: power_from_turbine(
-                x, 1, self.power_coefficient, self.cut_in_speed, self.rated_speed
-            )
+        wind_df['wind_raw'] = power_from_turbine_array(
+            self.resource_df.V2.values, 1, self.power_coefficient, self.cut_in_speed, self.rated_speed
         )
         wind_df['wind_correction'] = resistance_power(self.resource_df, 1)
         wind_df['wind_power'] = wind_df['wind_raw'] - wind_df['wind_correction']
@@ -98,13 +101,15 @@ class Reactive_simulation():
         self.solar = pd.DataFrame()
         print("Start solar energy power simulation...")
         self.resource_df['global_horizontal'] = self.resource_df.SWGDN
-        self.resource_df['diffuse_fraction'] = brl_model.location_run(self.resource_df)
+        rise_set_times, angles = sun_geometry(self.resource_df)
+        self.resource_df['diffuse_fraction'] = brl_model.location_run(self.resource_df, rise_set_times)
         self.resource_df['solar_power'] = pv.run_plant_model_location(
             self.resource_df,
             self.tilt,
             self.azim,
             self.tracking,
             self.capacity,
+            angles=angles,
             config = self.config
         )
         self.solar['solar_power'] = self.resource_df['solar_power']
@@ -123,8 +128,8 @@ class Reactive_simulation():
             battery = Battery(battery_capacity)
             safe_factor = 0
 
-        supply, load = power_supply.tolist(), (self.Task.load_demand*(1+safe_factor)).tolist()
-        battery.run(supply, load)
+        supply, load = power_supply.values, (self.Task.load_demand*(1+safe_factor)).values
+        battery.run(supply, load, history=False)
         lpsp = battery.lost_power_supply_probability()
         return lpsp
 
@@ -219,12 +224,103 @@ class Reactive_simulation():
         return result_df
 
 
+def sun_geometry(resource_df):
+    """
+    Sunrise and sunset times and sun angles along the mission, computed once and shared by the
+    diffuse fraction and PV models.
+
+    :param resource_df: pandas dataFrame contains fields of lat and lon with a datetime index
+    :return: tuple, list of (sunrise, sunset) tuples and pandas dataFrame of sun angles
+    """
+    coords = (resource_df.lat.values, resource_df.lon.values)
+    rise_set_times = trigon.sun_rise_set_times_location(resource_df.index, *coords)
+    angles = trigon.sun_angles_location(resource_df.index, *coords, rise_set_times)
+    return rise_set_times, angles
+
+
+def power_system_parameters(config={}):
+    """
+    :param config: optional configuration of the power system
+    :return: tuple, safe factor of the demand load and coupling ratio between wind and solar power generation
+    """
+    if config != {}:
+        return config['optimization']['safe_factor'], config['simulation']['coupling']
+    return 0, 0.05
+
+
+def power_flow(unit_power, prop_load, hotel_load, solar_area, wind_area, coupling_ratio=0.05):
+    """
+    Power generation and demand load of N system configurations.
+
+    :param unit_power: dict of array like, (T,) wind_raw, wind_correction and solar_power_unit unit area
+        power generation
+    :param prop_load: array like, (T,) propulsion load unit W
+    :param hotel_load: array like, (T,) hotel load or (N, T) hotel load profiles unit W
+    :param solar_area: array like, (N,) solar panel area unit m^2
+    :param wind_area: array like, (N,) wind turbine swept area unit m^2
+    :param coupling_ratio: optional float, coupling between wind and solar power generation
+    :return: tuple of (N, T) np arrays, power generation, corrected propulsion load and demand load unit W
+    """
+    solar_area = np.atleast_1d(np.asarray(solar_area, dtype=float))[:, np.newaxis]
+    wind_area = np.atleast_1d(np.asarray(wind_area, dtype=float))[:, np.newaxis]
+
+    # Correct wind power generation
+    prop_load = np.asarray(prop_load, dtype=float) + np.asarray(unit_power['wind_correction']) * wind_area
+    prop_load = np.maximum(prop_load, 0)  # disable the wind driven generator mode
+
+    # Consider the coupling between wind and solar power generation
+    generation = (np.asarray(unit_power['wind_raw']) * wind_area +
+                  np.asarray(unit_power['solar_power_unit']) * solar_area) * (1 - coupling_ratio)
+    demand_load = prop_load + np.asarray(hotel_load, dtype=float)
+    return generation, prop_load, demand_load
+
+
+def battery_batch_run(unit_power, prop_load, hotel_load, solar_area, wind_area, battery_capacity,
+                      config={}, history=False):
+    """
+    Simulate N system configurations on the unit power generation and the load of a task in one pass.
+
+    :param unit_power: dict of array like, (T,) wind_raw, wind_correction and solar_power_unit unit area
+        power generation
+    :param prop_load: array like, (T,) propulsion load unit W
+    :param hotel_load: array like, (T,) hotel load or (N, T) hotel load profiles unit W
+    :param solar_area: array like, (N,) solar panel area unit m^2
+    :param wind_area: array like, (N,) wind turbine swept area unit m^2
+    :param battery_capacity: array like, (N,) battery capacity unit Wh
+    :param config: optional configuration of the power system
+    :param history: optional, set True to keep the (N, T) battery histories
+    :return: tuple, (N,) np array LPSP of each configuration and the Battery_batch object
+    """
+    safe_factor, coupling_ratio = power_system_parameters(config)
+    battery = Battery_batch(battery_capacity, config=config)
+    generation, _, demand_load = power_flow(unit_power, prop_load, hotel_load, solar_area, wind_area,
+                                            coupling_ratio)
+
+    lost_power_supply_probability = battery.run(generation, demand_load * (1 + safe_factor), history=history)
+    return lost_power_supply_probability, battery
+
+
 class PowerSim():
-    def __init__(self, Task, config={}):
+    def __init__(self, Task, config={}, unit_power_store=None):
+        """
+
+        :param Task: Object task object
+        :param config: optional configuration of the power system
+        :param unit_power_store: optional UnitPowerStore, where unit power generation of the mission is kept,
+            default store is config['simulation']['unit_power_dir'] or in the MERRA-2 data directory
+        """
         self.Task = Task
         self.config = config
         self.set_parameters()
         self.resource_df = resource_df_download_and_process(self.Task.mission)
+        if unit_power_store is None:
+            try:
+                unit_power_dir = self.config['simulation']['unit_power_dir']
+            except KeyError:
+                unit_power_dir = os.path.join(MERRA2_DATA_DIR, 'unit_power')
+            unit_power_store = UnitPowerStore(unit_power_dir)
+        self.unit_power_store = unit_power_store
+        self.hotel_load_ensembles = {}
 
     def set_parameters(self):
         try:
@@ -248,109 +344,314 @@ class PowerSim():
             self.tracking = 0
             self.capacity = 140
 
-    @property
-    @lru_cache(maxsize=32)
-    def wind_power_simulation(self):
-        wind_df = pd.DataFrame()
-        print("Start wind energy power simulation...")
-        wind_df['wind_raw'] = self.resource_df.V2.apply(
-            lambda x: power_from_turbine(
-                x, 1, self.power_coefficient, self.cut_in_speed, self.rated_speed
-            )
+        try:
+            self.hub_height = self.config['transducer']['wind']['hub_height']
+        except KeyError:
+            self.hub_height = 2
+
+        # Optional manufacturer power curve of the turbine, replaces the idealised turbine model
+        # {'speed': m/s wind speeds, 'power': Watts turbine power, 'area': m^2 swept area}
+        try:
+            self.power_curve = self.config['simulation']['power_curve']
+        except KeyError:
+            self.power_curve = None
+
+    def get_transducer(self):
+        """
+        Parameters that change the unit power generation of wind and solar transducers.
+
+        :return: tuple
+        """
+        return (
+            self.power_coefficient, self.cut_in_speed, self.rated_speed, self.hub_height,
+            self.tilt, self.azim, self.tracking, self.capacity,
+            self.config.get('transducer', {}), self.power_curve,
         )
-        wind_df['wind_correction'] = resistance_power(self.resource_df, 1)
-        wind_df['wind_power'] = wind_df['wind_raw'] - wind_df['wind_correction']
-        self.wind = wind_df
-        return wind_df['wind_raw'], wind_df['wind_correction']
 
-    @property
-    @lru_cache(maxsize=32)
-    def solar_power_simulation(self):
-        self.solar = pd.DataFrame()
+    def load_unit_power(self):
+        """
+        Load unit area wind and solar power generation from the unit power store,
+        the generation models only run when the mission has not been simulated before.
+
+        :return: dict of np arrays, unit power generation
+        """
+        if getattr(self, 'unit_power', None) is not None:
+            return self.unit_power
+
+        key = self.unit_power_store.get_key(self.Task.mission.ID, self.get_transducer())
+        unit_power = self.unit_power_store.load(key)
+        if unit_power is None:
+            wind_raw, wind_correction = self.simulate_wind_power()
+            diffuse_fraction, solar_power_unit = self.simulate_solar_power()
+            unit_power = self.unit_power_store.save(key, {
+                'wind_raw': wind_raw,
+                'wind_correction': wind_correction,
+                'diffuse_fraction': diffuse_fraction,
+                'solar_power_unit': solar_power_unit,
+            })
+
+        index = self.resource_df.index
+        self.wind = pd.DataFrame(index=index)
+        self.wind['wind_raw'] = unit_power['wind_raw']
+        self.wind['wind_correction'] = unit_power['wind_correction']
+        self.wind['wind_power'] = self.wind['wind_raw'] - self.wind['wind_correction']
+
+        self.resource_df['global_horizontal'] = self.resource_df.SWGDN
+        self.resource_df['diffuse_fraction'] = unit_power['diffuse_fraction']
+        self.resource_df['solar_power_unit'] = unit_power['solar_power_unit']
+        self.solar = pd.DataFrame(index=index)
+        self.solar['solar_power'] = self.resource_df['solar_power_unit']
+
+        self.unit_power = unit_power
+        return unit_power
+
+    def simulate_wind_power(self):
+        print("Start wind energy power simulation...")
+        if self.hub_height == 2:
+            wind_speed = self.resource_df.V2.values
+        else:
+            wind_speed = wind_speed_at_height(self.resource_df, self.hub_height)
+        if self.power_curve is None:
+            wind_raw = power_from_turbine_array(
+                wind_speed, 1, self.power_coefficient, self.cut_in_speed, self.rated_speed
+            )
+        else:
+            # Unit area generation of the tabulated turbine
+            wind_raw = power_from_power_curve(
+                wind_speed, self.power_curve['speed'], self.power_curve['power']
+            ) / self.power_curve['area']
+        wind_correction = resistance_power(self.resource_df, 1)
+        return wind_raw, wind_correction.values
+
+    def simulate_solar_power(self):
         print("Start solar energy power simulation...")
         self.resource_df['global_horizontal'] = self.resource_df.SWGDN
-        self.resource_df['diffuse_fraction'] = brl_model.location_run(self.resource_df)
-        self.resource_df['solar_power_unit'] = pv.run_plant_model_location(
+        rise_set_times, angles = sun_geometry(self.resource_df)
+        diffuse_fraction = brl_model.location_run(self.resource_df, rise_set_times)
+        self.resource_df['diffuse_fraction'] = diffuse_fraction
+        solar_power_unit = pv.run_plant_model_location(
             self.resource_df,
             self.tilt,
             self.azim,
             self.tracking,
             self.capacity,
+            angles=angles,
             config=self.config
         )
-        self.solar['solar_power'] = self.resource_df['solar_power_unit']
+        return diffuse_fraction.values, solar_power_unit.values
+
+    @property
+    def wind_power_simulation(self):
+        self.load_unit_power()
+        return self.wind['wind_raw'], self.wind['wind_correction']
+
+    @property
+    def solar_power_simulation(self):
+        self.load_unit_power()
         return self.solar['solar_power']
 
     def run(self, solar_area, wind_area, battery_capacity, validation=False):
+        if not validation:
+            return self.run_batch([solar_area], [wind_area], [battery_capacity])[0]
+
+        # Only keep the battery history when the report is requested
+        self.run_batch([solar_area], [wind_area], [battery_capacity], history=True)
+        generation, prop_load, demand_load = power_flow(
+            self.unit_power, self.Task.prop_load, self.Task.hotel_load, [solar_area], [wind_area],
+            power_system_parameters(self.config)[1]
+        )
+        index = self.Task.mission.df.index
+        prop_load = pd.Series(prop_load[0], index=index)
+        demand_load = pd.Series(demand_load[0], index=index)
 
-        if self.config != {}:
-            battery = Battery(battery_capacity, config=self.config)
-            safe_factor = self.config['optimization']['safe_factor']
-            coupling_ratio = self.config['simulation']['coupling']
-        else:
-            battery = Battery(battery_capacity)
-            safe_factor = 0
-            coupling_ratio = 0.05
+        battery_history = self.battery.battery_history()[:, 0, :]
+        battery_history_df = pd.DataFrame(
+            data=battery_history.T,
+            index=index,
+            columns=['SOC', 'Battery', 'Unmet', 'Waste', 'Supply'],
+        )
+        try:
+            load_demand_history = np.vstack((demand_load, prop_load, self.Task.hotel_load.values,
+                                         (self.Task.critical_hotel_load +
+                                          prop_load * self.Task.robot.critical_prop_load_ratio).values))
+        except AttributeError:
+            load_demand_history = np.vstack((demand_load, prop_load, self.Task.hotel_load.values,
+                                         (self.Task.critical_hotel_load +
+                                          self.Task.critical_prop_load).values))
+        load_demand_history_df = pd.DataFrame(
+            data=load_demand_history.T,
+            index=index,
+            columns=['Load_demand', 'Prop_load', 'Hotel_load', 'Critical_load'],
+        )
+
+        generation_history_df = pd.DataFrame(
+            data=generation[0],
+            index=index,
+            columns=['Generation']
+        )
+        results = [self.resource_df,
+                   self.solar * solar_area,
+                   self.wind * wind_area,
+                   generation_history_df,
+                   load_demand_history_df,
+                   battery_history_df]
+        self.history = pd.concat(results, axis=1)
+        return self.history
+
+    def run_batch(self, solar_area, wind_area, battery_capacity, history=False):
+        """
+        Run the simulation for N system configurations in one pass.
+
+        :param solar_area: array like, (N,) solar panel area unit m^2
+        :param wind_area: array like, (N,) wind turbine swept area unit m^2
+        :param battery_capacity: array like, (N,) battery capacity unit Wh
+        :param history: optional, set True to keep the (N, T) battery histories on self.battery
+        :return: np array, (N,) LPSP of each configuration
+        """
+        lost_power_supply_probability, self.battery = battery_batch_run(
+            self.load_unit_power(), self.Task.prop_load, self.Task.hotel_load,
+            solar_area, wind_area, battery_capacity, config=self.config, history=history
+        )
+        return lost_power_supply_probability
+
+    def get_hotel_load_ensemble(self, n_profiles):
+        """
+        Get K independent hotel load profiles of the task, the ensemble is kept for later runs.
+
+        :param n_profiles: int, number of profiles K
+        :return: np array, (K, T) hotel load unit W
+        """
+        if n_profiles not in self.hotel_load_ensembles:
+            self.hotel_load_ensembles[n_profiles], _ = self.Task.robot.get_hotel_load_ensemble(n_profiles)
+        return self.hotel_load_ensembles[n_profiles]
+
+    def run_ensemble(self, solar_area, wind_area, battery_capacity, n_profiles=100,
+                     quantiles=(0.05, 0.5, 0.95)):
+        """
+        Run the simulation of one system configuration against K independent hotel load profiles in
+        one pass for Monte Carlo reliability analysis.
+
+        :param solar_area: float, solar panel area unit m^2
+        :param wind_area: float, wind turbine swept area unit m^2
+        :param battery_capacity: float, battery capacity unit Wh
+        :param n_profiles: optional int, number of hotel load profiles K
+        :param quantiles: optional tuple of float, quantiles of the LPSP distribution to report
+        :return: dict, 'lpsp' (K,) np array LPSP of each profile, 'mean' mean LPSP and 'quantiles'
+            dict of quantile to LPSP
+        """
+        lost_power_supply_probability, _ = battery_batch_run(
+            self.load_unit_power(), self.Task.prop_load, self.get_hotel_load_ensemble(n_profiles),
+            np.full(n_profiles, solar_area, dtype=float), np.full(n_profiles, wind_area, dtype=float),
+            np.full(n_profiles, battery_capacity, dtype=float), config=self.config
+        )
+        return {
+            'lpsp': lost_power_supply_probability,
+            'mean': lost_power_supply_probability.mean(),
+            'quantiles': dict(zip(quantiles, np.quantile(lost_power_supply_probability, quantiles))),
+        }
 
-        # Get unit area wind power generation
-        wind_raw_unit, wind_correction_unit = self.wind_power_simulation
-        wind_raw = wind_raw_unit * wind_area
-        wind_correction = wind_correction_unit * wind_area
+    def get_report(self, solar_area, wind_area, battery_capacity):
+        return self.run(solar_area, wind_area, battery_capacity, validation=True)
 
-        # Correct wind power generation
-        prop_load = self.Task.prop_load + wind_correction
-        prop_load[prop_load < 0] = 0  # disable the wind driven generator mode
+class CompactPowerSim():
+    """
+    Compact power simulation of a task for optimiser worker processes.
 
-        power_generation = (wind_raw + self.solar_power_simulation * solar_area) * (1 - coupling_ratio)
-        # Consider the coupling between wind and solar power generation
-        demand_load = prop_load + self.Task.hotel_load
+    The unit power generation and load arrays of a PowerSim are saved as .npy files in a folder. Only
+    the folder and the configuration are pickled, the arrays are memory-mapped when the first worker
+    simulation runs, so islands start fast and share the pages of the operating system cache instead
+    of each holding a copy of the resource dataFrame, mission and task.
+    """
+    fields = ['wind_raw', 'wind_correction', 'solar_power_unit', 'prop_load', 'hotel_load']
 
-        generation = power_generation.tolist()
-        load = (demand_load * (1 + safe_factor)).tolist()
+    def __init__(self, directory, config={}):
+        """
+        :param directory: str, folder of the stored arrays
+        :param config: optional configuration of the power system
+        """
+        self.directory = directory
+        self.config = config
+        self.arrays = None
 
-        battery.run(generation, load)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['arrays'] = None
+        return state
 
-        if validation:
+    @classmethod
+    def from_power_sim(cls, power_sim, directory=None):
+        """
+        Store the arrays of a power simulation.
 
-            battery_history = battery.battery_history()
-            battery_history_df = pd.DataFrame(
-                data=battery_history.T,
-                index=self.Task.mission.df.index,
-                columns=['SOC', 'Battery', 'Unmet', 'Waste', 'Supply'],
-            )
-            try:
-                load_demand_history = np.vstack((demand_load, prop_load, self.Task.hotel_load.values,
-                                             (self.Task.critical_hotel_load +
-                                              prop_load * self.Task.robot.critical_prop_load_ratio).values))
-            except AttributeError:
-                load_demand_history = np.vstack((demand_load, prop_load, self.Task.hotel_load.values,
-                                             (self.Task.critical_hotel_load +
-                                              self.Task.critical_prop_load).values))
-            load_demand_history_df = pd.DataFrame(
-                data=load_demand_history.T,
-                index=self.Task.mission.df.index,
-                columns=['Load_demand', 'Prop_load', 'Hotel_load', 'Critical_load'],
-            )
+        :param power_sim: PowerSim object
+        :param directory: optional str, folder of the stored arrays, default a new temporary folder,
+            call remove() when the workers are done
+        :return: CompactPowerSim object
+        """
+        unit_power = power_sim.load_unit_power()
+        arrays = {
+            field: np.asarray(unit_power[field], dtype=np.float64)
+            for field in ['wind_raw', 'wind_correction', 'solar_power_unit']
+        }
+        arrays['prop_load'] = np.asarray(power_sim.Task.prop_load, dtype=np.float64)
+        arrays['hotel_load'] = np.asarray(power_sim.Task.hotel_load, dtype=np.float64)
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix='d3hre_compact_')
+
+        if not all(os.path.isfile(os.path.join(directory, field + '.npy')) for field in cls.fields):
+            os.makedirs(directory, exist_ok=True)
+            for field in cls.fields:
+                path = os.path.join(directory, field + '.npy')
+                temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+                with open(temporary_path, 'wb') as f:
+                    np.save(f, arrays[field])
+                os.replace(temporary_path, path)
+        return cls(directory, power_sim.config)
+
+    def remove(self):
+        """
+        Remove the folder of the stored arrays.
 
-            generation_history_df = pd.DataFrame(
-                data=generation,
-                index=self.Task.mission.df.index,
-                columns=['Generation']
-            )
-            results = [self.resource_df,
-                       self.solar * solar_area,
-                       self.wind * wind_area,
-                       generation_history_df,
-                       load_demand_history_df,
-                       battery_history_df]
-            self.history = pd.concat(results, axis=1)
-            return self.history
-
-        lost_power_supply_probability = battery.lost_power_supply_probability()
+        :return: None
+        """
+        self.arrays = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def load_arrays(self):
+        """
+        :return: dict of memory-mapped np arrays
+        """
+        if self.arrays is None:
+            self.arrays = {
+                field: np.load(os.path.join(self.directory, field + '.npy'), mmap_mode='r')
+                for field in self.fields
+            }
+        return self.arrays
+
+    def run_batch(self, solar_area, wind_area, battery_capacity):
+        """
+        Run the simulation for N system configurations in one pass, same as PowerSim.run_batch.
+
+        :param solar_area: array like, (N,) solar panel area unit m^2
+        :param wind_area: array like, (N,) wind turbine swept area unit m^2
+        :param battery_capacity: array like, (N,) battery capacity unit Wh
+        :return: np array, (N,) LPSP of each configuration
+        """
+        arrays = self.load_arrays()
+        lost_power_supply_probability, _ = battery_batch_run(
+            arrays, arrays['prop_load'], arrays['hotel_load'],
+            solar_area, wind_area, battery_capacity, config=self.config
+        )
         return lost_power_supply_probability
 
-    def get_report(self, solar_area, wind_area, battery_capacity):
-        return self.run(solar_area, wind_area, battery_capacity, validation=True)
+    def run(self, solar_area, wind_area, battery_capacity):
+        """
+        Run the simulation for one system configuration.
+
+        :return: float, LPSP of the configuration
+        """
+        return self.run_batch([solar_area], [wind_area], [battery_capacity])[0]
+
 
 if __name__ == '__main__':
     pass
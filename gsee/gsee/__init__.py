@@ -3,6 +3,7 @@ __author__ = 'Stefan Pfenninger'
 
 from ._version import __version__
 
+from . import solar_position
 from . import trigon
 from . import brl_model
 from . import pv
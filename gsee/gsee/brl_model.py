@@ -19,6 +19,7 @@ import ephem
 import pandas as pd
 import numpy as np
 
+from . import solar_position
 from . import trigon
 
 
@@ -183,25 +184,75 @@ def run(hourly_clearness, coords, rise_set_times=None):
 
 
 
-def location_run(mission, rise_set_times=None):
+def location_run(mission, rise_set_times=None, p=DEFAULT_PARAMS):
     """
-    
-    :param mission: pandas DataFrame
-    :param rise_set_times: optional sun rise time
-    :return: pandas DataFrame
-            contains the time series of diffuse fraction
-    """
-    # A basic assumption have been made here is solar geometry calculation is
-    # fixed at a location at a single day.
-    hourly_clearness = mission['kt']
-    lat = mission.lat
-    lon = mission.lon
-    diffuse_fractions = []
-    for hour in range(0, len(hourly_clearness), 24):
-        coord = (lat[hour], lon[hour])
-        hourly_clearness_singleday = hourly_clearness.iloc[hour:hour+24]
-        results = run(hourly_clearness_singleday, coord)
-        diffuse_fractions.extend(results)
+    Run the BRL model on a moving platform, vectorised over the whole
+    mission. The mission is split into 24 hour blocks from its first
+    hour and, as in `run`, the solar geometry of each block is fixed at
+    the location of its first hour.
+
+    Parameters
+    ----------
+    mission : pandas DataFrame
+        Hourly clearness indices 'kt' with a datetime index, and the
+        location 'lat' and 'lon' at each hour.
+    rise_set_times : list, default None
+        List of (sunrise, sunset) tuples for each hour of the mission,
+        as returned by `trigon.sun_rise_set_times_location`, if not
+        given, is calculated here.
+    p : dict, default DEFAULT_PARAMS
+        Predictor parameters of the BRL model.
 
-    return pd.Series(diffuse_fractions, index=hourly_clearness.index)
+    Returns
+    -------
+    result : pandas Series
+        Diffuse fractions with the same datetime index as mission.
 
+    """
+    ks = mission['kt'].values.astype(float)
+    index = pd.DatetimeIndex(mission.index).tz_localize(None)
+    length = len(ks)
+    position = np.arange(length)
+    hour = position % 24
+    start = position - hour  # first hour of each 24 hour block
+    end = np.minimum(start + 24, length) - 1  # last hour of each block
+    lat = mission.lat.values[start]
+    lon = mission.lon.values[start]
+
+    # Sunrise and sunset hours of each block, 0 and 23 if the sun doesn't rise/set
+    if rise_set_times is None:
+        rise_set_times = trigon.sun_rise_set_times_location(index, mission.lat.values, mission.lon.values)
+    block_rise_set = [rise_set_times[i] for i in range(0, length, 24)]
+    sunrise_hour = np.array([0 if r is None else r.hour for r, _ in block_rise_set])[start // 24]
+    sunset_hour = np.array([23 if s is None else s.hour for _, s in block_rise_set])[start // 24]
+
+    # Solar geometry from midnight of the first day of each block
+    midnight = index[start].normalize()
+    alpha, _ = solar_position.sun_position(midnight, lat, lon)
+    ast = solar_position.true_solar_time(midnight + pd.to_timedelta(hour, unit='h'), lon)
+
+    # Daily mean clearness index ignoring NaN
+    k_day = pd.Series(ks).groupby(start).transform('mean').values
+
+    # Persistence of the clearness index, previous hour of the first hour
+    # is the last hour of the block
+    previous = ks[np.where(hour == 0, end, position - 1)]
+    following = ks[np.minimum(position + 1, end)]
+    psi_day = (previous + following) / 2
+    psi_day = np.where(np.isnan(psi_day),
+                       np.where(np.isnan(previous), following, previous),
+                       psi_day)
+    psi = np.select(
+        [(hour > sunrise_hour) & (hour < sunset_hour),
+         hour == sunrise_hour,
+         hour == sunset_hour],
+        [psi_day, following, previous],
+        0
+    )
+
+    pwr = (p['a0'] + p['a1'] * ks
+           + p['b1'] * ast + p['b2'] * alpha
+           + p['b3'] * k_day + p['b4'] * psi)
+    diffuse_fractions = 1 / (1 + np.exp(pwr))
+
+    return pd.Series(diffuse_fractions, index=mission.index)
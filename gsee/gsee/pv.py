@@ -261,29 +261,43 @@ def run_plant_model_location(mission,
                              include_raw_data=False,
                              config={},
                              ):
-    data = mission
-    sim_result = []
-    lat = mission.lat
-    lon = mission.lon
-    for hour in range(0, len(data), 24):
-        coord = (lat[hour], lon[hour])
-        data_single_day = data.iloc[hour:hour + 24]
-        sim = run_plant_model(data_single_day,
-                              coord,
-                              tilt,
-                              azim,
-                              tracking,
-                              capacity,
-                              technology,
-                              system_loss,
-                              angles,
-                              include_raw_data,
-                              config=config)
-        sim_result.extend(sim)
-
-    return pd.Series(sim_result, index=data.index) * (1 - system_loss)
+    """
+    Run PV plant model on a moving platform.
 
+    Parameters
+    ----------
+    mission : pandas DataFrame
+        As `data` in `run_plant_model`, and must contain columns 'lat'
+        and 'lon' of the location at each hour.
+    angles : pandas DataFrame, default None
+        Solar angles of the mission from `trigon.sun_angles_location`,
+        computed here if not given.
+
+    Other parameters are passed on to `run_plant_model`.
 
+    Returns
+    -------
+    result : pandas Series
+        The PV system output in kW for each hour.
+
+    """
+    data = mission
+    coords = (mission.lat.values, mission.lon.values)
+    if angles is None:
+        angles = trigon.sun_angles_location(data.index, *coords)
+    sim = run_plant_model(data,
+                          coords,
+                          tilt,
+                          azim,
+                          tracking,
+                          capacity,
+                          technology,
+                          system_loss,
+                          angles,
+                          include_raw_data,
+                          config=config)
+
+    return pd.Series(np.asarray(sim), index=data.index) * (1 - system_loss)
 
 
 def optimal_tilt(lat):
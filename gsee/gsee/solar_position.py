@@ -0,0 +1,202 @@
+"""
+Solar position
+~~~~~~~~~~~~~~
+
+Vectorised sun position following the NOAA solar calculator, which is
+based on Meeus, Astronomical Algorithms (1998):
+
+https://www.esrl.noaa.gov/gmd/grad/solcalc/calcdetails.html
+
+All functions operate on whole arrays of times and locations at once,
+so a moving observer (one location per time step) costs the same as a
+fixed one. Altitude is within about 0.01 degree of ephem for the
+years 1900 to 2100.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def julian_day(datetime_index):
+    """
+    Julian day of the given times.
+
+    Parameters
+    ----------
+    datetime_index : pandas datetime index or array like of datetimes
+        Naive times are handled as UTC.
+
+    Returns
+    -------
+    jd : numpy array
+
+    """
+    datetime_index = pd.DatetimeIndex(datetime_index)
+    return datetime_index.asi8 / (86400 * 1e9) + 2440587.5
+
+
+def _sun_declination_equation_of_time(jd):
+    """
+    Sun declination (radians) and equation of time (minutes) for Julian day jd.
+
+    """
+    jc = (jd - 2451545) / 36525  # Julian century
+
+    mean_long = np.radians((280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360)
+    mean_anom = np.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+    eccent = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+
+    eq_center = (np.sin(mean_anom) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+                 + np.sin(2 * mean_anom) * (0.019993 - 0.000101 * jc)
+                 + np.sin(3 * mean_anom) * 0.000289)
+    omega = np.radians(125.04 - 1934.136 * jc)
+    apparent_long = np.radians(np.degrees(mean_long) + eq_center - 0.00569 - 0.00478 * np.sin(omega))
+
+    mean_obliq = 23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+    obliq = np.radians(mean_obliq + 0.00256 * np.cos(omega))
+
+    declination = np.arcsin(np.sin(obliq) * np.sin(apparent_long))
+
+    y = np.tan(obliq / 2) ** 2
+    eq_time = 4 * np.degrees(y * np.sin(2 * mean_long)
+                             - 2 * eccent * np.sin(mean_anom)
+                             + 4 * eccent * y * np.sin(mean_anom) * np.cos(2 * mean_long)
+                             - 0.5 * y ** 2 * np.sin(4 * mean_long)
+                             - 1.25 * eccent ** 2 * np.sin(2 * mean_anom))
+    return declination, eq_time
+
+
+def _true_solar_time(jd, eq_time, lon):
+    """
+    True solar time (minutes after solar midnight) for Julian day jd.
+
+    """
+    minutes = ((jd - 0.5) % 1) * 1440  # minutes past midnight UTC
+    return (minutes + eq_time + 4 * np.asarray(lon, dtype=float)) % 1440
+
+
+def true_solar_time(datetime_index, lon):
+    """
+    Apparent (true) solar time, the sun is at the meridian at noon.
+
+    Parameters
+    ----------
+    datetime_index : pandas datetime index or array like of datetimes
+        Naive times are handled as UTC.
+    lon : float or array like
+        Longitude in degrees, either fixed or one per time.
+
+    Returns
+    -------
+    solar_time : numpy array
+        Solar time in radians, from 0 to 2 pi over the solar day.
+
+    """
+    jd = julian_day(datetime_index)
+    _, eq_time = _sun_declination_equation_of_time(jd)
+    return np.radians(_true_solar_time(jd, eq_time, lon) / 4)
+
+
+def solar_time_offset(datetime_index, lon):
+    """
+    Offset of the apparent (true) solar time from UTC.
+
+    Parameters
+    ----------
+    datetime_index : pandas datetime index or array like of datetimes
+        Naive times are handled as UTC.
+    lon : float or array like
+        Longitude in degrees, either fixed or one per time.
+
+    Returns
+    -------
+    offset : numpy array
+        Solar time minus UTC in minutes, four minutes per degree of
+        longitude corrected by the equation of time.
+
+    """
+    jd = julian_day(datetime_index)
+    _, eq_time = _sun_declination_equation_of_time(jd)
+    return eq_time + 4 * np.asarray(lon, dtype=float)
+
+
+def _refraction(alt):
+    """
+    Approximate atmospheric refraction (radians) for true sun altitude alt (radians).
+
+    """
+    e = np.degrees(alt)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        t = np.tan(alt)
+        refraction = np.select(
+            [e > 85, e > 5, e > -0.575],
+            [0.0,
+             58.1 / t - 0.07 / t ** 3 + 0.000086 / t ** 5,
+             1735 + e * (-518.2 + e * (103.4 + e * (-12.79 + e * 0.711)))],
+            -20.772 / t
+        )
+    return np.radians(refraction / 3600)
+
+
+def sun_position(datetime_index, lat, lon, refraction=True):
+    """
+    Calculate sun altitude and azimuth.
+
+    Parameters
+    ----------
+    datetime_index : pandas datetime index or array like of datetimes
+        Naive times are handled as UTC.
+    lat, lon : float or array like
+        Latitude and longitude in degrees, either fixed or one per time.
+    refraction : bool, default True
+        Correct altitude for atmospheric refraction (apparent altitude,
+        as given by ephem).
+
+    Returns
+    -------
+    (sun_alt, sun_azimuth) : tuple of numpy arrays
+        Altitude above the horizon and azimuth clockwise from north,
+        both in radians.
+
+    """
+    jd = julian_day(datetime_index)
+    declination, eq_time = _sun_declination_equation_of_time(jd)
+    hour_angle = np.radians(_true_solar_time(jd, eq_time, lon) / 4 - 180)
+
+    lat = np.radians(np.asarray(lat, dtype=float))
+    sin_alt = (np.sin(lat) * np.sin(declination)
+               + np.cos(lat) * np.cos(declination) * np.cos(hour_angle))
+    alt = np.arcsin(np.clip(sin_alt, -1, 1))
+    azimuth = (np.arctan2(np.sin(hour_angle),
+                          np.cos(hour_angle) * np.sin(lat) - np.tan(declination) * np.cos(lat))
+               + np.pi) % (2 * np.pi)
+
+    if refraction:
+        alt = alt + _refraction(alt)
+    return alt, azimuth
+
+
+def zenith_cosine(datetime_index, lat, lon, min_zenith_cosine=None):
+    """
+    Cosine of the apparent sun zenith angle.
+
+    Parameters
+    ----------
+    datetime_index : pandas datetime index or array like of datetimes
+        Naive times are handled as UTC.
+    lat, lon : float or array like
+        Latitude and longitude in degrees, either fixed or one per time.
+    min_zenith_cosine : float, default None
+        If given, lower bound of the returned values.
+
+    Returns
+    -------
+    zenith_cos : numpy array
+
+    """
+    alt, _ = sun_position(datetime_index, lat, lon)
+    zenith_cos = np.sin(alt)
+    if min_zenith_cosine is not None:
+        zenith_cos = np.maximum(zenith_cos, min_zenith_cosine)
+    return zenith_cos
@@ -12,6 +12,8 @@ import ephem
 import numpy as np
 import pandas as pd
 
+from . import solar_position
+
 
 def _sun_rise_set(datetime_index, obs):
     """
@@ -127,6 +129,121 @@ def sun_angles(datetime_index, coords, rise_set_times=None):
     return df
 
 
+def _sun_rise_set_minutes(datetime_index, lat, lon):
+    """
+    Returns arrays of sunrise and sunset times in minutes after UTC
+    midnight of the date of each datetime in datetime_index, at the
+    location given for that datetime. NaN if the sun doesn't rise/set.
+
+    """
+    datetime_index = pd.DatetimeIndex(datetime_index)
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.asarray(lon, dtype=float)
+    dates = datetime_index.normalize()
+    # Evaluate the sun position around local noon of the date
+    jd = (solar_position.julian_day(dates)
+          + (720 - 4 * lon) / 1440)
+    declination, eq_time = solar_position._sun_declination_equation_of_time(jd)
+    # Sunrise and sunset of the centre of the sun with refraction, as ephem
+    with np.errstate(invalid='ignore'):
+        hour_angle = np.degrees(np.arccos(
+            np.cos(np.radians(90.567)) / (np.cos(lat) * np.cos(declination))
+            - np.tan(lat) * np.tan(declination)
+        ))
+    noon = 720 - 4 * lon - eq_time
+    sunrise = (noon - 4 * hour_angle) % 1440
+    sunset = (noon + 4 * hour_angle) % 1440
+    return sunrise, sunset
+
+
+def sun_rise_set_times_location(datetime_index, lat, lon):
+    """
+    Return sunrise and set times for each datetime in datetime_index
+    at a moving location.
+
+    Parameters
+    ----------
+    datetime_index : pandas datetime index
+        Handled as if they were UTC not matter what timezone info
+        they may supply.
+    lat, lon : array like
+        Latitude and longitude of the location at each datetime.
+
+    Returns
+    -------
+    rise_set_times : list
+        List of (sunrise, sunset) tuples on the UTC date of each
+        datetime, sunrise or sunset will be None if the sun doesn't
+        rise/set.
+
+    """
+    datetime_index = pd.DatetimeIndex(datetime_index).tz_localize(None)
+    sunrise, sunset = _sun_rise_set_minutes(datetime_index, lat, lon)
+    dates = datetime_index.normalize()
+
+    def _to_datetimes(minutes):
+        with np.errstate(invalid='ignore'):
+            times = dates + pd.to_timedelta(np.round(minutes * 60), unit='s')
+        return [None if pd.isnull(t) else t.to_pydatetime() for t in times]
+
+    return list(zip(_to_datetimes(sunrise), _to_datetimes(sunset)))
+
+
+def sun_angles_location(datetime_index, lat, lon, rise_set_times=None):
+    """Calculate sun angles for a moving location in one vectorised pass.
+    Returns a dataframe containing `sun_alt`, `sun_zenith`, `sun_azimuth`
+    and `duration` over the passed datetime index, following the same
+    rules as `sun_angles` in the sunrise and sunset hours.
+
+    Parameters
+    ----------
+    datetime_index : pandas datetime index
+        Handled as if they were UTC not matter what timezone info
+        they may supply.
+    lat, lon : array like
+        Latitude and longitude of the location at each datetime.
+    rise_set_times : list, default None
+        List of (sunrise, sunset) time tuples for each datetime, as
+        returned by `sun_rise_set_times_location`, if not passed, is
+        computed here.
+
+    """
+    times = pd.DatetimeIndex(datetime_index).tz_localize(None)
+    if rise_set_times is None:
+        sunrise, sunset = _sun_rise_set_minutes(times, lat, lon)
+    else:
+        dates = times.normalize()
+        sunrise, sunset = (
+            ((pd.DatetimeIndex(list(t)) - dates) / pd.Timedelta(minutes=1)).values
+            for t in zip(*rise_set_times)
+        )
+
+    minute = times.minute.values + times.second.values / 60.0
+    hour = times.hour.values
+    rise_hour = sunrise // 60 == hour
+    set_hour = ~rise_hour & (sunset // 60 == hour)
+
+    # Minutes of sunshine in the hour and the time the sun angles are taken
+    duration = np.select([rise_hour, set_hour],
+                         [60 - sunrise % 60, sunset % 60], 60.0)
+    offset = np.select([rise_hour, set_hour],
+                       [sunrise % 60 - minute + duration / 2, duration / 2], 30.0)
+    sample_times = times + pd.to_timedelta(offset * 60, unit='s')
+    sun_alt, sun_azimuth = solar_position.sun_position(sample_times, lat, lon)
+
+    # Sun below horizon, except in sunrise and sunset hours
+    night = ~(rise_hour | set_hour) & (sun_alt < 0)
+    sun_alt = np.where(night, 0, sun_alt)
+    sun_azimuth = np.where(night, 0, sun_azimuth)
+    duration = np.where(night, 0, duration)
+
+    df = pd.DataFrame({'sun_alt': sun_alt, 'sun_azimuth': sun_azimuth,
+                       'duration': duration},
+                      index=datetime_index)
+    df['sun_zenith'] = (np.pi / 2) - df.sun_alt
+    return df
+
+
 def _incidence_fixed(sun_alt, tilt, azimuth, sun_azimuth):
     return np.arccos(np.sin(sun_alt) * np.cos(tilt)
                      + np.cos(sun_alt) * np.sin(tilt)
@@ -161,7 +278,8 @@ def aperture_irradiance(direct, diffuse, coords,
         direct : a series of direct horizontal irradiance with a datetime index
         diffuse : a series of diffuse horizontal irradiance with the same
                   datetime index as for direct
-        coords : (lat, lon) tuple of location coordinates
+        coords : (lat, lon) tuple of location coordinates, either fixed or
+                 arrays with one location per datetime
         tilt : angle of panel relative to the horizontal plane, 0 = flat
         azimuth : deviation of the tilt direction from the meridian,
                   0 = towards pole, going clockwise, 3.14 = towards equator
@@ -176,10 +294,11 @@ def aperture_irradiance(direct, diffuse, coords,
     """
     # 0. Correct azimuth if we're on southern hemisphere, so that 3.14
     # points north instead of south
-    if coords[0] < 0:
-        azimuth = azimuth + np.pi
+    azimuth = azimuth + np.pi * (np.asarray(coords[0]) < 0)
     # 1. Calculate solar angles
-    if angles is None:
+    if angles is None and np.ndim(coords[0]) > 0:
+        angles = sun_angles_location(direct.index, coords[0], coords[1])
+    elif angles is None:
         sunrise_set_times = sun_rise_set_times(direct.index, coords)
         angles = sun_angles(direct.index, coords, sunrise_set_times)
     # 2. Calculate direct normal irradiance
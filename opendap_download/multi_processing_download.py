@@ -6,8 +6,13 @@ __contributor__ = "Yu Cao"
 
 from multiprocessing.dummy import Pool as Threadpool
 import requests
+import requests.adapters
+import hashlib
+import json
 import logging
 import os
+import threading
+import time
 import urllib.response
 from http import cookiejar
 import urllib.error
@@ -28,11 +33,17 @@ class DownloadManager(object):
     __download_urls = []
     __download_path = ''
     _authenticated_session = None
+    # Manifest of URL -> download status, size and md5 checksum kept in the download folder
+    MANIFEST_NAME = 'manifest.json'
+    CHUNK_SIZE = 64 * 1024
+    BUFFER_SIZE = 1024 * 1024
 
     def __init__(self, username='', password='', links=None, download_path='download'):
         self.set_username_and_password(username, password)
         self.download_urls = links
         self.download_path = download_path
+        self._manifest = {}
+        self._manifest_lock = threading.Lock()
 
         if logging.getLogger().getEffectiveLevel() == logging.INFO:
             logging.getLogger("requests").setLevel(logging.CRITICAL)
@@ -84,25 +95,105 @@ class DownloadManager(object):
     def _mp_download_wrapper(self, url_item):
         """
         Wrapper for parallel download. The function name cannot start with __ due to visibility issues.
-        :param url_item:
-        :type url_item:
-        :return:
-        :rtype:
+        Failed downloads are retried with exponential backoff, a partially downloaded file is resumed.
+        :param url_item: The URL to download
+        :type url_item: str
+        :return: True if the file is downloaded
+        :rtype: bool
         """
         query = url_item
         file_path = os.path.join(self.download_path, self.get_filename(query))
-        self.__download_and_save_file(query, file_path)
-
-    def start_download(self, nr_of_threads=4):
+        for attempt in range(self._retries + 1):
+            try:
+                self.__download_and_save_file(query, file_path)
+            except (requests.RequestException, IOError) as e:
+                log.warning('Download attempt {} failed: {} {}'.format(attempt + 1, query, e))
+                self._update_manifest(query, status='failed')
+                if attempt < self._retries:
+                    time.sleep(self._backoff * 2 ** attempt)
+            else:
+                self._update_manifest(query, status='complete', size=os.path.getsize(file_path),
+                                      checksum=self.get_checksum(file_path))
+                return True
+        return False
+
+    def start_download(self, nr_of_threads=4, retries=3, backoff=1.0):
+        """
+        Download all the links that are not already in the manifest as completed.
+        :param nr_of_threads: Number of concurrent downloads
+        :type nr_of_threads: int
+        :param retries: Number of retries of a failed download
+        :type retries: int
+        :param backoff: Seconds to wait before the first retry, doubled for every further retry
+        :type backoff: float
+        :return: The links that failed to download
+        :rtype: List[str]
+        """
         if self._authenticated_session is None:
             self._authenticated_session = self.__create_authenticated_sesseion()
+        # Keep one pooled connection per thread
+        adapter = requests.adapters.HTTPAdapter(pool_connections=nr_of_threads, pool_maxsize=nr_of_threads)
+        self._authenticated_session.mount('https://', adapter)
+        self._authenticated_session.mount('http://', adapter)
+        self._retries = retries
+        self._backoff = backoff
         # Create the download folder.
         os.makedirs(self.download_path, exist_ok=True)
+        self._manifest = self.read_manifest()
+
+        pending = [url for url in self.download_urls if not self.is_downloaded(url)]
         # p = multiprocessing.Pool(nr_of_processes)
         p = Threadpool(nr_of_threads)
-        list(tqdm.tqdm(p.imap(self._mp_download_wrapper, self.download_urls), total=len(self.download_urls)))
+        list(tqdm.tqdm(p.imap(self._mp_download_wrapper, pending), total=len(pending)))
         p.close()
         p.join()
+        return [url for url in self.download_urls if not self.is_downloaded(url)]
+
+    def get_manifest_path(self):
+        return os.path.join(self.download_path, self.MANIFEST_NAME)
+
+    def read_manifest(self):
+        """
+        Read the manifest of the download folder.
+        :return: URL -> dict of file, status, size and checksum
+        :rtype: dict
+        """
+        try:
+            with open(self.get_manifest_path(), 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def _update_manifest(self, url, **entry):
+        with self._manifest_lock:
+            self._manifest[url] = dict(entry, file=self.get_filename(url))
+            temporary_path = self.get_manifest_path() + '.tmp'
+            with open(temporary_path, 'w') as f:
+                json.dump(self._manifest, f, indent=1)
+            os.replace(temporary_path, self.get_manifest_path())
+
+    def is_downloaded(self, url):
+        """
+        Check the manifest if the link is downloaded and the file is still in place with the same size and
+        md5 checksum.
+        :param url: The MERRA URL
+        :type url: str
+        :rtype: bool
+        """
+        entry = self._manifest.get(url, {})
+        file_path = os.path.join(self.download_path, self.get_filename(url))
+        if not (entry.get('status') == 'complete' and os.path.isfile(file_path)
+                and os.path.getsize(file_path) == entry.get('size')):
+            return False
+        return entry.get('checksum') is None or self.get_checksum(file_path) == entry['checksum']
+
+    @staticmethod
+    def get_checksum(file_path):
+        md5 = hashlib.md5()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(DownloadManager.BUFFER_SIZE), b''):
+                md5.update(chunk)
+        return md5.hexdigest()
 
     @staticmethod
     def get_filename(url):
@@ -128,11 +219,27 @@ class DownloadManager(object):
         return name
 
     def __download_and_save_file(self, url, file_path):
-        r = self._authenticated_session.get(url, stream=True)
-        with open(file_path, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
+        # Download into a partial file and resume it with a range request after a failure
+        part_path = file_path + '.part'
+        offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+        headers = {'Range': 'bytes={}-'.format(offset)} if offset else {}
+        r = self._authenticated_session.get(url, stream=True, headers=headers)
+        if r.status_code == 416:
+            # Nothing left to download, the partial file holds the whole content
+            r.close()
+        else:
+            r.raise_for_status()
+            mode = 'ab' if r.status_code == 206 else 'wb'
+            expected_size = r.headers.get('Content-Length')
+            received_size = 0
+            with open(part_path, mode, buffering=self.BUFFER_SIZE) as f:
+                for chunk in r.iter_content(chunk_size=self.CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        received_size += len(chunk)
+            if expected_size is not None and received_size < int(expected_size):
+                raise IOError('Incomplete download {} of {} bytes'.format(received_size, expected_size))
+        os.replace(part_path, file_path)
         return r.status_code
 
     def __create_authenticated_sesseion(self):
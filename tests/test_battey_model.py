@@ -1,4 +1,8 @@
-from D3HRE.core.battery_models import Soc_model_variable_load, Battery, Battery_managed
+import pytest
+import numpy as np
+
+from D3HRE.core.battery_models import Soc_model_variable_load, Battery, Battery_managed, Battery_batch
+from D3HRE.core import battery_kernel
 
 from tests.test_env import *
 
@@ -12,6 +16,75 @@ def test_lpsp_calc():
     assert model.get_lost_power_supply_probability() == 0
     assert model2.get_lost_power_supply_probability() == 1
 
+
+def test_batch_battery_match_single_battery():
+    np.random.seed(42)
+    power = np.random.uniform(0, 10, 200)
+    use = np.random.uniform(0, 10, 200)
+    capacities = [1, 10, 100]
+
+    batch = Battery_batch(capacities, config=config)
+    lpsp = batch.run(power, use, history=True)
+    assert lpsp.shape == (3,)
+
+    for i, capacity in enumerate(capacities):
+        battery = Battery(capacity, config=config)
+        battery.run(power.tolist(), use.tolist())
+        assert lpsp[i] == pytest.approx(battery.lost_power_supply_probability())
+        assert np.allclose(batch.battery_history()[:, i, :], battery.battery_history())
+
+def test_metrics_only_run():
+    np.random.seed(7)
+    power = np.random.uniform(0, 10, 200)
+    use = np.random.uniform(0, 10, 200)
+    with_history = Battery(10, config=config)
+    with_history.run(power, use)
+    metrics_only = Battery(10, config=config)
+    metrics_only.run(power, use, history=False)
+
+    assert not hasattr(metrics_only, 'unmet_history')
+    assert metrics_only.lost_power_supply_probability() == with_history.lost_power_supply_probability()
+    assert metrics_only.unmet_energy == pytest.approx(with_history.unmet_energy)
+    assert metrics_only.waste_energy == pytest.approx(with_history.waste_energy)
+    assert metrics_only.min_SOC == pytest.approx(with_history.min_SOC)
+
+
+def test_kernel_states():
+    parameters = (10.0, 0.9, 0.005, 0.9, 0.8)
+    assert battery_kernel.battery_step(5.0, 4.0, 1.0, *parameters, False)[-1] == battery_kernel.CHARGE
+    assert battery_kernel.battery_step(9.9, 4.0, 1.0, *parameters, False)[-1] == battery_kernel.FLOAT
+    assert battery_kernel.battery_step(6.0, 1.0, 4.0, *parameters, False)[-1] == battery_kernel.DISCHARGE
+    assert battery_kernel.battery_step(2.5, 1.0, 4.0, *parameters, False)[-1] == battery_kernel.UNMET
+    # Managed battery is topped up to its capacity when the surplus can not be stored
+    energy, supply, unmet, waste, state = battery_kernel.battery_step(9.9, 4.0, 1.0, *parameters, True)
+    assert energy == 10.0 and waste == pytest.approx(2.9)
+
+def test_batch_battery_every_state():
+    state_config = {'simulation': {'battery': {'DOD': 0.1, 'sigma': 0.005, 'eta_in': 0.9, 'eta_out': 0.8,
+                                               'B0': 1}}}
+    power = np.array([4.0, 1.0, 1.0, 1.2, 0.0, np.nan, 3.0])
+    use = np.array([1.0, 4.0, 1.1, 1.0, 4.0, 1.0, 1.0])
+
+    energy, states = 10.0, set()
+    for p, u in zip(power, use):
+        energy, _, _, _, state = battery_kernel.battery_step(energy, p, u, 10.0, 0.1, 0.005, 0.9, 0.8, False)
+        states.add(state)
+    assert states == {battery_kernel.INVALID, battery_kernel.CHARGE, battery_kernel.FLOAT,
+                      battery_kernel.DISCHARGE, battery_kernel.UNMET, battery_kernel.UNMET_FULL}
+
+    capacities = [10, 20]
+    for run in ('run_kernel', 'run_lockstep'):
+        batch = Battery_batch(capacities, config=state_config)
+        batch.length = len(power)
+        getattr(batch, run)(np.tile(power, (2, 1)), np.tile(use, (2, 1)), True)
+        for i, capacity in enumerate(capacities):
+            battery = Battery(capacity, config=state_config)
+            battery.run(power, use)
+            assert batch.lost_power_supply_probability()[i] == pytest.approx(
+                battery.lost_power_supply_probability())
+            assert np.allclose(batch.battery_history()[:, i, :], battery.battery_history(), equal_nan=True)
+
+
 # w and w/o config
 B = 10
 
@@ -0,0 +1,50 @@
+import ephem
+import pytest
+import numpy as np
+import pandas as pd
+
+from gsee.gsee import brl_model
+
+
+def test_location_run():
+    index = pd.date_range('2014-03-01', periods=24, freq='H')
+    kt = np.linspace(0, 0.8, 24)
+    kt[[0, 5, 6, 20]] = np.nan
+    mission = pd.DataFrame({'kt': kt, 'lat': 10, 'lon': 8}, index=index)
+
+    expected = brl_model.run(mission.kt, (10, 8))
+    diffuse_fraction = brl_model.location_run(mission)
+    assert diffuse_fraction.values == pytest.approx(np.array(expected), abs=1e-5, nan_ok=True)
+
+
+def scalar_location_run(mission):
+    # Day by day baseline of location_run before vectorisation, with the ephem sunrise and sunset of run
+    diffuse_fractions = []
+    for hour in range(0, len(mission), 24):
+        coord = (mission.lat.iloc[hour], mission.lon.iloc[hour])
+        diffuse_fractions.extend(brl_model.run(mission.kt.iloc[hour:hour+24], coord))
+    return np.array(diffuse_fractions)
+
+
+def test_location_run_moving_mission():
+    index = pd.date_range('2014-06-01', periods=24 * 4, freq='H')
+    kt = np.tile(np.clip(np.sin(np.linspace(-np.pi / 2, 3 * np.pi / 2, 24)), 0, None) * 0.7, 4)
+    kt[[3, 12, 30, 47, 48, 70]] = np.nan
+    mission = pd.DataFrame({'kt': kt,
+                            'lat': np.linspace(-20, 15, len(index)),
+                            'lon': np.linspace(150, 175, len(index))}, index=index)
+
+    # Sunrise and sunset hours of the vectorised model drift from ephem by a few minutes at most
+    for hour in range(0, len(mission), 24):
+        obs = ephem.Observer()
+        obs.lat, obs.lon = str(mission.lat.iloc[hour]), str(mission.lon.iloc[hour])
+        expected = brl_model.trigon._sun_rise_set(mission.index[hour:hour+1], obs)[0]
+        result = brl_model.trigon.sun_rise_set_times_location(
+            mission.index[hour:hour+1], mission.lat.values[hour:hour+1], mission.lon.values[hour:hour+1]
+        )[0]
+        for e, r in zip(expected, result):
+            drift = (r - e).total_seconds() % 86400
+            assert min(drift, 86400 - drift) < 5 * 60
+
+    diffuse_fraction = brl_model.location_run(mission)
+    assert diffuse_fraction.values == pytest.approx(scalar_location_run(mission), abs=1e-6, nan_ok=True)
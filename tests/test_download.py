@@ -1,10 +1,16 @@
 # Test couldn't eliminate all errors in the program automatically,
 # but it give programmer more confidence that it can make sure some functions works as expected.
 
+import os
 import pytest
+import numpy as np
+import pandas as pd
+import xarray as xr
 
 from tests.test_env import *
-from D3HRE.core.weather_data_download import resource_df_download
+from D3HRE.core.weather_data_download import (
+    resource_df_download, grid_index, plan_download, assemble_resource, TileCache
+)
 
 
 
@@ -12,3 +18,109 @@ def test_resource_df_download():
     resource_df_download(test_mission)
     pass
 
+
+
+def test_grid_index():
+    lat, lon = np.array([-90, -89.75, 10.69358, 90]), np.array([-180, 179.6875, -178.94713892, 180])
+    lat_index, lon_index = grid_index(lat, lon)
+    assert lat_index.tolist() == [0, 0, 201, 360]
+    assert lon_index.tolist() == [0, 575, 2, 575]
+
+
+def test_plan_download(tmp_path):
+    plan, selection = plan_download(test_mission.df, data_set='solar')
+    assert plan.hours.sum() == len(selection) == len(test_mission.df) - 1
+    assert (plan.estimated_bytes == plan.hours * plan.cells * 2 * 4).all()
+
+    # Stand in downloaded files, value of each parameter encodes hour, latitude and longitude index
+    files = []
+    for i, request in enumerate(plan.itertuples()):
+        hours = np.arange(request.hours)[:, None, None] + (request.start - plan.start[0]) / pd.Timedelta(hours=1)
+        lat = np.arange(request.lat_start, request.lat_end + 1)[None, :, None]
+        lon = np.arange(request.lon_start, request.lon_end + 1)[None, None, :]
+        values = hours * 1e6 + lat * 1e3 + lon
+        # MERRA-2 hourly averages are time stamped at the middle of the hour
+        time = pd.date_range(request.start + pd.Timedelta(minutes=30), periods=request.hours, freq='H')
+        dataset = xr.Dataset({'SWGDN': (('time', 'lat', 'lon'), values),
+                              'SWTDN': (('time', 'lat', 'lon'), -values)}, coords={'time': time})
+        files.append(str(tmp_path / '{}.nc'.format(i)))
+        dataset.to_netcdf(files[-1])
+
+    lat_index, lon_index = grid_index(test_mission.df.lat.values[1:], test_mission.df.lon.values[1:])
+    for workers in [1, 2]:
+        resource = assemble_resource(plan, selection, files, data_set='solar', workers=workers)
+        assert (resource.index == test_mission.df.index[1:]).all()
+        assert resource.SWGDN.values == pytest.approx(np.arange(len(resource)) * 1e6 + lat_index * 1e3 + lon_index)
+        assert resource.SWTDN.values == pytest.approx(-resource.SWGDN.values)
+
+    # Files that do not cover the hours of the mission are rejected
+    with xr.open_dataset(files[0]) as dataset:
+        dataset = dataset.load()
+    dataset['time'] = dataset.time + pd.Timedelta(days=1)
+    dataset.to_netcdf(str(tmp_path / 'shifted.nc'))
+    with pytest.raises(ValueError):
+        assemble_resource(plan, selection, [str(tmp_path / 'shifted.nc')] + files[1:], data_set='solar')
+
+
+def test_assemble_resource_from_tiles(tmp_path):
+    plan, selection = TileCache(str(tmp_path / 'tiles')).plan(test_mission.df, data_set='solar')
+    assert len(selection) == len(test_mission.df) - 1
+    assert (plan.estimated_bytes == 24 * plan.cells * 2 * 4).all()
+
+    # Stand in downloaded tiles, value of each parameter encodes hour, latitude and longitude index
+    first_day = plan.date.min()
+    files = []
+    for i, tile in enumerate(plan.itertuples()):
+        hours = np.arange(24)[:, None, None] + (tile.date - first_day) / pd.Timedelta(hours=1)
+        lat = np.arange(tile.lat_start, tile.lat_end + 1)[None, :, None]
+        lon = np.arange(tile.lon_start, tile.lon_end + 1)[None, None, :]
+        values = hours * 1e6 + lat * 1e3 + lon
+        # MERRA-2 hourly averages are time stamped at the middle of the hour
+        time = pd.date_range(tile.date + pd.Timedelta(minutes=30), periods=24, freq='H')
+        dataset = xr.Dataset({'SWGDN': (('time', 'lat', 'lon'), values),
+                              'SWTDN': (('time', 'lat', 'lon'), -values)}, coords={'time': time})
+        files.append(str(tmp_path / '{}.nc'.format(i)))
+        dataset.to_netcdf(files[-1])
+
+    lat_index, lon_index = grid_index(test_mission.df.lat.values[1:], test_mission.df.lon.values[1:])
+    hours = (test_mission.df.index[:-1] - first_day) / pd.Timedelta(hours=1)
+    for workers in [1, 2]:
+        resource = assemble_resource(plan, selection, files, data_set='solar', workers=workers)
+        assert (resource.index == test_mission.df.index[1:]).all()
+        assert resource.SWGDN.values == pytest.approx(hours * 1e6 + lat_index * 1e3 + lon_index)
+        assert resource.SWTDN.values == pytest.approx(-resource.SWGDN.values)
+
+    # Files that do not cover the hours of the mission are rejected
+    with xr.open_dataset(files[0]) as dataset:
+        dataset = dataset.load()
+    dataset['time'] = dataset.time + pd.Timedelta(days=1)
+    dataset.to_netcdf(str(tmp_path / 'shifted.nc'))
+    with pytest.raises(ValueError):
+        assemble_resource(plan, selection, [str(tmp_path / 'shifted.nc')] + files[1:], data_set='solar')
+
+
+def test_tile_cache(tmp_path):
+    tile_cache = TileCache(str(tmp_path / 'tiles'))
+    plan, selection = tile_cache.plan(test_mission.df, data_set='wind')
+    assert not plan.cached.any()
+    assert (selection.lat_offset < tile_cache.tile_size).all() and (selection.lon_offset < tile_cache.tile_size).all()
+
+    # Stand in cached tiles, value of each parameter encodes latitude and longitude index
+    for data_set, parameters in [('solar', ['SWGDN', 'SWTDN']),
+                                 ('wind', ['U2M', 'U10M', 'U50M', 'V2M', 'V10M', 'V50M', 'DISPH', 'T2M'])]:
+        for tile in tile_cache.plan(test_mission.df, data_set=data_set)[0].itertuples():
+            lat = np.arange(tile.lat_start, tile.lat_end + 1)[None, :, None]
+            lon = np.arange(tile.lon_start, tile.lon_end + 1)[None, None, :]
+            values = np.zeros((24, 1, 1)) + lat * 1e3 + lon
+            time = pd.date_range(tile.date + pd.Timedelta(minutes=30), periods=24, freq='H')
+            dataset = xr.Dataset({parameter: (('time', 'lat', 'lon'), values) for parameter in parameters},
+                                 coords={'time': time})
+            os.makedirs(os.path.dirname(tile.path), exist_ok=True)
+            dataset.to_netcdf(tile.path)
+    assert tile_cache.plan(test_mission.df, data_set='wind')[0].cached.all()
+
+    # The resource is assembled from the cached tiles without any download
+    resource_df = resource_df_download(test_mission, data_dir=str(tmp_path) + '/', tile_cache=tile_cache)
+    lat_index, lon_index = grid_index(test_mission.df.lat.values[1:], test_mission.df.lon.values[1:])
+    assert len(resource_df.columns) == 10
+    assert resource_df.T2M.values == pytest.approx(lat_index * 1e3 + lon_index)
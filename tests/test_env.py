@@ -1,10 +1,15 @@
+import os
 import pytest
 
 import numpy as np
+import pandas as pd
+import xarray as xr
 
 from D3HRE import Task, MaritimeRobot
 from D3HRE.core.mission_utility import Mission
 from PyResis import propulsion_power
+from D3HRE.core.weather_data_download import DATA_SETS, MERRA2_DATA_DIR, grid_index
+from D3HRE.core.resource_store import ResourceStore
 
 test_route =  np.array([[ 10.69358 , -178.94713892], [ 11.06430687, +176.90022735]])
 # -------------------------------------------------------------------------------------
@@ -17,6 +22,40 @@ test_route =  np.array([[ 10.69358 , -178.94713892], [ 11.06430687, +176.9002273
 
 
 test_mission = Mission('2014-01-01', test_route, 2)
+
+
+# MERRA-2 resource of January 2014 on the grid points around the test route, indexed by grid point and
+# start of the averaging hour. Resources of missions on the route are sampled from it along their track.
+test_resource = os.path.join(os.path.dirname(__file__), 'merra2_test_resource.nc')
+
+
+def store_test_resource(mission, data_dir=MERRA2_DATA_DIR):
+    """
+    Sample the test resource along the track of the mission and keep it in the resource store, as
+    resource_df_download would after downloading it.
+
+    :param mission: Mission object on the test route
+    :param data_dir: str, folder of the resource store
+    """
+    store = ResourceStore(data_dir)
+    if store.exists(mission.ID):
+        return
+    # The resource at mission time t is the average of the hour before t at the position at t
+    lat_index, lon_index = grid_index(mission.df.lat.values[1:], mission.df.lon.values[1:])
+    with xr.open_dataset(test_resource) as dataset:
+        resource = dataset.sel(
+            time=xr.DataArray(mission.df.index[:-1], dims='utc'),
+            lat=xr.DataArray(lat_index, dims='utc'),
+            lon=xr.DataArray(lon_index, dims='utc'),
+        )
+        parameters = DATA_SETS['solar'][2] + DATA_SETS['wind'][2]
+        resource_df = pd.DataFrame({parameter: resource[parameter].values.astype(float) for parameter in parameters},
+                                   index=mission.df.index[1:])
+    resource_df.index.name = 'utc'
+    store.save(mission.ID, resource_df)
+
+
+store_test_resource(test_mission)
 # -------------------------------------------------------------------------------------
 #  When there is a route there is a mission. Mission is about how to go through certain
 #  route. Basic information on when an how to go through the route is required to form
@@ -0,0 +1,48 @@
+import pickle
+import numpy as np
+import pytest
+
+from D3HRE.core.fitness_cache import FitnessCache
+
+
+def test_fitness_cache_quantise():
+    cache = FitnessCache(tolerance=[0.01, 0.01, 1])
+    assert cache.get([1, 2, 300]) is None
+    cache.set([1, 2, 300], [5.0])
+    assert cache.get([1.001, 2.004, 300.2]) == [5.0]
+    assert cache.get([1.02, 2, 300]) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.hit_rate == pytest.approx(1 / 3)
+
+
+def test_fitness_cache_lru():
+    cache = FitnessCache(maxsize=2)
+    cache.set([1], [1])
+    cache.set([2], [2])
+    cache.get([1])
+    cache.set([3], [3])
+    assert cache.get([2]) is None
+    assert cache.get([1]) == [1]
+    assert cache.info()['size'] == 2
+
+
+def test_fitness_cache_shared_file(tmp_path):
+    path = str(tmp_path / 'fitness.sqlite')
+    cache = FitnessCache(path=path)
+    cache.set(np.array([1.5, 2.5]), np.array([3.0, 0.1]))
+
+    # Another process or island opening the same file, the pickled cache reconnects on use
+    other_cache = pickle.loads(pickle.dumps(FitnessCache(path=path)))
+    assert other_cache.get([1.5, 2.5]) == [3.0, 0.1]
+    assert other_cache.hits == 1
+
+
+def test_fitness_cache_set_many(tmp_path):
+    cache = FitnessCache(path=str(tmp_path / 'fitness.sqlite'))
+    cache.set_many(np.array([[1, 2], [3, 4]]), np.array([[5.0], [6.0]]))
+    assert cache.get([3, 4]) == [6.0]
+
+    # Entries in memory stay with the process, the copy reads them back from the shared file
+    other_cache = pickle.loads(pickle.dumps(cache))
+    assert other_cache.info()['size'] == 0
+    assert other_cache.get([1, 2]) == [5.0]
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from D3HRE.core.hotel_load_model import HotelLoad
+
+
+class DummyMission:
+    df = pd.DataFrame(index=pd.date_range('2014-01-01', periods=500, freq='H'))
+
+
+power_consumption_list = {
+    'single_board_computer': {'power': [2, 10], 'duty_cycle': 0.5},
+    'webcam': {'power': [0.4, 0.6], 'duty_cycle': 1},
+    'gps': {'power': [0.04, 0.4], 'duty_cycle': 0.9},
+    'sonar': {'power': [0.5, 50], 'duty_cycle': 0.5},
+    'temp_sensor': {'power': [0.04], 'duty_cycle': 1},
+    'radio_transmitter': {'power': [0.5, 20], 'duty_cycle': 0.2},
+}
+
+
+def reference_hotel_load(hotel, rng, duration):
+    """Hour by hour and component by component generation, as drawn by the matrix version."""
+    hotel_load, critical_hotel_load = [], []
+    for _ in range(duration):
+        non_critical, critical = 0, 0
+        for component in hotel.components:
+            duty_cycle = hotel.power_consumption_list[component]['duty_cycle']
+            if duty_cycle == 1:
+                critical += hotel.component_power_consumption(component, 1)
+            else:
+                performance = np.clip(duty_cycle + rng.standard_normal() * 0.1, 0, 1)
+                non_critical += hotel.component_power_consumption(component, performance)
+        hotel_load.append(non_critical + critical)
+        critical_hotel_load.append(critical)
+    return np.array(hotel_load), np.array(critical_hotel_load)
+
+
+def test_hotel_load_matches_reference():
+    hotel = HotelLoad(DummyMission, dict(power_consumption_list, seed=5))
+    hotel_load, critical_hotel_load = hotel.generate_power_consumption_timeseries()
+    expected = reference_hotel_load(hotel, np.random.default_rng(5), len(DummyMission.df))
+    assert np.allclose(hotel_load.values, expected[0])
+    assert np.allclose(critical_hotel_load.values, expected[1])
+    assert (hotel_load.index == DummyMission.df.index).all()
+
+
+def test_hotel_load_seed():
+    first = HotelLoad(DummyMission, power_consumption_list).generate_power_consumption_timeseries()[0]
+    second = HotelLoad(DummyMission, power_consumption_list).generate_power_consumption_timeseries()[0]
+    other = HotelLoad(DummyMission, dict(power_consumption_list, seed=1)).generate_power_consumption_timeseries()[0]
+    assert (first == second).all()
+    assert not (first == other).all()
+
+
+def test_hotel_load_full_power():
+    hotel = HotelLoad(DummyMission, power_consumption_list, 'full-power')
+    hotel_load, critical_hotel_load = hotel.generate_power_consumption_timeseries()
+    assert np.allclose(hotel_load, 10 + 0.6 + 0.4 + 50 + 0.04 + 20)
+    assert (hotel_load == critical_hotel_load).all()
+    assert hotel.generate_power_consumption() == pytest.approx((hotel_load[0], critical_hotel_load[0]))
+
+
+def test_hotel_load_ensemble():
+    hotel_load = HotelLoad(DummyMission, power_consumption_list).generate_power_consumption_timeseries()[0]
+    ensemble, critical_ensemble = HotelLoad(DummyMission, power_consumption_list).generate_power_consumption_ensemble(50)
+    assert ensemble.shape == critical_ensemble.shape == (50, len(DummyMission.df))
+    assert np.allclose(ensemble[0], hotel_load.values)
+    assert not np.allclose(ensemble[0], ensemble[1])
+    assert np.allclose(critical_ensemble, 0.6 + 0.04)
@@ -0,0 +1,26 @@
+import pytest
+import numpy as np
+
+from D3HRE.core.navigation_utility import calculate_initial_compass_bearing
+from D3HRE.core.kinematics_utility import *
+
+
+def test_compass_bearing():
+    track = [(1, 1), (2, 2), (2, 2), (100, -90), (-10, 170), (-12, -175)]
+    lat, lon = zip(*track)
+    expected = [calculate_initial_compass_bearing(a, b) for a, b in zip(track[:-1], track[1:])]
+    expected.append(expected[-1])
+    assert compass_bearing(lat, lon) == pytest.approx(expected)
+
+
+def test_apparent_wind():
+    U_p, V_p = platform_velocity([36, 36], [90, 0])
+    assert U_p == pytest.approx([10, 0])
+    assert V_p == pytest.approx([0, 10], abs=1e-12)
+
+    U_app, V_app, speed, direction = apparent_wind([10, 0], [0, 0], U_p, V_p)
+    assert speed == pytest.approx([0, 10])
+    assert direction[1] == pytest.approx(180)
+
+    assert relative_cosine(U_app, V_app, U_p, V_p)[1] == pytest.approx(-1)
+    assert np.isnan(relative_cosine([0], [0], [1], [1])[0])
@@ -28,7 +28,7 @@ print(mission.ID)
 
 def test_hash_value():
     assert hash_value(test_route)[:7] == 'fc34214'
-    assert mission.ID == '62d61d56dd476871993a1af318e96656'
+    assert mission.ID == '9d3e025fca678a596491fe2707a5400c'
 
 def test_variable_speed():
     """
@@ -60,3 +60,50 @@ def test_haversine(test_input, expected):
     assert haversine(test_input[0], test_input[1],
                         test_input[2], test_input[3]) == pytest.approx(expected, 0.5)
 
+
+
+def test_great_circle_interpolate():
+    import nvector as nv
+    way_points = np.array([[10.0, 170.0], [-5.0, -160.0], [-5.0, -160.0]])
+    fraction = np.array([0, 0.25, 0.5, 1, 0.3])
+    lat, lon = great_circle_interpolate(way_points, np.array([0, 0, 0, 0, 1]), fraction)
+
+    sphere = nv.FrameE(a=1, f=0)
+    path = nv.GeoPath(sphere.GeoPoint(10, 170, degrees=True).to_nvector(),
+                      sphere.GeoPoint(-5, -160, degrees=True).to_nvector())
+    # nvector path interpolation is not evenly spaced in distance but shares the mid point
+    point = path.interpolate(0.5).to_geo_point()
+    assert haversine(lon[2], lat[2], point.longitude_deg[0], point.latitude_deg[0]) == pytest.approx(0, abs=1e-6)
+    assert (lat[[0, 3, 4]], lon[[0, 3, 4]]) == (pytest.approx([10, -5, -5]), pytest.approx([170, -160, -160]))
+    assert haversine(lon[1], lat[1], 170, 10) == pytest.approx(haversine(170, 10, -160, -5) / 4)
+
+
+def test_long_route():
+    route = np.column_stack([np.linspace(-40, 40, 3000), np.linspace(-170, 170, 3000)])
+    long_mission = position_dataframe(pd.Timestamp('2014-01-01'), route, 5)
+    assert long_mission.index.is_monotonic_increasing
+    assert long_mission.index.freq == 'H'
+    assert long_mission.lat.iloc[0] == pytest.approx(-40)
+    assert long_mission.lat.diff().min() >= -1e-9
+    assert (long_mission.speed == 5).all()
+
+
+def test_local_time():
+    lons = np.linspace(-180, 180, 25)
+    lon = np.append(np.linspace(-180, 180, 1001), np.arange(-180, 181, 7.5))
+    expected = [np.abs(lons - value).argmin() - 12 for value in lon]
+    assert (timezone_offset(lon) == expected).all()
+
+    index = pd.date_range('2014-01-01', periods=3, freq='H')
+    assert (local_time(index, [-100, 0, 100]) ==
+            pd.DatetimeIndex(['2013-12-31 17:00', '2014-01-01 01:00', '2014-01-01 09:00'])).all()
+    assert (test_mission.local_time == local_time(test_mission.index, test_mission.lon)).all()
+
+
+def test_solar_time():
+    from gsee.gsee.solar_position import true_solar_time
+    solar_mission = get_mission('2014-01-01', test_route, 2, solar_time=True)
+    assert 'solar_time' not in test_mission
+    solar_time = solar_mission.solar_time
+    minutes = (solar_time - solar_time.dt.normalize()).dt.total_seconds() / 60
+    assert np.allclose(np.radians(minutes / 4), true_solar_time(solar_mission.index, solar_mission.lon))
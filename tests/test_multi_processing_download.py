@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import http.server
+from urllib.parse import urlparse
+
+import pytest
+import requests
+
+from opendap_download.multi_processing_download import DownloadManager
+
+
+URL = ('http://127.0.0.1:{}/opendap/MERRA2/M2T1NXSLV.5.12.4/2014/01/MERRA2_400.tavg1_2d_slv_Nx.201401{:02d}.nc4.nc4'
+       '?U2M[0:1:23][358:1:360][573:1:575]')
+
+
+class OPeNDAPHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Stand in OPeNDAP server, supports range requests. The first response of every file is cut half way
+    and the second response fails with a server error.
+    """
+    requests = []
+
+    @staticmethod
+    def content(path):
+        return hashlib.sha256(urlparse(path).path.encode()).digest() * 4096
+
+    def do_GET(self):
+        content = self.content(self.path)
+        attempt = sum(path == self.path for path, _ in self.requests)
+        self.requests.append((self.path, self.headers.get('Range')))
+        if attempt == 1:
+            self.send_error(503)
+            return
+        start = 0
+        if self.headers.get('Range'):
+            start = int(self.headers['Range'].split('=')[1].split('-')[0])
+            if start >= len(content):
+                self.send_error(416)
+                return
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(content) - start))
+        self.end_headers()
+        if attempt == 0:
+            self.wfile.write(content[start:start + len(content) // 2])
+            self.close_connection = True
+        else:
+            self.wfile.write(content[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), OPeNDAPHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    OPeNDAPHandler.requests = []
+    yield httpd.server_address[1]
+    httpd.shutdown()
+
+
+def test_resumable_download(server, tmp_path):
+    urls = [URL.format(server, day) for day in range(1, 4)]
+    download_manager = DownloadManager(links=urls, download_path=str(tmp_path))
+    download_manager._authenticated_session = requests.Session()
+
+    assert download_manager.start_download(2, backoff=0) == []
+    for url in urls:
+        path = tmp_path / download_manager.get_filename(url)
+        assert path.read_bytes() == OPeNDAPHandler.content(url)
+    # Downloads after the cut responses are resumed from where they stopped
+    ranges = [r for _, r in OPeNDAPHandler.requests]
+    assert ranges.count(None) == len(urls)
+    assert ranges.count('bytes={}-'.format(len(OPeNDAPHandler.content(urls[0])) // 2)) == 2 * len(urls)
+
+    manifest = download_manager.read_manifest()
+    assert all(manifest[url]['status'] == 'complete' for url in urls)
+
+    # Completed files are not fetched again, only the missing one
+    (tmp_path / download_manager.get_filename(urls[0])).unlink()
+    OPeNDAPHandler.requests = []
+    assert download_manager.start_download(2, backoff=0) == []
+    assert {urlparse(path).path for path, _ in OPeNDAPHandler.requests} == {urlparse(urls[0]).path}
+
+    # A corrupted file of the same size fails the checksum and is downloaded again
+    corrupted = tmp_path / download_manager.get_filename(urls[1])
+    corrupted.write_bytes(bytes(len(OPeNDAPHandler.content(urls[1]))))
+    OPeNDAPHandler.requests = []
+    assert download_manager.start_download(2, backoff=0) == []
+    assert {urlparse(path).path for path, _ in OPeNDAPHandler.requests} == {urlparse(urls[1]).path}
+    assert corrupted.read_bytes() == OPeNDAPHandler.content(urls[1])
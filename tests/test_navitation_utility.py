@@ -11,4 +11,59 @@ from D3HRE.core.navigation_utility import *
 
 
 def test_compass_bearing(test_input, expected):
-    assert calculate_initial_compass_bearing(test_input[0], test_input[1]) == pytest.approx(expected, 0.1)
\ No newline at end of file
+    assert calculate_initial_compass_bearing(test_input[0], test_input[1]) == pytest.approx(expected, 0.1)
+
+def _oscar_dataset(path):
+    import pandas as pd
+
+    rng = np.random.RandomState(0)
+    time = pd.date_range('2014-01-01', periods=8, freq='5D')
+    latitude = np.arange(10, -10.5, -1 / 3)
+    longitude = np.arange(20, 420, 1 / 3)
+    shape = (len(time), 1, len(latitude), len(longitude))
+    dataset = xr.Dataset(
+        {
+            'u': (('time', 'depth', 'latitude', 'longitude'), rng.randn(*shape)),
+            'v': (('time', 'depth', 'latitude', 'longitude'), rng.randn(*shape)),
+        },
+        coords={'time': time, 'depth': [15.0], 'latitude': latitude, 'longitude': longitude},
+    )
+    dataset.to_netcdf(path)
+    return dataset
+
+
+def test_sample_ocean_current_nearest_matches_pointwise(tmp_path):
+    import pandas as pd
+
+    dataset = _oscar_dataset(str(tmp_path / 'oscar_vel2014.nc'))
+    time = pd.date_range('2014-01-02', periods=50, freq='13H')
+    lat = np.linspace(-5, 5, 50)
+    lon = np.linspace(-170, 170, 50) + 200
+
+    u, v = sample_ocean_current(open_oscar_dataset(str(tmp_path / 'oscar_vel2014.nc')), time, lat, lon)
+    for i in range(len(time)):
+        selected_data = dataset.sel(
+            time=time[i], latitude=lat[i], longitude=lon[i], depth=15, method='nearest'
+        )
+        assert u[i] == selected_data.u.values
+        assert v[i] == selected_data.v.values
+
+
+def test_sample_ocean_current_linear():
+    import pandas as pd
+
+    time = pd.date_range('2014-01-01', periods=2, freq='1D')
+    dataset = xr.Dataset(
+        {
+            'u': (('time', 'depth', 'latitude', 'longitude'), np.array([[[[0., 1.], [2., 3.]]], [[[4., 5.], [6., 7.]]]])),
+            'v': (('time', 'depth', 'latitude', 'longitude'), np.zeros((2, 1, 2, 2))),
+        },
+        coords={'time': time, 'depth': [15.0], 'latitude': [1.0, 0.0], 'longitude': [0.0, 1.0]},
+    )
+    u, v = sample_ocean_current(
+        dataset, [time[0] + pd.Timedelta('12H')], [0.5], [0.5], interpolation='linear'
+    )
+    assert u[0] == pytest.approx(3.5)
+    assert v[0] == 0
+    with pytest.raises(ValueError):
+        sample_ocean_current(dataset, time, [0, 0], [0, 0], interpolation='cubic')
@@ -1,3 +1,5 @@
+import os
+import copy
 import pytest
 import numpy as np
 import pandas as pd
@@ -8,6 +10,7 @@ from D3HRE.simulation import Reactive_simulation, Task
 from D3HRE.optimization import Constraint_mixed_objective_optimisation, Mixed_objective_optimization_function
 from D3HRE.core import file_reading_utility
 from D3HRE.core.mission_utility import Mission
+from tests.test_env import store_test_resource
 
 from D3HRE.optimization import *
 from PyResis import propulsion_power
@@ -15,6 +18,7 @@ from PyResis import propulsion_power
 
 test_route =  np.array([[  10.69358 ,  -178.94713892], [  11.06430687, +176.90022735]])
 test_mission = Mission('2014-01-01', test_route, 2)
+store_test_resource(test_mission)
 test_ship = propulsion_power.Ship()
 test_ship.dimension(5.72, 0.248, 0.76, 1.2, 5.72/(0.549)**(1/3),0.613)
 
@@ -81,6 +85,25 @@ config = {'load': {'prop_load': {'prop_eff': 0.7,
 task = Task(test_mission, test_ship, power_consumption_list)
 
 
+def updated_config(optimization={}, method={}):
+    """
+    Copy of the test config with entries of config['optimization'] and config['optimization']['method'] updated.
+    """
+    new_config = copy.deepcopy(config)
+    new_config['optimization'].update(optimization)
+    for name, options in method.items():
+        new_config['optimization']['method'].setdefault(name, {}).update(options)
+    return new_config
+
+
+@pytest.fixture(scope='module', autouse=True)
+def unit_power_dir(tmp_path_factory):
+    # Keep the unit power arrays of the tests out of the MERRA-2 data directory
+    config['simulation']['unit_power_dir'] = str(tmp_path_factory.mktemp('unit_power'))
+    yield config['simulation']['unit_power_dir']
+    del config['simulation']['unit_power_dir']
+
+
 
 def test_constraint_mixed_objective_optimisation():
     con_mix_opt = Constraint_mixed_objective_optimisation(task, config=config)
@@ -98,3 +121,133 @@ def test_constraint_mixed_objective_optimisation_island():
 
 
 
+
+def test_batch_fitness():
+    x = np.array([[1, 0.5, 100], [0.1, 0.1, 10], [5, 2, 1000]])
+    for function in [Mixed_objective_optimization_function, Multiple_objective_optimization_function]:
+        problem = function(task, config=config)
+        fitness = problem.batch_fitness(x.ravel()).reshape(3, -1)
+        for i in range(3):
+            assert fitness[i] == pytest.approx(problem.fitness(x[i]))
+        assert pg.problem(problem).has_batch_fitness()
+
+def test_batch_optimisation():
+    batch_config = updated_config(optimization={'batch': True},
+                                  method={'pso': {'generation': 5, 'population': 20}})
+
+    con_mix_opt = Constraint_mixed_objective_optimisation(task, config=batch_config)
+    champion, champion_x = con_mix_opt.run()
+    assert isinstance(con_mix_opt.get_algorithm(5), pg.pso_gen)
+    for opt_x, constraint_x in zip(champion_x, con_mix_opt.problem.get_bounds()[1]):
+        assert opt_x <= constraint_x
+
+    con_mul_opt = Constraint_multiple_objective_optimisation(task, config=batch_config)
+    con_mul_opt.run()
+    assert con_mul_opt.pop.get_f().shape == (20, 2)
+
+def test_fitness_cache():
+    cache_config = updated_config(optimization={'cache': {'tolerance': [1e-3, 1e-3, 1e-1]}})
+    problem = Multiple_objective_optimization_function(task, config=cache_config)
+    assert problem.fitness([1, 0.5, 100]) == pytest.approx(problem.fitness([1.0001, 0.5, 100.01]))
+    x = np.array([[1, 0.5, 100], [2, 1, 200]])
+    assert problem.batch_fitness(x.ravel())[2:] == pytest.approx(problem.objective(x[1]))
+    assert problem.cache_info()['hits'] == 2
+    assert problem.cache_info()['misses'] == 2
+    assert Multiple_objective_optimization_function(task, config=config).cache_info() is None
+
+def test_archipelago_optimisation():
+    import pickle
+    archipelago_config = updated_config(method={
+        'pso': {'generation': 5, 'population': 10},
+        'archipelago': {'islands': 2, 'topology': 'fully_connected', 'evolutions': 2},
+    })
+    con_mix_opt = Constraint_mixed_objective_optimisation(task, config=archipelago_config)
+
+    # The compact problem does not carry the task and gives the same fitness
+    compact_problem = con_mix_opt.get_compact_problem()
+    assert len(pickle.dumps(compact_problem.extract(Mixed_objective_optimization_function))) < 10000
+    x = [1, 0.5, 100]
+    assert compact_problem.fitness(x) == pytest.approx(con_mix_opt.problem.fitness(x))
+    compact_directory = compact_problem.extract(Mixed_objective_optimization_function).sim.directory
+    con_mix_opt.remove_compact_problem(compact_problem)
+    assert not os.path.exists(compact_directory)
+
+    champion, champion_x = con_mix_opt.archipelago_run()
+    assert len(con_mix_opt.archipelago) == 2
+    for opt_x, constraint_x in zip(champion_x, con_mix_opt.problem.get_bounds()[1]):
+        assert opt_x <= constraint_x
+    # The stored arrays of the islands are removed after the run
+    island_problem = con_mix_opt.archipelago[0].get_population().problem
+    assert not os.path.exists(island_problem.extract(Mixed_objective_optimization_function).sim.directory)
+
+def test_archipelago_default_settings():
+    # Settings missing from the configuration take their own defaults
+    islands_config = updated_config(method={'archipelago': {'islands': 3}})
+    con_mix_opt = Constraint_mixed_objective_optimisation(task, config=islands_config)
+    assert con_mix_opt.islands == 3
+    assert con_mix_opt.topology == 'ring'
+    assert con_mix_opt.evolutions == 1
+
+    con_mix_opt = Constraint_mixed_objective_optimisation(task, config=config)
+    assert con_mix_opt.islands == (os.cpu_count() or 1)
+
+def test_batch_archipelago_optimisation():
+    archipelago_config = updated_config(optimization={'batch': True}, method={
+        'pso': {'generation': 5, 'population': 10},
+        'archipelago': {'islands': 2, 'topology': 'ring', 'evolutions': 2},
+    })
+    con_mix_opt = Constraint_mixed_objective_optimisation(task, config=archipelago_config)
+    champion, champion_x = con_mix_opt.archipelago_run()
+    assert isinstance(con_mix_opt.archipelago[0].get_algorithm().extract(pg.pso_gen), pg.pso_gen)
+    for opt_x, constraint_x in zip(champion_x, con_mix_opt.problem.get_bounds()[1]):
+        assert opt_x <= constraint_x
+
+    champion, champion_x = con_mix_opt.island_run()
+    for opt_x, constraint_x in zip(champion_x, con_mix_opt.problem.get_bounds()[1]):
+        assert opt_x <= constraint_x
+
+def test_monotone_sizing():
+    sizing_config = updated_config(method={
+        'sizing': {'target_lpsp': 0.01, 'solar_steps': 5, 'wind_steps': 4, 'capacity_tolerance': 1}
+    })
+    sizing = Monotone_sizing_optimisation(task, config=sizing_config)
+
+    solar_area, wind_area = np.array([0.5, 1, 2]), np.array([0.2, 0.5, 0.1])
+    battery_capacity = sizing.minimum_battery_capacity(solar_area, wind_area)
+    for s, w, b in zip(solar_area, wind_area, battery_capacity):
+        if np.isnan(b):
+            assert sizing.sim.run(s, w, sizing.get_bounds()[1][2]) > 0.01
+        else:
+            assert sizing.sim.run(s, w, b) <= 0.01
+            assert b - 1 < sizing.get_bounds()[0][2] or sizing.sim.run(s, w, b - 1) > 0.01
+
+    cost, champion = sizing.run()
+    assert sizing.get_lpsp() <= 0.01
+    assert cost == pytest.approx(np.dot(champion, sizing.weight[:3]))
+
+    front = sizing.pareto_front([0, 0.01, 0.05, 0.1])
+    assert np.all(np.diff(front[:, 0]) > 0)
+    assert np.all(np.diff(front[:, 1]) < 0)
+
+def test_sizing_non_monotone_lpsp():
+    class NonMonotoneSim:
+        # Synthetic LPSP of each solar area, 0 where the battery capacity is in one of the ranges
+        ranges = {1: [(30, 40), (80, np.inf)], 2: [(0, 5)], 3: [(45, 60)], 4: []}
+
+        def run_batch(self, solar_area, wind_area, battery_capacity):
+            return np.array([
+                0. if any(low <= b < high for low, high in self.ranges[int(s)]) else 1.
+                for s, b in zip(solar_area, battery_capacity)
+            ])
+
+    sizing = Monotone_sizing_optimisation(task, config=config)
+    sizing.sim = NonMonotoneSim()
+    sizing.max_capacity = [4, 1, 100]
+    battery_capacity = sizing.minimum_battery_capacity([1, 2, 3, 4], [1, 1, 1, 1], target_lpsp=0)
+    # Met again below the bisection result
+    assert 30 <= battery_capacity[0] < 30 + sizing.capacity_tolerance
+    # Met at the lower bound but not with the largest battery
+    assert battery_capacity[1] == sizing.get_bounds()[0][2]
+    # Met only in the middle of the range
+    assert 45 <= battery_capacity[2] < 45 + sizing.capacity_tolerance
+    assert np.isnan(battery_capacity[3])
@@ -0,0 +1,72 @@
+import copy
+import numpy as np
+import pytest
+
+from PyResis import propulsion_power as pyresis
+import D3HRE.core.propulsion_model as propulsion_model
+from D3HRE.core.propulsion_model import PropulsionPowerTable, propulsion_power, resistance_array
+
+
+test_ship = pyresis.Ship()
+test_ship.dimension(5.72, 0.248, 0.76, 1.2, 5.72 / (0.549) ** (1 / 3), 0.613)
+
+
+def test_propulsion_power_matches_pyresis():
+    speed = np.array([0.1, 0.5, 1.0, 1.2, 2.0, 3.5, 6.0])
+    power = propulsion_power(test_ship, speed)
+
+    expected = []
+    for v in speed:
+        ship = copy.copy(test_ship)
+        ship.speed = v
+        expected.append(ship.prop_power())
+    assert np.allclose(power, expected)
+    assert resistance_array(test_ship, speed).shape == speed.shape
+
+
+def test_propulsion_power_leave_vehicle_unchanged():
+    propulsion_power(test_ship, [0.5, 3.0])
+    assert test_ship.speed == 1.2
+    assert not hasattr(test_ship, 'total_resistance_coef')
+
+
+def test_propulsion_power_zero_speed():
+    assert propulsion_power(test_ship, [0.0])[0] == pytest.approx(0)
+
+
+def test_propulsion_power_table(tmp_path):
+    table = PropulsionPowerTable(str(tmp_path))
+    speed = np.linspace(0.2, 3, 50)
+    power = table.power(test_ship, speed)
+    assert np.allclose(power, propulsion_power(test_ship, speed), rtol=1e-3)
+
+    key = table.get_key(test_ship)
+    assert (tmp_path / (key + '.npy')).is_file()
+    assert table.get_curve(test_ship) is table.get_curve(test_ship)
+    assert np.all(np.diff(table.get_curve(test_ship)(propulsion_model.TABLE_SPEED)) >= 0)
+
+    # Stored table is reused by a new process
+    propulsion_model._loaded.clear()
+    assert np.allclose(PropulsionPowerTable(str(tmp_path)).power(test_ship, speed), power)
+
+
+def test_propulsion_power_table_out_of_range(tmp_path):
+    table = PropulsionPowerTable(str(tmp_path))
+    speed = np.array([1.0, propulsion_model.TABLE_SPEED[-1] + 2])
+    assert np.allclose(table.power(test_ship, speed), propulsion_power(test_ship, speed), rtol=1e-3)
+
+
+def test_propulsion_power_table_key():
+    table = PropulsionPowerTable('.')
+    other_ship = copy.copy(test_ship)
+    other_ship.speed = 3
+    assert table.get_key(other_ship) == table.get_key(test_ship)
+    other_ship.length = 6
+    assert table.get_key(other_ship) != table.get_key(test_ship)
+
+
+def test_propulsion_power_table_lazy():
+    from D3HRE import MaritimeRobot
+    robot = MaritimeRobot({}, from_pyresis=test_ship, use_ocean_current=False)
+    robot.get_propulsion_load(current=False)
+    assert robot.propulsion_table is None
@@ -0,0 +1,28 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from D3HRE.core.resource_store import ResourceStore
+
+
+legacy_resource = os.path.join(os.path.dirname(__file__), '0d42588c08f99b9597ad878ae4b07202resource.pkl')
+mission_ID = '0d42588c08f99b9597ad878ae4b07202'
+
+
+def test_resource_store(tmp_path):
+    shutil.copy(legacy_resource, str(tmp_path))
+    store = ResourceStore(str(tmp_path))
+    expected = pd.read_pickle(legacy_resource)
+
+    # Pickled resource of earlier versions is migrated into the store
+    assert store.exists(mission_ID)
+    assert store.read_metadata(mission_ID)['columns'] == list(expected.columns)
+    pd.testing.assert_frame_equal(store.load(mission_ID), expected, check_names=False, check_freq=False)
+
+    index, arrays = store.load_arrays(mission_ID, columns=['SWGDN', 'U2M'])
+    assert list(arrays) == ['SWGDN', 'U2M']
+    assert isinstance(arrays['U2M'], np.memmap)
+    assert (arrays['U2M'] == expected.U2M.values).all()
+    assert list(store.load(mission_ID, columns=['T2M']).columns) == ['T2M']
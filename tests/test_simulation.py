@@ -1,12 +1,95 @@
 import pytest
 from tests.test_env import *
 from D3HRE.simulation import PowerSim
+from D3HRE.core.unit_power_store import UnitPowerStore
 
-power_sim = PowerSim(test_task, config)
 
-def test_run():
+@pytest.fixture(scope='module')
+def power_sim(tmp_path_factory):
+    return PowerSim(test_task, config, unit_power_store=UnitPowerStore(str(tmp_path_factory.mktemp('unit_power'))))
+
+def test_run(power_sim):
     assert  power_sim.run(10, 10, 1000) == 0
 
-def test_get_result():
+def test_run_batch(power_sim):
+    solar_area, wind_area, battery_capacity = [10, 1, 0.1], [10, 0.5, 0.1], [1000, 100, 10]
+    lpsp = power_sim.run_batch(solar_area, wind_area, battery_capacity)
+    for i in range(3):
+        assert lpsp[i] == pytest.approx(power_sim.run(solar_area[i], wind_area[i], battery_capacity[i]))
+
+def test_get_result(power_sim):
     assert len(power_sim.get_report(10, 10, 1000).columns) == 40
 
+
+def test_unit_power_store(tmp_path):
+    store = UnitPowerStore(str(tmp_path))
+    sim = PowerSim(test_task, config, unit_power_store=store)
+    lpsp = sim.run(1, 0.5, 100)
+
+    key = store.get_key(test_task.mission.ID, sim.get_transducer())
+    unit_power = store.load(key)
+    assert unit_power['wind_raw'].shape == (len(sim.resource_df),)
+
+    # A new simulation on the same mission reads the stored arrays instead of simulating again
+    reused_sim = PowerSim(test_task, config, unit_power_store=store)
+    assert reused_sim.load_unit_power() is unit_power
+    assert reused_sim.run(1, 0.5, 100) == lpsp
+
+
+def test_power_curve(power_sim, tmp_path):
+    import copy
+    from D3HRE.core.wind_turbine_model import power_from_power_curve
+    power_curve = {'speed': [2, 5, 10, 20], 'power': [0, 60, 400, 400], 'area': 2}
+    curve_config = copy.deepcopy(config)
+    curve_config['simulation']['power_curve'] = power_curve
+    curve_sim = PowerSim(test_task, curve_config, unit_power_store=UnitPowerStore(str(tmp_path)))
+    assert curve_sim.get_transducer() != power_sim.get_transducer()
+
+    wind_raw = curve_sim.load_unit_power()['wind_raw']
+    expected = power_from_power_curve(curve_sim.resource_df.V2.values, power_curve['speed'], power_curve['power']) / 2
+    assert wind_raw == pytest.approx(expected)
+    assert curve_sim.wind['wind_raw'].values == pytest.approx(expected)
+
+
+def test_sun_geometry_computed_once(power_sim, monkeypatch):
+    from gsee.gsee import trigon
+    from D3HRE.simulation import Reactive_simulation
+    sun_rise_set_minutes = trigon._sun_rise_set_minutes
+    calls = []
+
+    def counted(*args):
+        calls.append(args)
+        return sun_rise_set_minutes(*args)
+
+    monkeypatch.setattr(trigon, '_sun_rise_set_minutes', counted)
+    diffuse_fraction, solar_power_unit = power_sim.simulate_solar_power()
+    assert len(calls) == 1
+
+    reactive_sim = Reactive_simulation(test_task, config=config)
+    assert reactive_sim.solar_power_simulation.values == pytest.approx(solar_power_unit, nan_ok=True)
+    assert reactive_sim.resource_df['diffuse_fraction'].values == pytest.approx(diffuse_fraction, nan_ok=True)
+    assert len(calls) == 2
+
+
+def test_run_ensemble(power_sim):
+    result = power_sim.run_ensemble(1, 0.5, 100, n_profiles=20)
+    assert result['lpsp'].shape == (20,)
+    assert result['mean'] == pytest.approx(result['lpsp'].mean())
+    assert result['lpsp'].min() <= result['quantiles'][0.5] <= result['lpsp'].max()
+
+    # The first profile of the ensemble is the hotel load of the task
+    hotel_load = power_sim.get_hotel_load_ensemble(20)
+    assert hotel_load.shape == (20, len(test_task.hotel_load))
+    assert hotel_load[0] == pytest.approx(test_task.hotel_load.values)
+    assert result['lpsp'][0] == pytest.approx(power_sim.run(1, 0.5, 100))
+
+
+def test_compact_power_sim(power_sim, tmp_path):
+    import pickle
+    from D3HRE.simulation import CompactPowerSim
+    compact_sim = pickle.loads(pickle.dumps(CompactPowerSim.from_power_sim(power_sim, str(tmp_path))))
+    assert compact_sim.arrays is None
+    solar_area, wind_area, battery_capacity = [10, 1, 0.1], [10, 0.5, 0.1], [1000, 100, 10]
+    assert compact_sim.run_batch(solar_area, wind_area, battery_capacity) == pytest.approx(
+        power_sim.run_batch(solar_area, wind_area, battery_capacity))
+    assert compact_sim.run(1, 0.5, 100) == pytest.approx(power_sim.run(1, 0.5, 100))
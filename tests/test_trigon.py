@@ -0,0 +1,19 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from gsee.gsee import trigon
+
+
+@pytest.mark.parametrize("start, lat, lon", [
+    ('2014-03-01', 10, 8),
+    ('2014-06-21', 50, -150),
+    ('2014-12-01', -30, 120),
+    ('2014-06-21', 68, 20),
+])
+def test_sun_angles_location(start, lat, lon):
+    index = pd.date_range(start, periods=24, freq='H')
+    expected = trigon.sun_angles(index, (lat, lon), trigon.sun_rise_set_times(index, (lat, lon)))
+    angles = trigon.sun_angles_location(index, np.full(24, lat), np.full(24, lon))
+    assert angles.sun_alt.values == pytest.approx(expected.sun_alt.values.astype(float), abs=1e-3)
+    assert angles.duration.values == pytest.approx(expected.duration.values, abs=0.5)
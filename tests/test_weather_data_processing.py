@@ -31,3 +31,11 @@ def test_true_wind_direction():
     assert resource_df.true_wind_direction[6] == 270  # East U= 10, North V=  0
     assert resource_df.true_wind_direction[7] == 315  # East U=-10, North V= 10
 
+
+
+def test_zenith_cosine():
+    times = pd.date_range('2014-01-01', '2014-12-31', freq='7H')
+    lat = np.linspace(-60, 60, len(times))
+    lon = np.linspace(-180, 180, len(times))
+    expected = [calculate_zenith_cosine(t.to_pydatetime(), a, b) for t, a, b in zip(times, lat, lon)]
+    assert zenith_cosine(times, lat, lon, min_zenith_cosine=0.065) == pytest.approx(expected, abs=1e-3)
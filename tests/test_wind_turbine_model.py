@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from D3HRE.core.wind_turbine_model import *
+
+
+def test_power_from_turbine_array():
+    wind_speed = np.concatenate([np.linspace(0, 50, 2001), [np.nan]])
+    expected = [power_from_turbine(v, 1.5, 0.3, 2, 15) for v in wind_speed]
+    assert np.allclose(power_from_turbine_array(wind_speed, 1.5, 0.3, 2, 15), expected, rtol=1e-12)
+
+    # Turbine parameters broadcast against wind speed for a fleet of turbines
+    fleet = power_from_turbine_array(wind_speed, np.array([[1], [2]]), 0.3, 2, 15)
+    assert fleet.shape == (2, len(wind_speed))
+    assert np.allclose(fleet[1], 2 * fleet[0])
+
+
+def test_power_from_power_curve():
+    curve_speed, curve_power = [3, 4, 25], [0, 100, 1000]
+    power = power_from_power_curve([0, 3.5, 4, 25, 26, np.nan], curve_speed, curve_power)
+    assert np.allclose(power, [0, 50, 100, 1000, 0, 0])
+
+    fleet = power_from_power_curve([3.5, 4], curve_speed, [curve_power, [0, 200, 2000]])
+    assert np.allclose(fleet, [[50, 100], [100, 200]])
+
+
+def test_wind_speed_at_height():
+    resource_df = pd.DataFrame({
+        'U2M': [3, 4], 'V2M': [4, 0], 'U10M': [6, 5], 'V10M': [8, 0], 'U50M': [9, 6], 'V50M': [12, 0]
+    })
+    assert np.allclose(wind_speed_at_height(resource_df, 2), [5, 4])
+    assert np.allclose(wind_speed_at_height(resource_df, 50), [15, 6])
+    assert np.all(wind_speed_at_height(resource_df, 100) > wind_speed_at_height(resource_df, 50))
+    assert wind_speed_at_height(resource_df, [2, 10, 30]).shape == (3, 2)